@@ -0,0 +1,300 @@
+"""
+Benchmark de throughput do backend
+Gera vídeos sintéticos (lavfi), mede cada etapa e o caminho HTTP completo
+e compara com uma baseline salva para detectar regressões
+
+Uso:
+    python benchmark.py                   # roda e compara com a baseline
+    python benchmark.py --quick           # apenas o vídeo menor
+    python benchmark.py --save-baseline   # grava os resultados como nova baseline
+
+A baseline (benchmark_baseline.json, ao lado deste arquivo) depende da
+máquina: os números só são comparáveis no mesmo hardware. Na primeira
+execução sem baseline os resultados viram a baseline; para fixar a
+referência do projeto, rode ``python benchmark.py --save-baseline`` na
+máquina de referência (fora de carga) e faça commit do JSON gerado.
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import resource
+import shutil
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from config import Config
+
+BENCH_DIR = Config.TEMP_DIR / "benchmark"
+BASELINE_PATH = Path(__file__).parent / "benchmark_baseline.json"
+
+# Vídeos sintéticos: duração (s), resolução e codec variados
+SYNTHETIC_VIDEOS = [
+    {"name": "curto_720p_h264", "duration": 60, "size": "1280x720", "codec": "libx264", "ext": "mp4"},
+    {"name": "curto_1080p_hevc", "duration": 60, "size": "1920x1080", "codec": "libx265", "ext": "mp4"},
+    {"name": "curto_720p_vp9", "duration": 60, "size": "1280x720", "codec": "libvpx-vp9", "ext": "webm"},
+    {"name": "longo_1080p_h264", "duration": 600, "size": "1920x1080", "codec": "libx264", "ext": "mp4"},
+]
+
+CUT_DURATION = 30  # segundos do corte isolado (cut_video_ffmpeg)
+
+# Métricas comparadas com a baseline: (nome, maior é melhor?)
+TRACKED_METRICS = [
+    ("realtime_factor", True),
+    ("cpu_seconds_per_minute", False),
+    ("peak_rss_mb", False),
+]
+
+
+def available_encoders() -> set:
+    result = subprocess.run(['ffmpeg', '-hide_banner', '-encoders'], capture_output=True, text=True)
+    return {line.split()[1] for line in result.stdout.splitlines() if len(line.split()) > 1}
+
+
+def generate_video(spec: Dict) -> Path:
+    """Vídeo de teste com testsrc2 + tom senoidal (reaproveitado entre execuções)"""
+    path = BENCH_DIR / f"{spec['name']}.{spec['ext']}"
+    if path.exists():
+        return path
+
+    if spec["codec"] == "libvpx-vp9":
+        video_args = ['-c:v', 'libvpx-vp9', '-deadline', 'realtime', '-cpu-used', '8', '-b:v', '2M']
+        audio_args = ['-c:a', 'libopus', '-b:a', '96k']
+    else:
+        video_args = ['-c:v', spec["codec"], '-preset', 'veryfast', '-crf', '23']
+        audio_args = ['-c:a', 'aac', '-b:a', '128k']
+
+    cmd = [
+        'ffmpeg', '-y', '-v', 'error',
+        '-f', 'lavfi', '-i', f"testsrc2=size={spec['size']}:rate=30:duration={spec['duration']}",
+        '-f', 'lavfi', '-i', f"sine=frequency=440:sample_rate=48000:duration={spec['duration']}",
+        *video_args, '-g', '60', '-pix_fmt', 'yuv420p',
+        *audio_args, '-shortest', str(path)
+    ]
+    subprocess.run(cmd, check=True)
+    return path
+
+
+def clear_sidecars(video_path: Path):
+    """Remove caches em disco (mediainfo, áudio/proxy) para medir a frio"""
+    for sidecar in video_path.parent.glob(video_path.name + ".*"):
+        sidecar.unlink()
+    stage_dir = BENCH_DIR / f"{video_path.stem}_saida"
+    if stage_dir.exists():
+        shutil.rmtree(stage_dir)
+
+
+# --- Etapas: cada uma devolve os segundos de mídia produzidos/analisados ---
+
+def stage_probe(video_path: Path, work_dir: Path) -> float:
+    from core.simple_ffmpeg_only import SimpleFFmpegProcessor
+    return SimpleFFmpegProcessor().get_video_duration(str(video_path))
+
+
+def stage_cut(video_path: Path, work_dir: Path) -> float:
+    from core.simple_ffmpeg_only import SimpleFFmpegProcessor
+    processor = SimpleFFmpegProcessor()
+    duration = min(CUT_DURATION, processor.get_video_duration(str(video_path)))
+    start = max(0.0, processor.get_video_duration(str(video_path)) / 2 - duration / 2)
+    if not processor.cut_video_ffmpeg(str(video_path), str(work_dir / "corte.mp4"), start, duration):
+        raise RuntimeError("cut_video_ffmpeg falhou")
+    return duration
+
+
+def stage_automatic_clips(video_path: Path, work_dir: Path) -> float:
+    from core.simple_ffmpeg_only import SimpleFFmpegProcessor
+    clips = SimpleFFmpegProcessor().generate_automatic_clips(str(video_path), str(work_dir))
+    if not clips:
+        raise RuntimeError("nenhum clip gerado")
+    return sum(clip["duration"] for clip in clips)
+
+
+def stage_analysis(video_path: Path, work_dir: Path) -> float:
+    """Extração de áudio/proxy para análise + detecção de cenas e pausas (se disponíveis)"""
+    from core.simple_ffmpeg_only import SimpleFFmpegProcessor
+    from utils.streaming_ingest import analysis_command
+
+    copy = work_dir / video_path.name
+    shutil.copyfile(video_path, copy)
+    subprocess.run(analysis_command(str(copy), work_dir), check=True, capture_output=True)
+
+    try:
+        from core.video_processor import VideoProcessor
+    except ImportError:
+        print("   ⚠️ Dependências de IA ausentes: medindo apenas áudio/proxy")
+    else:
+        # Sem carregar Whisper/spaCy: cenas e pausas não usam os modelos
+        analyzer = VideoProcessor.__new__(VideoProcessor)
+        asyncio.run(analyzer.detect_scenes(copy))
+        asyncio.run(analyzer.analyze_audio_patterns(copy))
+
+    return SimpleFFmpegProcessor().get_video_duration(str(video_path))
+
+
+def stage_http(video_path: Path, work_dir: Path) -> float:
+    """Upload -> status -> download de todos os clips pela API (em processo)"""
+    from fastapi.testclient import TestClient
+    import main
+
+    client = TestClient(main.app)
+    with open(video_path, "rb") as f:
+        response = client.post("/upload", files={"file": (video_path.name, f, "video/mp4")})
+    response.raise_for_status()
+    job_id = response.json()["job_id"]
+
+    try:
+        job = client.get(f"/status/{job_id}").json()
+        if job["status"] != "completed":
+            raise RuntimeError(job.get("error") or f"job em estado {job['status']}")
+
+        produced = 0.0
+        for clip in job["clips"]:
+            download = client.get(f"/download/{job_id}/{clip['id']}")
+            download.raise_for_status()
+            produced += clip["duration"]
+        return produced
+    finally:
+        main.file_manager.cleanup_job(job_id, include_outputs=True)
+
+
+STAGES: Dict[str, Callable[[Path, Path], float]] = {
+    "get_video_duration": stage_probe,
+    "cut_video_ffmpeg": stage_cut,
+    "generate_automatic_clips": stage_automatic_clips,
+    "analise": stage_analysis,
+    "http": stage_http,
+}
+
+
+def _run_stage(stage: str, video_path: Path, queue):
+    """Executa no processo filho: rusage do filho (e dos ffmpeg dele) é só desta etapa"""
+    work_dir = BENCH_DIR / f"{video_path.stem}_saida"
+    work_dir.mkdir(parents=True, exist_ok=True)
+
+    start = time.perf_counter()
+    try:
+        media_seconds = STAGES[stage](video_path, work_dir)
+        error = None
+    except Exception as e:
+        media_seconds, error = 0.0, str(e)
+    wall = time.perf_counter() - start
+
+    own = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    queue.put({
+        "wall": wall,
+        "cpu": own.ru_utime + own.ru_stime + children.ru_utime + children.ru_stime,
+        "peak_rss_mb": max(own.ru_maxrss, children.ru_maxrss) / 1024,  # Linux: KB
+        "media_seconds": media_seconds,
+        "error": error,
+    })
+
+
+def measure(stage: str, video_path: Path) -> Dict:
+    clear_sidecars(video_path)
+    context = multiprocessing.get_context("fork")
+    queue = context.Queue()
+    process = context.Process(target=_run_stage, args=(stage, video_path, queue))
+    process.start()
+    raw = queue.get()
+    process.join()
+
+    result = {"wall_seconds": round(raw["wall"], 3), "error": raw["error"]}
+    if raw["error"] is None and raw["media_seconds"] > 0:
+        result.update({
+            "realtime_factor": round(raw["media_seconds"] / raw["wall"], 2),
+            "cpu_seconds_per_minute": round(raw["cpu"] / (raw["media_seconds"] / 60), 2),
+            "peak_rss_mb": round(raw["peak_rss_mb"], 1),
+        })
+    return result
+
+
+def compare(results: Dict[str, Dict], baseline: Dict[str, Dict], tolerance: float) -> List[str]:
+    """Lista as métricas que pioraram além da tolerância"""
+    regressions = []
+    for key, current in results.items():
+        reference = baseline.get(key)
+        if not reference or current.get("error"):
+            continue
+        for metric, higher_is_better in TRACKED_METRICS:
+            if metric not in current or metric not in reference:
+                continue
+            old, new = reference[metric], current[metric]
+            if higher_is_better:
+                worse = new < old * (1 - tolerance)
+            else:
+                worse = new > old * (1 + tolerance)
+            if worse:
+                regressions.append(f"{key} {metric}: {old} -> {new}")
+    return regressions
+
+
+def print_table(results: Dict[str, Dict]):
+    print(f"{'vídeo:etapa':<48} {'tempo(s)':>9} {'x tempo real':>12} {'CPU-s/min':>10} {'RSS(MB)':>8}")
+    for key, r in results.items():
+        if r.get("error"):
+            print(f"{key:<48} ❌ {r['error']}")
+            continue
+        print(f"{key:<48} {r['wall_seconds']:>9} {r.get('realtime_factor', '-'):>12} "
+              f"{r.get('cpu_seconds_per_minute', '-'):>10} {r.get('peak_rss_mb', '-'):>8}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark de throughput do VCUT Pro")
+    parser.add_argument("--quick", action="store_true", help="apenas o primeiro vídeo sintético")
+    parser.add_argument("--stages", default=",".join(STAGES), help="etapas separadas por vírgula")
+    parser.add_argument("--save-baseline", action="store_true", help="grava os resultados como baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="piora tolerada (0.2 = 20%%)")
+    args = parser.parse_args(argv)
+
+    if shutil.which("ffmpeg") is None:
+        print("❌ FFmpeg não encontrado")
+        return 1
+
+    BENCH_DIR.mkdir(parents=True, exist_ok=True)
+    encoders = available_encoders()
+    specs = SYNTHETIC_VIDEOS[:1] if args.quick else SYNTHETIC_VIDEOS
+    stages = [s for s in args.stages.split(",") if s in STAGES]
+
+    print("🚀 Benchmark VCUT Pro")
+    print("=" * 40)
+    results: Dict[str, Dict] = {}
+    for spec in specs:
+        if spec["codec"] not in encoders:
+            print(f"⚠️ {spec['name']}: encoder {spec['codec']} indisponível, pulando")
+            continue
+        print(f"🎬 Gerando {spec['name']} ({spec['duration']}s, {spec['size']}, {spec['codec']})...")
+        video_path = generate_video(spec)
+        for stage in stages:
+            print(f"   ⏱️ {stage}...")
+            results[f"{spec['name']}:{stage}"] = measure(stage, video_path)
+
+    print("=" * 40)
+    print_table(results)
+
+    if args.save_baseline or not BASELINE_PATH.exists():
+        BASELINE_PATH.write_text(json.dumps(results, indent=2, ensure_ascii=False))
+        if args.save_baseline:
+            print(f"💾 Baseline salva em {BASELINE_PATH.name}")
+        else:
+            # Primeira execução: nada a comparar, os resultados viram a referência
+            print(f"💾 Sem baseline: resultados salvos em {BASELINE_PATH.name}; "
+                  f"as próximas execuções comparam com eles")
+        return 0
+
+    regressions = compare(results, json.loads(BASELINE_PATH.read_text()), args.tolerance)
+    if regressions:
+        print("❌ Regressões em relação à baseline:")
+        for line in regressions:
+            print(f"   {line}")
+        return 1
+    print("✅ Sem regressões em relação à baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -28,12 +28,96 @@ class Config:
     MIN_CLIP_DURATION = 30  # segundos
     MAX_CLIP_DURATION = 90  # segundos
     TARGET_CLIPS_COUNT = 10
+    HIGHLIGHT_SCENE_THRESHOLD = 10  # score do scdet (0-100) contado como corte de cena
+    
+    # Quase-duplicatas descartadas antes do render (dHash de frames, ver core/dedup.py)
+    DEDUP_ENABLED = os.getenv("DEDUP_ENABLED", "true").lower() == "true"
+    DEDUP_HAMMING_THRESHOLD = 10  # bits diferentes (de 64) para frames "iguais"
+    DEDUP_SIMILARITY = 0.8  # fração de frames amostrados iguais para a janela ser duplicata
+    DEDUP_SAMPLES = 8  # frames amostrados por janela
+    DEDUP_CANDIDATE_FACTOR = 2  # candidatos pedidos ao motor de destaques por clip final
+    
+    # Renderização sob demanda: clips só são codificados no primeiro download
+    LAZY_CLIP_RENDERING = os.getenv("LAZY_CLIP_RENDERING", "false").lower() == "true"
+    PRERENDER_TOP_N = int(os.getenv("PRERENDER_TOP_N", "2"))  # pré-render especulativo por ai_score
+    
+    # Busca em transcrições (ver core/transcript_index.py)
+    TRANSCRIPT_DIR = BASE_DIR / "transcripts"  # um .npz por hash de conteúdo
+    TRANSCRIPT_SEARCH_MAX_HITS = 50
+    TRANSCRIPT_CACHE_ENTRIES = int(os.getenv("TRANSCRIPT_CACHE_ENTRIES", "32"))  # transcrições mantidas em memória (LRU)
+    TRANSCRIPT_CUT_PADDING = 1.0  # segundos antes/depois da frase no corte a partir da busca
+    
+    # Linha do tempo da UI (miniaturas + picos de áudio, ver core/timeline.py)
+    TIMELINE_MAX_THUMBNAILS = 600  # vídeos longos espaçam mais as miniaturas
+    TIMELINE_MIN_INTERVAL = 2  # segundos entre miniaturas, no mínimo
+    
+    # Cortes em lote (/batch-cut)
+    BATCH_MAX_CUTS = 50
+    BATCH_MAX_GAP = 60  # segundos: cortes mais distantes que isso usam outro passe de decodificação
+    BATCH_MAX_OUTPUTS = 8  # encoders simultâneos por processo ffmpeg
+    
+    # Armazenamento (cota com despejo LRU, ver utils/storage_manager.py)
+    STORAGE_QUOTA_BYTES = int(os.getenv("STORAGE_QUOTA_BYTES", str(20 * 1024 ** 3)))  # 20GB
+    STORAGE_MIN_FREE_BYTES = int(os.getenv("STORAGE_MIN_FREE_BYTES", str(2 * 1024 ** 3)))  # 2GB livres no disco
+    STORAGE_LOW_WATERMARK = 0.85  # despejo libera até 85% da cota
+    STORAGE_JANITOR_INTERVAL = 60  # segundos
+    STORAGE_RENDER_BYTES_PER_SECOND = 400_000  # estimativa de tamanho de clip para reservar espaço
+    JOB_RETENTION_HOURS = int(os.getenv("JOB_RETENTION_HOURS", "24"))
+    
+    # Cancelamento automático de jobs abandonados (ninguém consultou status/download)
+    JOB_ABANDON_TIMEOUT = int(os.getenv("JOB_ABANDON_TIMEOUT", "300"))  # segundos; 0 desativa
+    JOB_WATCHDOG_INTERVAL = 30  # segundos entre verificações
+    
+    # Checkpoints de jobs automáticos (ver utils/job_checkpoints.py): retomados no startup
+    CHECKPOINT_DIR = TEMP_DIR / "checkpoints"  # um JSON por job em andamento
+    JOB_RESUME_ON_STARTUP = os.getenv("JOB_RESUME_ON_STARTUP", "true").lower() == "true"
+    CHECKPOINT_DURATION_TOLERANCE = 1.0  # segundos de diferença aceitos ao validar um clip já renderizado
+    
+    # Backend de objetos (ver utils/storage_backends.py): local ou s3 (AWS, MinIO...)
+    STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "local")
+    STORAGE_CACHE_DIR = Path(os.getenv("STORAGE_CACHE_DIR", str(BASE_DIR / "cache")))  # cache de leitura do s3 (conta na cota, despejado primeiro)
+    S3_BUCKET = os.getenv("S3_BUCKET", "vcut")
+    S3_ENDPOINT_URL = os.getenv("S3_ENDPOINT_URL")  # ex.: http://localhost:9000 para MinIO
+    S3_REGION = os.getenv("S3_REGION")
     
     # Vídeo
     OUTPUT_WIDTH = 1080
     OUTPUT_HEIGHT = 1920
     OUTPUT_FPS = 30
     
+    # Codificação (ver core/encoding_profiles.py)
+    ENCODING_QUALITY = os.getenv("ENCODING_QUALITY", "balanced")  # fast, balanced, archival
+    ENCODING_PLATFORM = os.getenv("ENCODING_PLATFORM", "whatsapp")  # whatsapp, instagram, tiktok, youtube
+    ENCODING_DEGRADE_THRESHOLDS = [1.0, 2.0]  # encodes ativos por núcleo para cada degradação
+    
+    # Cortes longos: pedaços em keyframes codificados em paralelo (ver core/chunked_encode.py)
+    CHUNKED_ENCODE_MIN_DURATION = 180  # segundos; abaixo disso um encode único é mais rápido
+    CHUNKED_ENCODE_MIN_CHUNK = 30  # segundos por pedaço, no mínimo
+    CHUNKED_ENCODE_MAX_WORKERS = int(os.getenv("CHUNKED_ENCODE_MAX_WORKERS", "8"))
+    
+    # Execução do ffmpeg (ver core/ffmpeg_runner.py)
+    FFMPEG_TIMEOUT = int(os.getenv("FFMPEG_TIMEOUT", "600"))  # segundos, quando a duração da mídia é desconhecida
+    FFMPEG_TIMEOUT_MIN = 60  # piso do timeout proporcional
+    FFMPEG_TIMEOUT_PER_MEDIA_SECOND = 4  # até 4x mais lento que tempo real antes de matar
+    FFMPEG_MEMORY_LIMIT_MB = int(os.getenv("FFMPEG_MEMORY_LIMIT_MB", "4096"))  # RLIMIT_AS por processo (0 = sem limite)
+    FFMPEG_STDERR_TAIL_BYTES = 16 * 1024
+    FFMPEG_MAX_RETRIES = 1  # novas tentativas com perfil de fallback em falhas transitórias
+    
+    # Encode com limite de tamanho (WhatsApp recusa vídeos acima de 16MB)
+    SIZE_TARGETED_ENCODING = os.getenv("SIZE_TARGETED_ENCODING", "true").lower() == "true"
+    WHATSAPP_MAX_BYTES = int(os.getenv("WHATSAPP_MAX_BYTES", str(16 * 1024 * 1024)))
+    
+    # Normalização de loudness (medido uma vez por fonte, ver core/loudness.py)
+    LOUDNESS_NORMALIZATION = os.getenv("LOUDNESS_NORMALIZATION", "true").lower() == "true"
+    LOUDNESS_TARGET_LUFS = float(os.getenv("LOUDNESS_TARGET_LUFS", "-14"))  # padrão das redes sociais
+    LOUDNESS_MAX_GAIN_DB = 20.0  # não amplificar ruído de gravações quase mudas
+    LOUDNESS_TRUE_PEAK_DB = -1.0  # teto do limitador quando há ganho positivo
+    
+    # Rascunhos: entrega rápida sob carga, reencode de qualidade quando ocioso
+    DRAFT_MODE = os.getenv("DRAFT_MODE", "auto")  # auto, always, never
+    DRAFT_PRESSURE_THRESHOLD = 1.0  # encodes ativos por núcleo
+    DRAFT_UPGRADE_INTERVAL = 10  # segundos entre verificações do worker
+    
     # OpenAI (opcional)
     OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
     
@@ -0,0 +1,120 @@
+"""
+Cortes manuais em lote de uma mesma fonte
+Validação, fusão de intervalos sobrepostos e montagem do filtergraph
+que renderiza vários cortes com uma única decodificação
+"""
+
+import math
+from typing import Dict, List, Optional, Tuple
+
+from config import Config
+
+
+def parse_timestamp(value) -> float:
+    """Aceita segundos (número) ou 'SS', 'MM:SS', 'HH:MM:SS'; ValueError se não for finito"""
+    if isinstance(value, bool):
+        raise ValueError("Timestamp inválido")
+    if isinstance(value, (int, float)):
+        seconds = float(value)
+    else:
+        seconds = 0.0
+        for part in str(value).strip().split(':'):
+            seconds = seconds * 60 + float(part)
+
+    # float() aceita 'nan', 'inf' e '1e309': viram argumentos absurdos no ffmpeg
+    if not math.isfinite(seconds):
+        raise ValueError("Timestamp inválido")
+    return seconds
+
+
+def validate_ranges(ranges: List[Dict], duration: float) -> Tuple[List[Dict], List[str]]:
+    """Converte e valida os intervalos pedidos -> (cortes, erros)"""
+    cuts, errors = [], []
+
+    if not ranges:
+        errors.append("Nenhum intervalo informado")
+    if len(ranges) > Config.BATCH_MAX_CUTS:
+        errors.append(f"Máximo de {Config.BATCH_MAX_CUTS} cortes por lote")
+
+    for index, item in enumerate(ranges):
+        try:
+            start = parse_timestamp(item["start"])
+            end = parse_timestamp(item["end"])
+        except (KeyError, TypeError, ValueError):
+            errors.append(f"Corte {index + 1}: start/end inválidos")
+            continue
+
+        if start < 0 or end <= start:
+            errors.append(f"Corte {index + 1}: duração inválida")
+            continue
+        if duration and start >= duration:
+            errors.append(f"Corte {index + 1}: início além do fim do vídeo")
+            continue
+
+        cuts.append({
+            "index": index,
+            "start": start,
+            "end": min(end, duration) if duration else end,
+            "title": str(item.get("title") or f"Corte_{index + 1}"),
+        })
+
+    return cuts, errors
+
+
+def merge_ranges(cuts: List[Dict]) -> List[Dict]:
+    """Funde cortes sobrepostos; cada corte fundido lembra os pedidos de origem"""
+    merged: List[Dict] = []
+    for cut in sorted(cuts, key=lambda c: c["start"]):
+        if merged and cut["start"] <= merged[-1]["end"]:
+            merged[-1]["end"] = max(merged[-1]["end"], cut["end"])
+            merged[-1]["requests"].append(cut["index"])
+        else:
+            merged.append({
+                "start": cut["start"],
+                "end": cut["end"],
+                "title": cut["title"],
+                "requests": [cut["index"]],
+            })
+    return merged
+
+
+def group_for_single_pass(merged: List[Dict]) -> List[List[Dict]]:
+    """Agrupa cortes próximos para compartilhar uma decodificação
+
+    Cortes muito distantes não compensam: decodificar o intervalo entre eles
+    custa mais que um novo seek, então viram passes separados.
+    """
+    groups: List[List[Dict]] = []
+    for cut in merged:
+        if (groups
+                and cut["start"] - groups[-1][-1]["end"] <= Config.BATCH_MAX_GAP
+                and len(groups[-1]) < Config.BATCH_MAX_OUTPUTS):
+            groups[-1].append(cut)
+        else:
+            groups.append([cut])
+    return groups
+
+
+def build_filter_complex(group: List[Dict], time_origin: float, has_audio: bool,
+                         audio_filters: Optional[List[Optional[str]]] = None) -> str:
+    """split/trim de vídeo (e asplit/atrim de áudio) para cada corte do grupo
+
+    ``audio_filters`` traz o filtro de loudness de cada corte (ou None).
+    """
+    count = len(group)
+    video_labels = "".join(f"[vs{i}]" for i in range(count))
+    chains = [f"[0:v]split={count}{video_labels}"]
+    if has_audio:
+        audio_labels = "".join(f"[as{i}]" for i in range(count))
+        chains.append(f"[0:a]asplit={count}{audio_labels}")
+
+    for i, cut in enumerate(group):
+        start = max(0.0, cut["start"] - time_origin)
+        end = cut["end"] - time_origin
+        chains.append(f"[vs{i}]trim=start={start:.6f}:end={end:.6f},setpts=PTS-STARTPTS[v{i}]")
+        if has_audio:
+            audio_filter = audio_filters[i] if audio_filters else None
+            extra = f",{audio_filter}" if audio_filter else ""
+            chains.append(f"[as{i}]atrim=start={start:.6f}:end={end:.6f},asetpts=PTS-STARTPTS{extra}[a{i}]")
+
+    return ";".join(chains)
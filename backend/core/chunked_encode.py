@@ -0,0 +1,131 @@
+"""
+Encode paralelo de cortes longos
+O intervalo é dividido em keyframes da fonte, cada pedaço de vídeo é
+codificado em paralelo com parâmetros idênticos, o áudio sai num passe
+próprio e tudo é unido sem reencode (concat + faststart)
+"""
+
+import bisect
+import contextvars
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from config import Config
+from core.encoding_profiles import encoding_profiles, VBV_SECONDS
+from core.ffmpeg_runner import ffmpeg_runner
+from core.media_info import media_info
+from core.seek_planner import plan_seek, seek_args
+
+
+def plan_chunks(keyframes: List[float], start: float, end: float,
+                count: int, min_chunk: float) -> List[Tuple[float, float]]:
+    """Fronteiras em keyframes próximas de divisões iguais do intervalo"""
+    count = min(count, int((end - start) // min_chunk))
+    if count < 2 or not keyframes:
+        return [(start, end)]
+
+    boundaries = [start]
+    for i in range(1, count):
+        target = start + (end - start) * i / count
+        position = bisect.bisect_left(keyframes, target)
+        nearby = keyframes[max(0, position - 1):position + 1]
+        valid = [
+            kf for kf in nearby
+            if kf - boundaries[-1] >= min_chunk / 2 and end - kf >= min_chunk / 2
+        ]
+        if valid:
+            boundaries.append(min(valid, key=lambda kf: abs(kf - target)))
+    boundaries.append(end)
+    return list(zip(boundaries[:-1], boundaries[1:]))
+
+
+def parallel_workers() -> int:
+    """Núcleos livres para este corte (divididos com os encodes em andamento)"""
+    free = encoding_profiles.cpu_count // (encoding_profiles.active_encodes + 1)
+    return max(1, min(free, Config.CHUNKED_ENCODE_MAX_WORKERS))
+
+
+def _concat_line(path: Path) -> str:
+    escaped = str(path.resolve()).replace("'", "'\\''")
+    return f"file '{escaped}'\n"
+
+
+def encode_chunked(input_path: str, output_path: str, start: float, duration: float,
+                   settings: Dict, workers: int) -> Optional[Dict]:
+    """Codifica o corte em pedaços paralelos; None se não compensa dividir
+
+    Sem nova tentativa por pedaço: um pedaço com perfil de fallback teria
+    parâmetros diferentes e quebraria o concat sem reencode. Falhas sobem
+    como FFmpegError e o chamador refaz o corte num encode único.
+    """
+    info = media_info.probe(input_path)
+    keyframes = info["keyframes"]
+    chunks = plan_chunks(keyframes, start, start + duration, workers,
+                         Config.CHUNKED_ENCODE_MIN_CHUNK)
+    if len(chunks) < 2:
+        return None
+
+    output = Path(output_path)
+    work_dir = output.parent / f".{output.stem}.chunks"
+    work_dir.mkdir(parents=True, exist_ok=True)
+
+    # Parâmetros idênticos em todos os pedaços; núcleos divididos entre eles
+    chunk_settings = dict(settings)
+    chunk_settings["threads"] = max(1, encoding_profiles.cpu_count // len(chunks))
+    if chunk_settings.get("maxrate"):
+        # Cada pedaço pode encher o próprio buffer VBV: descontar do orçamento
+        factor = (duration + VBV_SECONDS) / (duration + len(chunks) * VBV_SECONDS)
+        for key in ("video_bitrate", "maxrate", "bufsize"):
+            chunk_settings[key] = int(chunk_settings[key] * factor)
+    video_args = encoding_profiles.ffmpeg_args(chunk_settings)
+
+    def encode_video(index: int, chunk_start: float, chunk_end: float) -> Path:
+        chunk_path = work_dir / f"chunk_{index:03d}.mp4"
+        input_seek, output_seek = seek_args(plan_seek(keyframes, chunk_start, chunk_end - chunk_start))
+        cmd = ['ffmpeg', '-y'] + input_seek + ['-i', input_path] + output_seek + ['-an'] + video_args + [str(chunk_path)]
+        with encoding_profiles.encode_slot():
+            ffmpeg_runner.run(cmd, f"ffmpeg:pedaco_{index}", chunk_end - chunk_start, str(chunk_path))
+        return chunk_path
+
+    def encode_audio() -> Path:
+        audio_path = work_dir / "audio.m4a"
+        cmd = [
+            'ffmpeg', '-y', '-ss', f"{start:.6f}", '-i', input_path, '-t', f"{duration:.6f}",
+            '-vn'
+        ]
+        if settings.get("audio_filter"):
+            cmd += ['-af', settings["audio_filter"]]
+        cmd += [
+            '-c:a', 'aac', '-b:a', settings["audio_bitrate"],
+            '-ar', str(settings["audio_rate"]), '-ac', '2', str(audio_path)
+        ]
+        ffmpeg_runner.run(cmd, "ffmpeg:audio", output_path=str(audio_path))
+        return audio_path
+
+    try:
+        # Cada tarefa leva uma cópia do contexto (job atual para rastreamento/cancelamento)
+        with ThreadPoolExecutor(max_workers=len(chunks) + 1) as pool:
+            video_futures = [
+                pool.submit(contextvars.copy_context().run, encode_video, i, chunk_start, chunk_end)
+                for i, (chunk_start, chunk_end) in enumerate(chunks)
+            ]
+            audio_future = (
+                pool.submit(contextvars.copy_context().run, encode_audio)
+                if info["audio"] is not None else None
+            )
+            chunk_paths = [future.result() for future in video_futures]
+            audio_path = audio_future.result() if audio_future else None
+
+        list_path = work_dir / "chunks.txt"
+        list_path.write_text("".join(_concat_line(path) for path in chunk_paths))
+
+        cmd = ['ffmpeg', '-y', '-f', 'concat', '-safe', '0', '-i', str(list_path)]
+        if audio_path:
+            cmd += ['-i', str(audio_path), '-map', '0:v:0', '-map', '1:a:0']
+        cmd += ['-c', 'copy', '-movflags', '+faststart', output_path]
+        ffmpeg_runner.run(cmd, "ffmpeg:concat", output_path=output_path)
+        return chunk_settings
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
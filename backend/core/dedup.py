@@ -0,0 +1,116 @@
+"""
+Filtro de quase-duplicatas antes da renderização
+dHash de 64 bits de um frame por segundo (do proxy); candidatos cujos
+frames amostrados batem com os de um candidato de nota maior (ou que se
+sobrepõem demais a ele) são descartados sem gastar um encode
+"""
+
+from pathlib import Path
+from typing import Callable, Dict, List, Tuple
+
+import numpy as np
+
+from config import Config
+from core.ffmpeg_runner import ffmpeg_runner
+from core.media_info import media_info
+from utils.streaming_ingest import PROXY_NAME
+
+HASH_WIDTH = 9  # 9x8 pixels -> 8x8 diferenças horizontais = 64 bits
+HASH_HEIGHT = 8
+MAX_TIME_OVERLAP = 0.5  # sobreposição temporal acima disso já é duplicata
+
+
+def dhash_frames(frames: np.ndarray) -> np.ndarray:
+    """(n, 8, 9) tons de cinza -> (n,) uint64: bit = pixel maior que o vizinho da direita"""
+    bits = frames[:, :, 1:] > frames[:, :, :-1]
+    return np.packbits(bits.reshape(len(frames), -1), axis=1).view(">u8").ravel().astype(np.uint64)
+
+
+def hamming(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Distância de Hamming entre todos os pares (len(a), len(b))"""
+    xor = np.bitwise_xor(a[:, None], b[None, :])
+    return np.unpackbits(xor.view(np.uint8).reshape(*xor.shape, 8), axis=-1).sum(axis=-1)
+
+
+class NearDuplicateFilter:
+    def __init__(self):
+        self._hashes: Dict[str, np.ndarray] = {}
+
+    def _hashes_path(self, video_path: Path) -> Path:
+        return video_path.with_name(video_path.name + ".dhash.npy")
+
+    def frame_hashes(self, video_path) -> np.ndarray:
+        """Um dHash por segundo da fonte (cache em memória e em disco)"""
+        video_path = Path(video_path)
+        key = str(video_path)
+        if key in self._hashes:
+            return self._hashes[key]
+
+        hashes_path = self._hashes_path(video_path)
+        if hashes_path.exists():
+            hashes = np.load(hashes_path)
+        else:
+            proxy = video_path.parent / PROXY_NAME
+            source = proxy if proxy.exists() else video_path
+            cmd = [
+                'ffmpeg', '-v', 'error', '-threads', '1', '-i', str(source), '-an', '-sn',
+                '-vf', f'fps=1,scale={HASH_WIDTH}:{HASH_HEIGHT}:flags=area,format=gray',
+                '-f', 'rawvideo', 'pipe:1'
+            ]
+            duration = media_info.probe(video_path)["duration"]
+            result = ffmpeg_runner.run(cmd, "ffmpeg:dhash", timeout=ffmpeg_runner.timeout_for(duration))
+            frame_size = HASH_WIDTH * HASH_HEIGHT
+            count = len(result.stdout) // frame_size
+            frames = np.frombuffer(result.stdout[:count * frame_size], dtype=np.uint8)
+            hashes = dhash_frames(frames.reshape(count, HASH_HEIGHT, HASH_WIDTH))
+            np.save(hashes_path, hashes)
+
+        self._hashes[key] = hashes
+        return hashes
+
+    def _sample(self, hashes: np.ndarray, start: float, end: float) -> np.ndarray:
+        """Hashes de frames igualmente espaçados da janela"""
+        first = min(max(0, int(start)), len(hashes) - 1)
+        last = min(max(first + 1, int(np.ceil(end))), len(hashes))
+        positions = np.linspace(first, last - 1, num=min(Config.DEDUP_SAMPLES, last - first)).astype(int)
+        return hashes[positions]
+
+    def _similar(self, a: np.ndarray, b: np.ndarray) -> bool:
+        """Fração dos frames de ``a`` com um frame quase idêntico em ``b``"""
+        matches = hamming(a, b).min(axis=1) <= Config.DEDUP_HAMMING_THRESHOLD
+        return matches.mean() >= Config.DEDUP_SIMILARITY
+
+    def filter(self, video_path, candidates: List[Dict],
+               span: Callable[[Dict], Tuple[float, float]],
+               score: Callable[[Dict], float]) -> List[Dict]:
+        """Candidatos sem quase-duplicatas, em ordem de nota (o de nota maior fica)"""
+        ordered = sorted(candidates, key=score, reverse=True)
+        if not Config.DEDUP_ENABLED or len(ordered) < 2:
+            return ordered
+
+        hashes = self.frame_hashes(video_path)
+        if len(hashes) == 0:
+            return ordered
+
+        kept: List[Tuple[Dict, float, float, np.ndarray]] = []
+        dropped = 0
+        for candidate in ordered:
+            start, end = span(candidate)
+            sample = self._sample(hashes, start, end)
+            duplicate = False
+            for _, kept_start, kept_end, kept_sample in kept:
+                overlap = min(end, kept_end) - max(start, kept_start)
+                if overlap > MAX_TIME_OVERLAP * min(end - start, kept_end - kept_start):
+                    duplicate = True
+                elif self._similar(sample, kept_sample):
+                    duplicate = True
+                if duplicate:
+                    break
+            if duplicate:
+                dropped += 1
+            else:
+                kept.append((candidate, start, end, sample))
+
+        if dropped:
+            print(f"Quase-duplicatas descartadas antes do render: {dropped}")
+        return [candidate for candidate, _, _, _ in kept]
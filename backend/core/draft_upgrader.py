@@ -0,0 +1,83 @@
+"""
+Worker de ociosidade: reencoda clips entregues como rascunho
+com o perfil WhatsApp completo e troca o arquivo atomicamente
+"""
+
+import asyncio
+import os
+from typing import Dict, Optional, Tuple
+
+from config import Config
+from core.encoding_profiles import encoding_profiles
+from core.ffmpeg_runner import FFmpegError
+from utils.tracing import tracer
+
+
+class DraftUpgrader:
+    def __init__(self, processor, jobs: Dict[str, Dict], render_locks: Dict[str, asyncio.Lock], file_manager):
+        self.processor = processor
+        self.file_manager = file_manager
+        self.jobs = jobs
+        self.render_locks = render_locks
+        self.interval = Config.DRAFT_UPGRADE_INTERVAL
+
+    def _next_draft(self) -> Optional[Tuple[Dict, Dict]]:
+        """Primeiro clip em rascunho ainda pendente de reencode"""
+        for job in list(self.jobs.values()):
+            for clip in job.get("clips", []):
+                if clip.get("draft") and job.get("source_path") and not job.get("cancelled"):
+                    return job, clip
+        return None
+
+    def upgrade_clip(self, source_path: str, clip: Dict) -> bool:
+        """Reencoda o rascunho em arquivo temporário e substitui o original"""
+        final_path = clip["file_path"]
+        temp_path = final_path + ".upgrade.mp4"
+
+        try:
+            settings = self.processor.cut_video_ffmpeg(
+                source_path, temp_path,
+                clip["start_time"], clip["duration"]
+            )
+        except FFmpegError as e:
+            print(f"Reencode do rascunho {clip['id']} falhou: {e}")
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            return False
+
+        # os.replace é atômico: downloads em andamento mantêm o arquivo antigo
+        os.replace(temp_path, final_path)
+        clip["draft"] = False
+        clip.update(encoding_profiles.encode_report(settings, final_path, clip["duration"]))
+        return True
+
+    async def run(self):
+        """Loop do worker: só reencoda quando não há outros encodes ativos"""
+        while True:
+            await asyncio.sleep(self.interval)
+
+            if encoding_profiles.active_encodes > 0:
+                continue
+
+            candidate = self._next_draft()
+            if candidate is None:
+                continue
+
+            job, clip = candidate
+            lock = self.render_locks.setdefault(clip["file_path"], asyncio.Lock())
+            async with lock:
+                if not clip.get("draft"):
+                    continue
+                try:
+                    source_path = await self.file_manager.ensure_local(job["source_path"])
+                    with tracer.stage(job, "reencode_rascunho"):
+                        upgraded = await asyncio.to_thread(self.upgrade_clip, str(source_path), clip)
+                    if upgraded:
+                        await self.file_manager.publish(clip["file_path"])
+                except Exception as e:
+                    upgraded = False
+                    print(f"Erro no reencode do rascunho {clip['id']}: {e}")
+                if not upgraded:
+                    # Mantém o rascunho utilizável e não tenta de novo em loop
+                    clip["draft"] = False
+                    clip["draft_upgrade_failed"] = True
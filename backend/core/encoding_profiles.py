@@ -0,0 +1,307 @@
+"""
+Perfis de codificação compartilhados por todos os processadores
+Qualidade (fast / balanced / archival) x plataforma de destino,
+com degradação automática para presets mais rápidos sob carga
+"""
+
+import os
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from config import Config
+
+# Níveis de qualidade, do mais lento (melhor) para o mais rápido
+QUALITY_PROFILES: Dict[str, Dict] = {
+    "archival": {"preset": "slow", "crf": 20, "tune": "film"},
+    "balanced": {"preset": "medium", "crf": 23, "tune": None},
+    "fast": {"preset": "veryfast", "crf": 25, "tune": None},
+    # Rascunho entregue na hora sob carga; reencodado depois (core/draft_upgrader.py)
+    "draft": {"preset": "ultrafast", "crf": 26, "tune": None},
+}
+DEGRADATION_ORDER = ["archival", "balanced", "fast"]
+
+# Parâmetros de compatibilidade por plataforma (independentes de hardware)
+PLATFORM_PROFILES: Dict[str, Dict] = {
+    "whatsapp": {
+        "profile": "high", "level": "4.0", "fps": 30, "gop": 60,
+        "audio_bitrate": "128k", "audio_rate": 44100,
+        "max_bytes": Config.WHATSAPP_MAX_BYTES,
+    },
+    "instagram": {
+        "profile": "high", "level": "4.1", "fps": 30, "gop": 60,
+        "audio_bitrate": "128k", "audio_rate": 48000,
+    },
+    "tiktok": {
+        "profile": "high", "level": "4.1", "fps": 30, "gop": 60,
+        "audio_bitrate": "128k", "audio_rate": 44100,
+    },
+    "youtube": {
+        "profile": "high", "level": "4.2", "fps": 30, "gop": 60,
+        "audio_bitrate": "192k", "audio_rate": 48000,
+    },
+}
+
+# Ordem dos presets do x264, do mais rápido para o mais lento
+X264_PRESETS = ["ultrafast", "superfast", "veryfast", "faster", "fast",
+                "medium", "slow", "slower", "veryslow"]
+
+# Encode com limite de tamanho
+MUX_OVERHEAD = 0.02  # contêiner MP4 (moov, cabeçalhos de amostra)
+VBV_SECONDS = 1.0  # bufsize = 1s de bitrate; entra na conta do orçamento
+LOW_VIDEO_BPS = 400_000  # abaixo disso o áudio cai para 64k
+MIN_VIDEO_BPS = 100_000
+MIN_BITS_PER_PIXEL = 0.03  # abaixo disso vale mais reduzir a resolução
+SCALE_HEIGHTS = [1080, 720, 540, 480, 360]
+# Campos de encode_report copiados para o registro do clip (além de file_size)
+SIZE_REPORT_FIELDS = ["bitrate_kbps", "rate_control", "size_limit", "within_size_limit", "target_video_kbps"]
+
+
+def _bitrate_to_bps(value: str) -> int:
+    """'128k' -> 128000"""
+    value = str(value).lower()
+    if value.endswith("k"):
+        return int(float(value[:-1]) * 1000)
+    if value.endswith("m"):
+        return int(float(value[:-1]) * 1_000_000)
+    return int(float(value))
+
+
+class EncodingProfileManager:
+    def __init__(self):
+        self.cpu_count = os.cpu_count() or 1
+        self.active_encodes = 0
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def encode_slot(self):
+        """Marca um encode em andamento (usado para medir pressão da fila)"""
+        with self._lock:
+            self.active_encodes += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.active_encodes -= 1
+
+    def queue_pressure(self) -> float:
+        """Encodes ativos por núcleo de CPU"""
+        return self.active_encodes / self.cpu_count
+
+    def should_emit_draft(self) -> bool:
+        """Decide se o próximo clip sai como rascunho rápido"""
+        if Config.DRAFT_MODE == "always":
+            return True
+        if Config.DRAFT_MODE == "never":
+            return False
+        return self.queue_pressure() >= Config.DRAFT_PRESSURE_THRESHOLD
+
+    def select(
+        self,
+        quality: Optional[str] = None,
+        platform: Optional[str] = None,
+        source_height: Optional[int] = None,
+    ) -> Dict:
+        """Escolhe preset, CRF e threads para um encode"""
+        quality = quality or Config.ENCODING_QUALITY
+        platform = platform or Config.ENCODING_PLATFORM
+        if quality not in QUALITY_PROFILES:
+            raise ValueError(f"Perfil de qualidade desconhecido: {quality}")
+        if platform not in PLATFORM_PROFILES:
+            raise ValueError(f"Plataforma desconhecida: {platform}")
+
+        # Sob carga, desce um nível por limiar ultrapassado em vez de enfileirar
+        effective_quality = quality
+        if quality in DEGRADATION_ORDER:
+            pressure = self.queue_pressure()
+            level = DEGRADATION_ORDER.index(quality)
+            for threshold in Config.ENCODING_DEGRADE_THRESHOLDS:
+                if pressure >= threshold:
+                    level += 1
+            level = min(level, len(DEGRADATION_ORDER) - 1)
+            effective_quality = DEGRADATION_ORDER[level]
+
+        settings = dict(QUALITY_PROFILES[effective_quality])
+        settings.update(PLATFORM_PROFILES[platform])
+        settings["quality"] = effective_quality
+        settings["platform"] = platform
+        settings["degraded"] = effective_quality != quality
+
+        # Fontes 4K: preset um passo mais rápido (custo por frame ~4x maior)
+        if source_height and source_height >= 2160:
+            settings["preset"] = self._faster_preset(settings["preset"])
+
+        settings["threads"] = self._thread_count(source_height)
+        return settings
+
+    def predict_crf_bitrate(self, info: Dict, crf: int, width: int, height: int, fps: float) -> float:
+        """Bitrate esperado do CRF na saída, estimado a partir da complexidade da fonte
+
+        Bits por pixel da fonte (bitrate do ffprobe / pixels por segundo) indicam
+        movimento e detalhe; cada 6 pontos de CRF dobram ou reduzem o bitrate pela metade.
+        """
+        video = info.get("video") or {}
+        src_pixels = (video.get("width") or width) * (video.get("height") or height) * (video.get("fps") or fps)
+        src_bps = max(0, (info.get("bit_rate") or 0) - 128_000)
+        source_bpp = src_bps / src_pixels if src_pixels and src_bps else 0.08
+        bpp = min(max(source_bpp * 0.8, 0.03), 0.25) * 2 ** ((23 - crf) / 6)
+        return bpp * width * height * fps
+
+    def constrain_size(self, settings: Dict, duration: float, info: Dict,
+                       output_size: Optional[tuple] = None, allow_scale: bool = True) -> Dict:
+        """Ajusta o controle de taxa para o arquivo caber em ``settings["max_bytes"]``
+
+        Bitrate alvo = orçamento / duração (menos áudio, contêiner e VBV). O VBV
+        (maxrate/bufsize) garante o teto já no primeiro encode; a estratégia vem
+        da previsão do CRF: se ele já cabe, CRF com teto; senão, ABR no alvo.
+        """
+        max_bytes = settings.get("max_bytes")
+        if not Config.SIZE_TARGETED_ENCODING or not max_bytes or duration <= 0:
+            return dict(settings, rate_control="crf")
+
+        constrained = dict(settings)
+        budget_bits = max_bytes * 8 * (1 - MUX_OVERHEAD)
+        audio_bps = _bitrate_to_bps(settings["audio_bitrate"])
+        video_bps = budget_bits / (duration + VBV_SECONDS) - audio_bps
+        if video_bps < LOW_VIDEO_BPS:
+            constrained["audio_bitrate"] = "64k"
+            video_bps = budget_bits / (duration + VBV_SECONDS) - 64_000
+        video_bps = max(video_bps, MIN_VIDEO_BPS)
+
+        video = info.get("video") or {}
+        width, height = output_size or (video.get("width") or 1280, video.get("height") or 720)
+        fps = settings["fps"]
+
+        # Orçamento apertado demais para a resolução: reduzir a altura
+        if allow_scale and video_bps / (width * height * fps) < MIN_BITS_PER_PIXEL:
+            for target in SCALE_HEIGHTS:
+                if target >= height:
+                    continue
+                scaled_width = width * target / height
+                constrained["scale_height"] = target
+                width, height = scaled_width, target
+                if video_bps / (width * height * fps) >= MIN_BITS_PER_PIXEL:
+                    break
+
+        predicted = self.predict_crf_bitrate(info, settings["crf"], width, height, fps)
+        constrained.update({
+            "rate_control": "capped_crf" if predicted <= video_bps else "abr",
+            "video_bitrate": int(video_bps),
+            "maxrate": int(video_bps),
+            "bufsize": int(video_bps * VBV_SECONDS),
+            "predicted_bitrate": int(predicted),
+        })
+        return constrained
+
+    def encode_report(self, settings: Dict, output_path, duration: float) -> Dict:
+        """Tamanho/bitrate alcançados, para o registro do clip"""
+        size = Path(output_path).stat().st_size if Path(output_path).exists() else 0
+        report = {
+            "file_size": size,
+            "bitrate_kbps": round(size * 8 / duration / 1000, 1) if duration > 0 else 0,
+            "rate_control": settings.get("rate_control", "crf"),
+        }
+        if settings.get("max_bytes"):
+            report["size_limit"] = settings["max_bytes"]
+            report["within_size_limit"] = size <= settings["max_bytes"]
+        if settings.get("video_bitrate"):
+            report["target_video_kbps"] = round(settings["video_bitrate"] / 1000, 1)
+        return report
+
+    def fallback(self, settings: Dict) -> Dict:
+        """Perfil conservador para nova tentativa após falha de encoder/memória:
+        profile main, sem tune, preset mais rápido e metade das threads"""
+        fallback = dict(settings)
+        fallback.update({
+            "preset": self._faster_preset(self._faster_preset(settings["preset"])),
+            "tune": None,
+            "profile": "main",
+            "threads": max(1, settings["threads"] // 2),
+            "fallback": True,
+        })
+        return fallback
+
+    def _faster_preset(self, preset: str) -> str:
+        index = X264_PRESETS.index(preset)
+        return X264_PRESETS[max(0, index - 1)]
+
+    def _thread_count(self, source_height: Optional[int]) -> int:
+        """Divide os núcleos entre encodes simultâneos; x264 escala pouco em baixa resolução"""
+        share = max(1, self.cpu_count // (self.active_encodes + 1))
+        if source_height and source_height <= 720:
+            return min(share, 4)
+        if source_height and source_height <= 1080:
+            return min(share, 8)
+        return min(share, 16)
+
+    def ffmpeg_args(self, settings: Dict) -> List[str]:
+        """Parâmetros de saída no formato de linha de comando do ffmpeg"""
+        args = [
+            '-c:v', 'libx264',
+            '-preset', settings["preset"],
+        ]
+        if settings.get("rate_control") == "abr":
+            args += ['-b:v', str(settings["video_bitrate"])]
+        else:
+            args += ['-crf', str(settings["crf"])]
+        if settings.get("maxrate"):
+            args += ['-maxrate', str(settings["maxrate"]), '-bufsize', str(settings["bufsize"])]
+        if settings.get("scale_height"):
+            args += ['-vf', f'scale=-2:{settings["scale_height"]}']
+        args += [
+            '-profile:v', settings["profile"],
+            '-level', settings["level"],
+            '-pix_fmt', 'yuv420p',
+            '-r', str(settings["fps"]),
+            '-g', str(settings["gop"]),
+            '-threads', str(settings["threads"]),
+        ]
+        if settings.get("tune"):
+            args += ['-tune', settings["tune"]]
+        if settings.get("audio_filter"):
+            args += ['-af', settings["audio_filter"]]
+        args += [
+            '-c:a', 'aac',
+            '-b:a', settings["audio_bitrate"],
+            '-ar', str(settings["audio_rate"]),
+            '-ac', '2',
+            '-movflags', '+faststart',
+        ]
+        return args
+
+    def ffmpeg_kwargs(self, settings: Dict) -> Dict:
+        """Parâmetros de saída no formato do ffmpeg-python"""
+        kwargs = {
+            'vcodec': 'libx264',
+            'preset': settings["preset"],
+            'profile:v': settings["profile"],
+            'level': settings["level"],
+            'pix_fmt': 'yuv420p',
+            'r': settings["fps"],
+            'g': settings["gop"],
+            'threads': settings["threads"],
+            'acodec': 'aac',
+            'ab': settings["audio_bitrate"],
+            'ar': settings["audio_rate"],
+            'ac': 2,
+            'movflags': '+faststart',
+        }
+        if settings.get("rate_control") == "abr":
+            kwargs['b:v'] = settings["video_bitrate"]
+        else:
+            kwargs['crf'] = settings["crf"]
+        if settings.get("maxrate"):
+            kwargs['maxrate'] = settings["maxrate"]
+            kwargs['bufsize'] = settings["bufsize"]
+        if settings.get("scale_height"):
+            kwargs['vf'] = f'scale=-2:{settings["scale_height"]}'
+        if settings.get("tune"):
+            kwargs['tune'] = settings["tune"]
+        if settings.get("audio_filter"):
+            kwargs['af'] = settings["audio_filter"]
+        return kwargs
+
+
+# Instância compartilhada: a pressão da fila é global ao processo
+encoding_profiles = EncodingProfileManager()
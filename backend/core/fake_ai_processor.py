@@ -9,21 +9,16 @@ from typing import List, Dict, Tuple
 import ffmpeg
 from datetime import timedelta
 
+from core.encoding_profiles import encoding_profiles
+from core.ffmpeg_runner import ffmpeg_runner
+from core.media_info import media_info
+from core.loudness import loudness
+from core.seek_planner import plan_clip_seek
+
 class FakeAIProcessor:
     def __init__(self):
-        self.whatsapp_params = {
-            'vcodec': 'libx264',
-            'preset': 'medium',
-            'profile:v': 'high',
-            'level': '4.0',
-            'pix_fmt': 'yuv420p',
-            'r': 30,
-            'g': 60,
-            'acodec': 'aac',
-            'ab': '128k',
-            'ar': 44100,
-            'ac': 2
-        }
+        # Perfil WhatsApp compartilhado (preset/CRF/threads escolhidos por encode)
+        self.platform = "whatsapp"
         
         # Templates de títulos "inteligentes"
         self.smart_titles = [
@@ -52,14 +47,19 @@ class FakeAIProcessor:
         ]
 
     def get_video_duration(self, video_path: str) -> float:
-        """Obter duração real do vídeo"""
+        """Obter duração real do vídeo (cache do serviço de mídia)"""
         try:
-            probe = ffmpeg.probe(video_path)
-            duration = float(probe['streams'][0]['duration'])
-            return duration
+            return media_info.probe(video_path)["duration"]
         except:
             return 0.0
 
+    def get_video_height(self, video_path: str) -> int:
+        """Obter altura do primeiro stream de vídeo (0 se desconhecida)"""
+        try:
+            return media_info.probe(video_path)["video"]["height"]
+        except:
+            return 0
+
     def simulate_ai_analysis(self, video_path: str) -> Dict:
         """Simula análise de IA com delay realista"""
         duration = self.get_video_duration(video_path)
@@ -151,16 +151,33 @@ class FakeAIProcessor:
                          start_time: float, duration: float) -> bool:
         """Cortar segmento com qualidade WhatsApp perfeita"""
         try:
-            (
-                ffmpeg
-                .input(input_path, ss=start_time, t=duration)
-                .output(
-                    output_path,
-                    **self.whatsapp_params,
-                    movflags='faststart'  # Otimização para streaming
+            settings = encoding_profiles.select(
+                platform=self.platform,
+                source_height=self.get_video_height(input_path)
+            )
+            settings = encoding_profiles.constrain_size(settings, duration, media_info.probe(input_path))
+            settings["audio_filter"] = loudness.gain_filter(input_path, start_time, duration)
+            # Seek rápido até o keyframe anterior + seek curto e preciso na saída
+            plan = plan_clip_seek(input_path, start_time, duration)
+            input_kwargs = {'ss': plan['input_seek']}
+            if not plan['accurate_input']:
+                input_kwargs['noaccurate_seek'] = None
+            output_kwargs = {'t': plan['duration']}
+            if plan['output_seek'] > 0:
+                output_kwargs['ss'] = plan['output_seek']
+            
+            def build_cmd(current: Dict) -> List[str]:
+                return (
+                    ffmpeg
+                    .input(input_path, **input_kwargs)
+                    .output(output_path, **output_kwargs, **encoding_profiles.ffmpeg_kwargs(current))
+                    .overwrite_output()
+                    .compile()
                 )
-                .overwrite_output()
-                .run(quiet=True)
+            
+            ffmpeg_runner.run_encode(
+                build_cmd, settings, "ffmpeg:corte",
+                media_seconds=duration, output_path=output_path
             )
             return True
         except Exception as e:
@@ -0,0 +1,304 @@
+"""
+Execução robusta de ffmpeg: stderr limitado, classificação de falhas,
+nova tentativa com perfil de fallback, timeout e limite de memória por
+processo, e grupos de processos para matar filhos de jobs cancelados
+"""
+
+import os
+import resource
+import signal
+import subprocess
+import tempfile
+import threading
+import time
+from typing import Callable, Dict, Iterator, List, Optional, Tuple, Union
+
+from config import Config
+from core.encoding_profiles import encoding_profiles
+from utils.tracing import current_job, tracer
+
+# Trechos do stderr do ffmpeg -> tipo de falha (primeiro que casar vence)
+FAILURE_PATTERNS = [
+    ("bad_input", [
+        "Invalid data found when processing input",
+        "moov atom not found",
+        "No such file or directory",
+        "could not find codec parameters",
+        "Error opening input",
+        "does not contain any stream",
+    ]),
+    ("seek_past_end", [
+        "Output file is empty, nothing was encoded",
+        "nothing was encoded",
+    ]),
+    ("memory", [
+        "Cannot allocate memory",
+        "std::bad_alloc",
+        "Out of memory",
+    ]),
+    ("encoder_error", [
+        "Error initializing output stream",
+        "Error while opening encoder",
+        "Unknown encoder",
+        "Error while encoding",
+        "Error submitting",
+        "Conversion failed",
+    ]),
+]
+
+# Falhas que podem passar com outro perfil (ou com menos threads/memória)
+TRANSIENT_FAILURES = {"encoder_error", "memory", "crash"}
+
+
+class FFmpegError(Exception):
+    def __init__(self, kind: str, message: str, stderr_tail: str = "", returncode: Optional[int] = None):
+        super().__init__(message)
+        self.kind = kind
+        self.stderr_tail = stderr_tail
+        self.returncode = returncode
+
+    def to_dict(self) -> Dict:
+        """Formato registrado no clip/job"""
+        return {"kind": self.kind, "message": str(self), "stderr": self.stderr_tail[-500:]}
+
+
+def classify_failure(stderr: str, returncode: Optional[int]) -> str:
+    for kind, patterns in FAILURE_PATTERNS:
+        if any(pattern in stderr for pattern in patterns):
+            return kind
+    if returncode is not None and returncode < 0:
+        return "crash"  # Sinal (ex.: SIGSEGV/SIGABRT ao estourar RLIMIT_AS)
+    return "unknown"
+
+
+def _read_tail(f, limit: int) -> str:
+    f.seek(0, os.SEEK_END)
+    size = f.tell()
+    f.seek(max(0, size - limit))
+    return f.read().decode(errors="replace")
+
+
+def _output_paths(output_path: Union[str, List[str], None]) -> List[str]:
+    """Um caminho ou a lista de saídas de um ffmpeg com vários destinos"""
+    if not output_path:
+        return []
+    return [output_path] if isinstance(output_path, str) else list(output_path)
+
+
+class FFmpegRunner:
+    def __init__(self):
+        self.stderr_limit = Config.FFMPEG_STDERR_TAIL_BYTES
+        self.memory_limit = Config.FFMPEG_MEMORY_LIMIT_MB * 1024 * 1024
+        self._lock = threading.Lock()
+        # pid -> (processo vivo, job_id do dono ou None), para cancelamento
+        self._processes: Dict[int, Tuple[subprocess.Popen, Optional[str]]] = {}
+        self._killed: Dict[int, str] = {}  # pid -> motivo (timeout / cancelled)
+
+    def timeout_for(self, media_seconds: Optional[float]) -> float:
+        """Timeout proporcional à mídia processada (com piso)"""
+        if not media_seconds:
+            return Config.FFMPEG_TIMEOUT
+        return Config.FFMPEG_TIMEOUT_MIN + Config.FFMPEG_TIMEOUT_PER_MEDIA_SECOND * media_seconds
+
+    def _limit_memory(self, pid: int):
+        if self.memory_limit and hasattr(resource, "prlimit"):
+            try:
+                resource.prlimit(pid, resource.RLIMIT_AS, (self.memory_limit, self.memory_limit))
+            except (OSError, ValueError):
+                pass
+
+    def _kill_group(self, process: subprocess.Popen, reason: str):
+        """SIGKILL no grupo inteiro (ffmpeg e eventuais filhos dele)"""
+        with self._lock:
+            if process.pid not in self._processes:
+                return  # Já terminou e foi coletado
+            self._killed[process.pid] = reason
+            try:
+                os.killpg(process.pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+
+    def register(self, process, job_id: Optional[str]):
+        """Processo iniciado fora do runner (ex.: ffmpeg assíncrono do upload), em grupo próprio
+
+        Passa a ser morto por ``kill_job``/``kill_all``; ``unregister`` quando terminar.
+        """
+        self._limit_memory(process.pid)
+        with self._lock:
+            self._processes[process.pid] = (process, job_id)
+
+    def unregister(self, process) -> Optional[str]:
+        """Remove o registro; retorna o motivo se o processo foi morto pelo runner"""
+        with self._lock:
+            self._processes.pop(process.pid, None)
+            return self._killed.pop(process.pid, None)
+
+    def kill_job(self, job: Dict) -> int:
+        """Mata todos os processos ffmpeg em andamento de um job; retorna quantos"""
+        with self._lock:
+            processes = [p for p, owner in self._processes.values() if owner == job["job_id"]]
+        for process in processes:
+            self._kill_group(process, "cancelled")
+        return len(processes)
+
+    def kill_all(self) -> int:
+        """Encerramento do servidor: nenhum ffmpeg sobrevive ao processo da API"""
+        with self._lock:
+            processes = [p for p, _ in self._processes.values()]
+        for process in processes:
+            self._kill_group(process, "cancelled")
+        return len(processes)
+
+    def _start(self, cmd: List[str], label: str, stdout, stderr, timeout: float
+               ) -> Tuple[subprocess.Popen, threading.Timer]:
+        """Inicia o processo supervisionado (grupo próprio, RLIMIT, registro do job, timer)"""
+        job = current_job()
+        if job is not None and job.get("cancelled"):
+            # Job cancelado: nada novo começa (tarefas pendentes caem aqui)
+            raise FFmpegError("cancelled", f"{label}: job cancelado")
+        try:
+            process = subprocess.Popen(cmd, stdout=stdout, stderr=stderr, start_new_session=True)
+        except OSError as e:
+            raise FFmpegError("bad_input", f"{label}: não foi possível executar {cmd[0]}: {e}")
+        self._limit_memory(process.pid)
+
+        with self._lock:
+            self._processes[process.pid] = (process, job.get("job_id") if job is not None else None)
+        timer = threading.Timer(timeout, self._kill_group, (process, "timeout"))
+        timer.daemon = True
+        timer.start()
+        return process, timer
+
+    def _wait(self, process: subprocess.Popen, timer: threading.Timer, label: str, start: float,
+              err, timeout: float, media_seconds: Optional[float] = None,
+              output_path: Union[str, List[str], None] = None) -> str:
+        """Coleta o processo, registra no trace e levanta FFmpegError classificado; retorna o stderr"""
+        try:
+            _, status, usage = os.wait4(process.pid, 0)
+        finally:
+            timer.cancel()
+            with self._lock:
+                killed = self._killed.pop(process.pid, None)
+                self._processes.pop(process.pid, None)
+
+        wall = time.perf_counter() - start
+        process.returncode = os.waitstatus_to_exitcode(status)
+        tracer.record_process(label, wall, usage, process.returncode, media_seconds)
+
+        stderr_tail = _read_tail(err, self.stderr_limit)
+        if killed == "timeout":
+            raise FFmpegError("timeout", f"{label}: excedeu {timeout:.0f}s", stderr_tail, process.returncode)
+        if killed == "cancelled":
+            raise FFmpegError("cancelled", f"{label}: cancelado", stderr_tail, process.returncode)
+        if process.returncode != 0:
+            kind = classify_failure(stderr_tail, process.returncode)
+            last_line = stderr_tail.strip().splitlines()[-1] if stderr_tail.strip() else ""
+            raise FFmpegError(
+                kind, f"{label}: {kind} (código {process.returncode}) {last_line}".strip(),
+                stderr_tail, process.returncode
+            )
+        empty = [
+            path for path in _output_paths(output_path)
+            if not os.path.exists(path) or os.path.getsize(path) == 0
+        ]
+        if empty:
+            kind = classify_failure(stderr_tail, 0)
+            kind = kind if kind != "unknown" else "seek_past_end"
+            names = ", ".join(os.path.basename(path) for path in empty)
+            raise FFmpegError(kind, f"{label}: saída vazia ({names})", stderr_tail, 0)
+        return stderr_tail
+
+    def run(
+        self,
+        cmd: List[str],
+        label: str,
+        media_seconds: Optional[float] = None,
+        output_path: Union[str, List[str], None] = None,
+        timeout: Optional[float] = None,
+    ) -> subprocess.CompletedProcess:
+        """Executa um ffmpeg/ffprobe; levanta FFmpegError classificado em caso de falha
+
+        ``output_path`` (um caminho ou a lista de saídas) é verificado ao final:
+        qualquer saída ausente ou vazia com código 0 (ex.: seek além do fim)
+        também é falha.
+        """
+        timeout = timeout or self.timeout_for(media_seconds)
+
+        with tempfile.TemporaryFile() as out, tempfile.TemporaryFile() as err:
+            start = time.perf_counter()
+            process, timer = self._start(cmd, label, out, err, timeout)
+            stderr_tail = self._wait(process, timer, label, start, err, timeout, media_seconds, output_path)
+            out.seek(0)
+            return subprocess.CompletedProcess(cmd, process.returncode, out.read(), stderr_tail)
+
+    def stream(
+        self,
+        cmd: List[str],
+        label: str,
+        chunk_size: int,
+        media_seconds: Optional[float] = None,
+        timeout: Optional[float] = None,
+    ) -> Iterator[bytes]:
+        """Executa um ffmpeg/ffprobe lendo o stdout em blocos de ``chunk_size`` bytes
+
+        Mesma supervisão de ``run`` (timeout, RLIMIT, cancelamento, trace), mas a
+        saída nunca fica inteira em memória. Só o último bloco pode ser menor;
+        falhas levantam FFmpegError depois do último bloco.
+        """
+        timeout = timeout or self.timeout_for(media_seconds)
+
+        with tempfile.TemporaryFile() as err:
+            start = time.perf_counter()
+            process, timer = self._start(cmd, label, subprocess.PIPE, err, timeout)
+            finished = False
+            try:
+                while True:
+                    chunk = process.stdout.read(chunk_size)
+                    if not chunk:
+                        break
+                    yield chunk
+                finished = True
+            finally:
+                if not finished:
+                    # Consumidor parou antes do fim: o processo não fica órfão
+                    self._kill_group(process, "cancelled")
+                process.stdout.close()
+                try:
+                    self._wait(process, timer, label, start, err, timeout, media_seconds)
+                except FFmpegError:
+                    if finished:
+                        raise
+
+    def run_encode(
+        self,
+        build_cmd: Callable[[Dict], List[str]],
+        settings: Dict,
+        label: str,
+        media_seconds: Optional[float] = None,
+        output_path: Union[str, List[str], None] = None,
+    ) -> Dict:
+        """Encode com nova tentativa: falhas transitórias repetem com o perfil de fallback
+
+        Retorna as configurações efetivamente usadas.
+        """
+        attempts = [settings]
+        for _ in range(Config.FFMPEG_MAX_RETRIES):
+            attempts.append(encoding_profiles.fallback(attempts[-1]))
+
+        for attempt, current in enumerate(attempts):
+            try:
+                with encoding_profiles.encode_slot():
+                    self.run(build_cmd(current), label, media_seconds, output_path)
+                return current
+            except FFmpegError as e:
+                # Saída parcial (processo morto, encode falho) nunca fica para trás
+                for path in _output_paths(output_path):
+                    if os.path.exists(path):
+                        os.remove(path)
+                if e.kind not in TRANSIENT_FAILURES or attempt == len(attempts) - 1:
+                    raise
+                print(f"⚠️ {label}: {e.kind}, repetindo com perfil de fallback")
+
+
+# Instância compartilhada: registro de processos por job para cancelamento
+ffmpeg_runner = FFmpegRunner()
@@ -0,0 +1,68 @@
+"""
+Utilidades para montar argumentos e filtros do FFmpeg e ler a saída de
+(a)metadata=mode=print (ebur128, astats, scdet) como séries por segundo
+"""
+
+from pathlib import Path
+from typing import Tuple
+
+import numpy as np
+
+SILENCE_DB = -70.0  # piso para -inf / trechos sem áudio
+
+
+def escape_filter_value(value: str) -> str:
+    """Escapar um valor (ex.: caminho de arquivo) para uso dentro de um filtergraph
+
+    O FFmpeg aplica dois níveis de escape: o da opção do filtro
+    (``\\``, ``'`` e ``:``) e o do filtergraph (``\\ ' [ ] , ;``).
+    """
+    escaped = value.replace("\\", "\\\\").replace("'", "\\'").replace(":", "\\:")
+    for char in "\\'[],;":
+        escaped = escaped.replace(char, "\\" + char)
+    return escaped
+
+
+def parse_metadata(path: Path, key: str) -> Tuple[np.ndarray, np.ndarray]:
+    """Arquivo de (a)metadata=mode=print -> (tempos, valores)"""
+    times, values = [], []
+    current_time = None
+    prefix = key + "="
+    with open(path, "r") as f:
+        for line in f:
+            if line.startswith("frame:"):
+                _, _, rest = line.partition("pts_time:")
+                try:
+                    current_time = float(rest.split()[0])
+                except (IndexError, ValueError):
+                    current_time = None
+            elif line.startswith(prefix) and current_time is not None:
+                try:
+                    values.append(float(line[len(prefix):]))
+                    times.append(current_time)
+                except ValueError:
+                    pass
+    return np.array(times, dtype=np.float64), np.array(values, dtype=np.float64)
+
+
+def per_second(times: np.ndarray, values: np.ndarray, seconds: int,
+                reducer: str = "mean", fill: float = 0.0) -> np.ndarray:
+    """Agrega amostras irregulares em uma série de 1 valor por segundo"""
+    series = np.full(seconds, fill, dtype=np.float64)
+    if len(times) == 0:
+        return series
+    index = np.clip(times.astype(np.int64), 0, seconds - 1)
+    if reducer == "max":
+        np.maximum.at(series, index, values)
+        return series
+    sums = np.bincount(index, weights=values, minlength=seconds)
+    counts = np.bincount(index, minlength=seconds)
+    np.divide(sums, counts, out=series, where=counts > 0)
+    return series
+
+
+def level_series(path: Path, key: str, seconds: int) -> np.ndarray:
+    """Níveis em dB por segundo; -inf/nan viram o piso antes da média"""
+    times, values = parse_metadata(path, key)
+    values = np.nan_to_num(np.maximum(values, SILENCE_DB), nan=SILENCE_DB)
+    return per_second(times, values, seconds, fill=SILENCE_DB)
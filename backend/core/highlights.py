@@ -0,0 +1,192 @@
+"""
+Motor de destaques barato (sem Whisper/transformers)
+Um único ffmpeg em streaming mede loudness (ebur128), energia na banda de voz
+(astats) e mudanças de cena (scdet em baixa resolução); as séries por segundo
+viram arrays NumPy e as janelas de clip são pontuadas a partir delas
+"""
+
+import tempfile
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+
+from config import Config
+from core.ffmpeg_runner import ffmpeg_runner
+from core.ffmpeg_utils import SILENCE_DB, escape_filter_value, level_series, parse_metadata, per_second
+from core.media_info import media_info
+from utils.streaming_ingest import AUDIO_NAME, PROXY_NAME
+
+WINDOW_LENGTHS = [30, 45, 60]  # durações candidatas (segundos), limitadas pela Config
+SNAP_SECONDS = 3  # início do clip pode andar até 3s para cair num corte de cena ou pausa
+MAX_OVERLAP = 0.2  # sobreposição máxima entre clips escolhidos
+
+# Peso de cada sinal na nota por segundo
+SIGNAL_WEIGHTS = {"speech": 0.45, "loudness": 0.35, "scene": 0.20}
+
+
+class HighlightEngine:
+    def __init__(self):
+        self.analysis_fps = 5
+        self.analysis_width = 160
+        self._series: Dict[str, Dict[str, np.ndarray]] = {}
+
+    def _series_path(self, video_path: Path) -> Path:
+        return video_path.with_name(video_path.name + ".highlights.npz")
+
+    def _command(self, video_path: Path, info: Dict, files: Dict[str, Path]) -> List[str]:
+        """Um passe: áudio 16k/proxy quando existem (ingestão), senão a própria fonte"""
+        audio_source = video_path.parent / AUDIO_NAME
+        proxy_source = video_path.parent / PROXY_NAME
+        audio_source = audio_source if audio_source.exists() else video_path
+        video_source = proxy_source if proxy_source.exists() else video_path
+
+        cmd = ['ffmpeg', '-nostats', '-v', 'error', '-threads', '1', '-i', str(audio_source)]
+        chains = [
+            "[0:a:0]aformat=channel_layouts=mono,asplit=2[loud][voice]",
+            "[loud]ebur128=metadata=1,ametadata=mode=print:key=lavfi.r128.M"
+            f":file={escape_filter_value(str(files['loudness']))}[loud_out]",
+            # Banda de voz (300-3400 Hz) em blocos de 1s: um RMS por segundo
+            "[voice]highpass=f=300,lowpass=f=3400,aresample=8000,asetnsamples=n=8000,"
+            "astats=metadata=1:reset=1,ametadata=mode=print:key=lavfi.astats.Overall.RMS_level"
+            f":file={escape_filter_value(str(files['speech']))}[voice_out]",
+        ]
+        outputs = ['loud_out', 'voice_out']
+
+        if info["video"] is not None:
+            cmd += ['-threads', '1', '-i', str(video_source)]
+            chains.append(
+                f"[1:v:0]fps={self.analysis_fps},scale={self.analysis_width}:-2,"
+                "scdet=threshold=100,metadata=mode=print:key=lavfi.scd.score"
+                f":file={escape_filter_value(str(files['scene']))}[scene_out]"
+            )
+            outputs.append('scene_out')
+
+        cmd += ['-filter_complex', ";".join(chains)]
+        for label in outputs:
+            cmd += ['-map', f'[{label}]', '-f', 'null', '-']
+        return cmd
+
+    def analyze(self, video_path) -> Dict[str, np.ndarray]:
+        """Séries por segundo: loudness (LUFS), voz (dB RMS na banda de fala), cena (score scdet)"""
+        video_path = Path(video_path)
+        key = str(video_path)
+        if key in self._series:
+            return self._series[key]
+
+        series_path = self._series_path(video_path)
+        if series_path.exists():
+            with np.load(series_path) as data:
+                series = {name: data[name] for name in data.files}
+            self._series[key] = series
+            return series
+
+        info = media_info.probe(video_path)
+        if info["audio"] is None:
+            raise ValueError("Fonte sem áudio: motor de destaques indisponível")
+        seconds = max(1, int(np.ceil(info["duration"])))
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            files = {name: Path(temp_dir) / f"{name}.txt" for name in ("loudness", "speech", "scene")}
+            ffmpeg_runner.run(
+                self._command(video_path, info, files), "ffmpeg:destaques",
+                timeout=ffmpeg_runner.timeout_for(info["duration"])
+            )
+
+            series = {
+                "loudness": level_series(files["loudness"], "lavfi.r128.M", seconds),
+                "speech": level_series(files["speech"], "lavfi.astats.Overall.RMS_level", seconds),
+                "scene": (
+                    per_second(*parse_metadata(files["scene"], "lavfi.scd.score"), seconds, reducer="max")
+                    if files["scene"].exists() else np.zeros(seconds)
+                ),
+            }
+
+        np.savez_compressed(series_path, **series)
+        self._series[key] = series
+        return series
+
+    def score_seconds(self, series: Dict[str, np.ndarray]) -> np.ndarray:
+        """Nota 0..1 por segundo combinando fala, volume relativo e cortes de cena"""
+        # Atividade de fala: 0 em -50 dB, 1 em -25 dB na banda de voz
+        speech = np.clip((series["speech"] + 50.0) / 25.0, 0.0, 1.0)
+
+        # Volume relativo ao próprio vídeo (z-score limitado), ignorando silêncio
+        loudness = series["loudness"]
+        audible = loudness[loudness > SILENCE_DB + 1]
+        if len(audible) > 1:
+            z = (loudness - np.median(audible)) / (audible.std() + 1e-6)
+            loud = (np.clip(z, -2.0, 2.0) + 2.0) / 4.0
+        else:
+            loud = np.zeros_like(loudness)
+        loud[loudness <= SILENCE_DB + 1] = 0.0
+
+        scene = series["scene"]
+        reference = np.percentile(scene, 95) if scene.any() else 0.0
+        scene_norm = np.clip(scene / reference, 0.0, 1.0) if reference > 0 else np.zeros_like(scene)
+
+        return (
+            SIGNAL_WEIGHTS["speech"] * speech
+            + SIGNAL_WEIGHTS["loudness"] * loud
+            + SIGNAL_WEIGHTS["scene"] * scene_norm
+        )
+
+    def _snap_start(self, start: int, length: int, series: Dict[str, np.ndarray]) -> int:
+        """Move o início para o corte de cena mais forte ou a pausa de fala mais próxima"""
+        total = len(series["speech"])
+        low = max(0, start - SNAP_SECONDS)
+        high = min(total - length, start + SNAP_SECONDS)
+        if high <= low:
+            return start
+        candidates = np.arange(low, high + 1)
+        scene = series["scene"][candidates]
+        if scene.max() > 0:
+            return int(candidates[np.argmax(scene)])
+        return int(candidates[np.argmin(series["speech"][candidates])])
+
+    def select_windows(self, series: Dict[str, np.ndarray], count: int) -> List[Dict]:
+        """Melhores janelas sem sobreposição relevante, com a nota média de cada uma"""
+        per_second = self.score_seconds(series)
+        total = len(per_second)
+        cumulative = np.concatenate([[0.0], np.cumsum(per_second)])
+
+        lengths = sorted({
+            min(max(length, Config.MIN_CLIP_DURATION), Config.MAX_CLIP_DURATION)
+            for length in WINDOW_LENGTHS
+        })
+        lengths = [length for length in lengths if length <= total] or [total]
+
+        candidates = []
+        for length in lengths:
+            means = (cumulative[length:] - cumulative[:-length]) / length
+            for start in np.argsort(means)[::-1]:
+                candidates.append((float(means[start]), int(start), length))
+        candidates.sort(reverse=True)
+
+        chosen: List[Dict] = []
+        for score, start, length in candidates:
+            start = self._snap_start(start, length, series)
+            end = start + length
+            overlaps = any(
+                min(end, c["end"]) - max(start, c["start"]) > MAX_OVERLAP * min(length, c["end"] - c["start"])
+                for c in chosen
+            )
+            if overlaps:
+                continue
+            window = slice(start, end)
+            chosen.append({
+                "start": start,
+                "end": end,
+                "score": score,
+                "speech_ratio": float(np.mean(series["speech"][window] > -40.0)),
+                "loudness": float(np.mean(series["loudness"][window])),
+                "scene_changes": int(np.sum(series["scene"][window] >= Config.HIGHLIGHT_SCENE_THRESHOLD)),
+            })
+            if len(chosen) >= count:
+                break
+
+        return chosen
+
+    def find_highlights(self, video_path, count: int) -> List[Dict]:
+        """Análise (em cache) + seleção das melhores janelas"""
+        return self.select_windows(self.analyze(video_path), count)
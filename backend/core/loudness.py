@@ -0,0 +1,141 @@
+"""
+Loudness EBU R128 medido uma vez por fonte
+Integrado, LRA e série de curto prazo (3s) por segundo ficam junto das
+informações de mídia; cada clip recebe um ganho linear calculado dessa
+série, aplicado no mesmo passe do encode
+"""
+
+import tempfile
+import threading
+from pathlib import Path
+from typing import Dict, Optional
+
+import numpy as np
+
+from config import Config
+from core.ffmpeg_runner import ffmpeg_runner, FFmpegError
+from core.ffmpeg_utils import SILENCE_DB, escape_filter_value, level_series, parse_metadata
+from core.media_info import media_info
+from utils.streaming_ingest import LOUDNESS_NAME
+
+RELATIVE_GATE_LU = 10.0  # porta relativa do BS.1770 (abaixo da média)
+MIN_GAIN_DB = 0.5  # ganhos menores que isso não justificam o filtro
+
+
+def _last_value(path: Path, key: str) -> float:
+    """Último valor de uma chave cumulativa do ebur128 (I, LRA) = valor da fonte inteira"""
+    _, values = parse_metadata(path, key)
+    return float(values[-1]) if len(values) else SILENCE_DB
+
+
+def gated_loudness(levels: np.ndarray) -> Optional[float]:
+    """Loudness de um trecho a partir de níveis em LUFS, com portas absoluta e relativa"""
+    levels = levels[levels > SILENCE_DB]
+    if len(levels) == 0:
+        return None
+    energy = 10 ** (levels / 10)
+    threshold = 10 * np.log10(energy.mean()) - RELATIVE_GATE_LU
+    gated = energy[levels > threshold]
+    return float(10 * np.log10(gated.mean())) if len(gated) else None
+
+
+class LoudnessService:
+    def __init__(self):
+        self._locks: Dict[str, threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+
+    def _lock_for(self, key: str) -> threading.Lock:
+        with self._locks_guard:
+            return self._locks.setdefault(key, threading.Lock())
+
+    def _summarize(self, path: Path, duration: float, require_complete: bool = False) -> Optional[Dict]:
+        """Arquivo do ebur128 (ametadata=mode=print) -> resumo guardado no media info
+
+        Com ``require_complete``, None se a medição não cobre a fonte inteira
+        (ingestão interrompida).
+        """
+        times, _ = parse_metadata(path, "lavfi.r128.I")
+        if require_complete and (len(times) == 0 or times[-1] < duration - 2):
+            return None
+        seconds = max(1, int(np.ceil(duration)))
+        short_term = level_series(path, "lavfi.r128.S", seconds)
+        return {
+            "integrated": round(_last_value(path, "lavfi.r128.I"), 2),
+            "lra": round(_last_value(path, "lavfi.r128.LRA"), 2),
+            "short_term": [round(float(level), 1) for level in short_term],
+        }
+
+    def _measure_source(self, video_path: Path, duration: float) -> Dict:
+        """Passe só de áudio na fonte (quando a ingestão não mediu)"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            metadata_path = Path(temp_dir) / LOUDNESS_NAME
+            cmd = [
+                'ffmpeg', '-nostats', '-v', 'error', '-threads', '1',
+                '-i', str(video_path), '-map', '0:a:0', '-vn', '-sn', '-dn',
+                '-af', f"ebur128=metadata=1,ametadata=mode=print:file={escape_filter_value(str(metadata_path))}",
+                '-f', 'null', '-'
+            ]
+            ffmpeg_runner.run(cmd, "ffmpeg:loudness", timeout=ffmpeg_runner.timeout_for(duration))
+            return self._summarize(metadata_path, duration)
+
+    def measure(self, video_path) -> Optional[Dict]:
+        """Loudness da fonte (integrado, LRA, série de curto prazo); None sem áudio"""
+        video_path = Path(video_path)
+        info = media_info.probe(video_path)
+        if "loudness" in info:
+            return info["loudness"]
+        if info["audio"] is None:
+            return None
+
+        with self._lock_for(str(video_path.resolve())):
+            info = media_info.probe(video_path)
+            if "loudness" in info:
+                return info["loudness"]
+
+            # Medição feita durante o upload (utils/streaming_ingest.py)
+            ingest_path = video_path.parent / LOUDNESS_NAME
+            summary = None
+            if ingest_path.exists():
+                summary = self._summarize(ingest_path, info["duration"], require_complete=True)
+            if summary is None:
+                summary = self._measure_source(video_path, info["duration"])
+            media_info.update(video_path, loudness=summary)
+            ingest_path.unlink(missing_ok=True)
+            return summary
+
+    def gain_filter(self, video_path, start_time: float, duration: float) -> Optional[str]:
+        """Filtro de áudio que leva o trecho ao alvo (volume linear + limitador se amplificar)
+
+        O loudness do trecho sai da série de curto prazo da fonte: nenhum
+        passe de medição por clip.
+        """
+        if not Config.LOUDNESS_NORMALIZATION:
+            return None
+        try:
+            summary = self.measure(video_path)
+        except (FFmpegError, RuntimeError, OSError) as e:
+            print(f"⚠️ Medição de loudness falhou, áudio sem normalização: {e}")
+            return None
+        if not summary:
+            return None
+
+        series = np.array(summary["short_term"], dtype=np.float64)
+        first = max(0, int(start_time))
+        level = gated_loudness(series[first:int(np.ceil(start_time + duration))])
+        if level is None:
+            level = summary["integrated"] if summary["integrated"] > SILENCE_DB else None
+        if level is None:
+            return None  # Trecho em silêncio: nada a normalizar
+
+        gain = float(np.clip(Config.LOUDNESS_TARGET_LUFS - level, -Config.LOUDNESS_MAX_GAIN_DB,
+                             Config.LOUDNESS_MAX_GAIN_DB))
+        if abs(gain) < MIN_GAIN_DB:
+            return None
+        if gain < 0:
+            return f"volume={gain:.2f}dB"
+        limit = 10 ** (Config.LOUDNESS_TRUE_PEAK_DB / 20)
+        return f"volume={gain:.2f}dB,alimiter=limit={limit:.3f}:level=0"
+
+
+# Instância compartilhada: uma medição por fonte para todo o processo
+loudness = LoudnessService()
@@ -0,0 +1,167 @@
+"""
+Serviço de informações de mídia: um único ffprobe por upload
+Formato, streams e índice de keyframes ficam em cache (memória + JSON
+ao lado do arquivo) e atendem todos os processadores
+"""
+
+import json
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from core.ffmpeg_runner import ffmpeg_runner
+
+PROBE_READ_SIZE = 64 * 1024
+
+
+def _parse_rate(rate: str) -> float:
+    """Converter '30000/1001' em fps"""
+    try:
+        num, _, den = rate.partition("/")
+        return float(num) / float(den or 1)
+    except (ValueError, ZeroDivisionError):
+        return 0.0
+
+
+def _to_float(value: Optional[str]) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+class MediaInfoService:
+    def __init__(self):
+        self._cache: Dict[str, Dict] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+
+    def _info_path(self, video_path: Path) -> Path:
+        return video_path.with_name(video_path.name + ".mediainfo.json")
+
+    def _run_ffprobe(self, video_path: Path) -> Dict:
+        """Uma chamada ao ffprobe: formato, streams e flags de cada pacote"""
+        cmd = [
+            'ffprobe', '-v', 'error',
+            '-show_entries',
+            'format=duration,size,bit_rate,format_name'
+            ':stream=index,codec_type,codec_name,width,height,r_frame_rate,'
+            'sample_rate,channels,duration'
+            ':packet=stream_index,pts_time,flags',
+            '-of', 'compact',
+            str(video_path)
+        ]
+
+        info = {"format": {}, "streams": []}
+        keyframes: Dict[int, List[float]] = {}
+
+        # Saída compacta lida do pipe linha a linha (não carrega milhões de pacotes
+        # em memória), sob a supervisão do runner: timeout, RLIMIT, cancelamento
+        pending = b""
+        for chunk in ffmpeg_runner.stream(cmd, "ffprobe", PROBE_READ_SIZE):
+            lines = (pending + chunk).split(b"\n")
+            pending = lines.pop()
+            for line in lines:
+                self._parse_line(line.decode(errors="replace"), info, keyframes)
+        if pending:
+            self._parse_line(pending.decode(errors="replace"), info, keyframes)
+
+        return self._summarize(info, keyframes)
+
+    def _parse_line(self, line: str, info: Dict, keyframes: Dict[int, List[float]]):
+        """Uma linha do formato compacto: 'secao|chave=valor|...'"""
+        section, _, rest = line.partition("|")
+        fields = dict(item.partition("=")[::2] for item in rest.split("|") if item)
+        if section == "packet":
+            if "K" in fields.get("flags", "") and fields.get("pts_time") not in (None, "N/A"):
+                keyframes.setdefault(int(fields["stream_index"]), []).append(float(fields["pts_time"]))
+        elif section == "stream":
+            info["streams"].append(fields)
+        elif section == "format":
+            info["format"] = fields
+
+    def _summarize(self, info: Dict, keyframes: Dict[int, List[float]]) -> Dict:
+        fmt = info["format"]
+        video = next((s for s in info["streams"] if s.get("codec_type") == "video"), None)
+        audio = next((s for s in info["streams"] if s.get("codec_type") == "audio"), None)
+
+        duration = _to_float(fmt.get("duration"))
+        if not duration and video:
+            duration = _to_float(video.get("duration"))
+
+        summary = {
+            "duration": duration,
+            "size": int(_to_float(fmt.get("size"))),
+            "bit_rate": int(_to_float(fmt.get("bit_rate"))),
+            "format_name": fmt.get("format_name", ""),
+            "video": None,
+            "audio": None,
+            "keyframes": [],
+        }
+
+        if video:
+            index = int(video["index"])
+            summary["video"] = {
+                "stream_index": index,
+                "codec": video.get("codec_name", ""),
+                "width": int(_to_float(video.get("width"))),
+                "height": int(_to_float(video.get("height"))),
+                "fps": round(_parse_rate(video.get("r_frame_rate", "0/1")), 3),
+            }
+            summary["keyframes"] = sorted(round(t, 6) for t in keyframes.get(index, []))
+
+        if audio:
+            summary["audio"] = {
+                "stream_index": int(audio["index"]),
+                "codec": audio.get("codec_name", ""),
+                "sample_rate": int(_to_float(audio.get("sample_rate"))),
+                "channels": int(_to_float(audio.get("channels"))),
+            }
+
+        return summary
+
+    def _lock_for(self, key: str) -> threading.Lock:
+        with self._locks_guard:
+            return self._locks.setdefault(key, threading.Lock())
+
+    def probe(self, video_path) -> Dict:
+        """Informações da mídia (ffprobe só na primeira chamada por arquivo)"""
+        video_path = Path(video_path)
+        key = str(video_path.resolve())
+        if key in self._cache:
+            return self._cache[key]
+
+        with self._lock_for(key):
+            if key in self._cache:
+                return self._cache[key]
+
+            info_path = self._info_path(video_path)
+            if info_path.exists():
+                with open(info_path, "r") as f:
+                    info = json.load(f)
+            else:
+                info = self._run_ffprobe(video_path)
+                with open(info_path, "w") as f:
+                    json.dump(info, f)
+
+            self._cache[key] = info
+            return info
+
+    def update(self, video_path, **fields) -> Dict:
+        """Acrescenta medições derivadas (ex.: loudness) ao cache e ao JSON"""
+        video_path = Path(video_path)
+        key = str(video_path.resolve())
+        info = dict(self.probe(video_path), **fields)
+
+        with self._lock_for(key):
+            info_path = self._info_path(video_path)
+            temp_path = info_path.with_name(info_path.name + ".part")
+            with open(temp_path, "w") as f:
+                json.dump(info, f)
+            temp_path.replace(info_path)
+            self._cache[key] = info
+        return info
+
+
+# Instância compartilhada: o cache vale para todo o processo
+media_info = MediaInfoService()
@@ -0,0 +1,180 @@
+"""
+Reenquadramento vertical 9:16 com trilha de crop calculada uma vez por vídeo
+Saliência barata em CPU (bordas + movimento, e rostos quando o OpenCV existe)
+sobre frames reduzidos; a trilha suavizada é reaproveitada por todos os clips
+"""
+
+import json
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from core.ffmpeg_utils import escape_filter_value
+from core.media_info import media_info
+from core.ffmpeg_runner import ffmpeg_runner
+
+try:
+    import cv2
+except ImportError:  # Deploy mínimo: apenas saliência por bordas/movimento
+    cv2 = None
+
+
+class Reframer:
+    def __init__(self, output_width: int = 1080, output_height: int = 1920,
+                 analysis_width: int = 320, analysis_fps: float = 2.0,
+                 smoothing_seconds: float = 2.0):
+        self.output_width = output_width
+        self.output_height = output_height
+        self.analysis_width = analysis_width
+        self.analysis_fps = analysis_fps
+        self.smoothing_seconds = smoothing_seconds
+        self._tracks: Dict[str, Dict] = {}
+
+        self.face_detector = None
+        if cv2 is not None:
+            cascade = Path(cv2.data.haarcascades) / "haarcascade_frontalface_default.xml"
+            self.face_detector = cv2.CascadeClassifier(str(cascade))
+
+    def _track_path(self, video_path: Path) -> Path:
+        return video_path.with_name(video_path.name + ".croptrack.json")
+
+    def _frame_centers(self, analysis_source: Path, width: int, height: int,
+                       duration: Optional[float]) -> List[float]:
+        """Decodifica a fonte (ou proxy) reduzida em tons de cinza -> centro de interesse por frame
+
+        Lê do pipe um frame por vez: memória constante qualquer que seja a duração.
+        """
+        analysis_height = max(2, int(round(self.analysis_width * height / width / 2)) * 2)
+        cmd = [
+            'ffmpeg', '-v', 'quiet', '-i', str(analysis_source),
+            '-an', '-vf',
+            f'fps={self.analysis_fps},scale={self.analysis_width}:{analysis_height},format=gray',
+            '-f', 'rawvideo', 'pipe:1'
+        ]
+        frame_size = self.analysis_width * analysis_height
+        centers = []
+        previous = None
+        for chunk in ffmpeg_runner.stream(cmd, "ffmpeg:reenquadramento", frame_size, media_seconds=duration):
+            if len(chunk) < frame_size:
+                continue  # Frame truncado no fim do pipe
+            frame = np.frombuffer(chunk, dtype=np.uint8).reshape(analysis_height, self.analysis_width)
+            centers.append(self._frame_center(frame, previous))
+            previous = frame
+        return centers
+
+    def _frame_center(self, frame: np.ndarray, previous: Optional[np.ndarray]) -> float:
+        """Centro horizontal de interesse do frame, como fração da largura"""
+        if self.face_detector is not None:
+            faces = self.face_detector.detectMultiScale(frame, scaleFactor=1.2, minNeighbors=4)
+            if len(faces):
+                # Maior rosto domina o enquadramento
+                x, y, w, h = max(faces, key=lambda f: f[2] * f[3])
+                return (x + w / 2) / frame.shape[1]
+
+        current = frame.astype(np.float32)
+        edges = np.abs(np.diff(current, axis=1, prepend=current[:, :1]))
+        energy = edges
+        if previous is not None:
+            energy = energy + 2.0 * np.abs(current - previous.astype(np.float32))
+
+        columns = energy.sum(axis=0) ** 2  # Quadrado realça o pico dominante
+        total = columns.sum()
+        if total <= 0:
+            return 0.5
+        return float((columns * np.arange(frame.shape[1])).sum() / total / frame.shape[1])
+
+    def _smooth(self, centers: np.ndarray) -> np.ndarray:
+        """Mediana (remove saltos isolados) + média móvel centrada"""
+        if len(centers) < 3:
+            return centers
+        padded = np.pad(centers, 2, mode="edge")
+        median = np.median(np.lib.stride_tricks.sliding_window_view(padded, 5), axis=1)
+
+        window = max(1, int(self.smoothing_seconds * self.analysis_fps) | 1)
+        padded = np.pad(median, window // 2, mode="edge")
+        return np.convolve(padded, np.ones(window) / window, mode="valid")
+
+    def compute_track(self, video_path: Path, proxy_path: Optional[Path] = None) -> Dict:
+        """Trilha de crop da fonte inteira (cache em memória e em disco)"""
+        key = str(video_path)
+        if key in self._tracks:
+            return self._tracks[key]
+
+        track_path = self._track_path(video_path)
+        if track_path.exists():
+            with open(track_path, "r") as f:
+                track = json.load(f)
+            self._tracks[key] = track
+            return track
+
+        info = media_info.probe(video_path)
+        width, height = info["video"]["width"], info["video"]["height"]
+        analysis_source = proxy_path if proxy_path and proxy_path.exists() else video_path
+        centers = self._frame_centers(analysis_source, width, height, info["duration"])
+
+        smoothed = self._smooth(np.array(centers, dtype=np.float64)) if centers else np.array([])
+
+        track = {
+            "width": width,
+            "height": height,
+            "fps": self.analysis_fps,
+            "centers": [round(float(c), 4) for c in smoothed],
+        }
+        with open(track_path, "w") as f:
+            json.dump(track, f)
+
+        self._tracks[key] = track
+        return track
+
+    def _scaled_size(self, track: Dict) -> Tuple[int, int]:
+        """Escala mínima que cobre 1080x1920 mantendo a proporção"""
+        factor = max(self.output_width / track["width"], self.output_height / track["height"])
+        scaled_w = max(self.output_width, int(round(track["width"] * factor / 2)) * 2)
+        scaled_h = max(self.output_height, int(round(track["height"] * factor / 2)) * 2)
+        return scaled_w, scaled_h
+
+    def crop_commands(self, track: Dict, start_time: float, end_time: float,
+                      time_origin: Optional[float] = None) -> List[str]:
+        """Comandos sendcmd do trecho; tempos relativos a ``time_origin`` (t=0 no filtro)"""
+        scaled_w, _ = self._scaled_size(track)
+        max_x = scaled_w - self.output_width
+        if max_x <= 0:
+            return []
+
+        origin = start_time if time_origin is None else time_origin
+        fps = track["fps"]
+        centers = track["centers"]
+        first = max(0, int(start_time * fps))
+        last = min(len(centers), int(end_time * fps) + 2)
+
+        commands = []
+        previous_x = None
+        for index in range(first, last):
+            x = int(round(centers[index] * scaled_w - self.output_width / 2))
+            x = min(max(x, 0), max_x)
+            if previous_x is not None and abs(x - previous_x) < 2:
+                continue  # Ignora micro-ajustes (evita tremor)
+            t = max(0.0, index / fps - origin)
+            commands.append(f"{t:.3f} crop@reframe x {x};")
+            previous_x = x
+        return commands
+
+    def vertical_filters(self, track: Dict, start_time: float, end_time: float,
+                         commands_path: Path, time_origin: Optional[float] = None) -> List[str]:
+        """Filtros scale + sendcmd + crop do clip, aplicados no mesmo encode do corte"""
+        scaled_w, scaled_h = self._scaled_size(track)
+        commands = self.crop_commands(track, start_time, end_time, time_origin)
+
+        filters = [f"scale={scaled_w}:{scaled_h}"]
+        initial_x = (scaled_w - self.output_width) // 2
+        if commands:
+            commands_path.write_text("\n".join(commands) + "\n")
+            filters.append(f"sendcmd=f={escape_filter_value(str(commands_path))}")
+            initial_x = int(commands[0].split()[-1].rstrip(";"))
+
+        filters.append(
+            f"crop@reframe={self.output_width}:{self.output_height}:"
+            f"{initial_x}:{(scaled_h - self.output_height) // 2}"
+        )
+        return filters
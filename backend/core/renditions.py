@@ -0,0 +1,71 @@
+"""
+Saída em vários formatos (9:16, 1:1, 16:9) com uma única decodificação
+O trecho é decodificado uma vez, dividido com split e cada ramo recebe
+scale + crop próprios antes do seu encoder
+"""
+
+from typing import Dict, List, Optional, Tuple
+
+# Formato -> tamanho de saída em 1080p e plataforma sugerida
+ASPECT_RATIOS: Dict[str, Dict] = {
+    "9:16": {"size": (1080, 1920), "optimal_for": "Instagram Reels / TikTok"},
+    "1:1": {"size": (1080, 1080), "optimal_for": "Feed"},
+    "16:9": {"size": (1920, 1080), "optimal_for": "YouTube"},
+}
+
+
+def parse_aspects(value: Optional[str]) -> Tuple[List[str], List[str]]:
+    """'9:16,1:1' -> (formatos, erros); sem duplicatas, na ordem pedida"""
+    aspects, errors = [], []
+    for item in (value or "").split(","):
+        aspect = item.strip()
+        if not aspect:
+            continue
+        if aspect not in ASPECT_RATIOS:
+            errors.append(f"Formato inválido: {aspect} (use {', '.join(ASPECT_RATIOS)})")
+        elif aspect not in aspects:
+            aspects.append(aspect)
+    return aspects, errors
+
+
+def output_size(aspect: str, source_width: Optional[int], source_height: Optional[int]) -> Tuple[int, int]:
+    """Tamanho de saída do formato, nunca maior que o recorte da fonte
+
+    O recorte central no formato pedido (ex.: 9:16 de uma fonte 16:9 usa só
+    parte da largura) limita a saída: como na escada de encodes, nada é
+    ampliado acima do que a fonte tem.
+    """
+    width, height = ASPECT_RATIOS[aspect]["size"]
+    if not source_width or not source_height:
+        return width, height
+    crop_width = min(source_width, source_height * width / height)
+    crop_height = min(source_height, source_width * height / width)
+    factor = min(1.0, crop_width / width, crop_height / height)
+    return max(2, int(round(width * factor / 2)) * 2), max(2, int(round(height * factor / 2)) * 2)
+
+
+def build_aspect_filter_complex(sizes: List[Tuple[int, int]], start: float, end: float,
+                                time_origin: float, has_audio: bool,
+                                audio_filter: Optional[str] = None) -> str:
+    """trim único -> split -> scale/crop (centro) por formato; áudio (com loudness) e asplit"""
+    count = len(sizes)
+    start = max(0.0, start - time_origin)
+    end = end - time_origin
+
+    video_labels = "".join(f"[vs{i}]" for i in range(count))
+    chains = [f"[0:v]trim=start={start:.6f}:end={end:.6f},setpts=PTS-STARTPTS,split={count}{video_labels}"]
+    if has_audio:
+        audio_labels = "".join(f"[a{i}]" for i in range(count))
+        extra = f",{audio_filter}" if audio_filter else ""
+        chains.append(
+            f"[0:a]atrim=start={start:.6f}:end={end:.6f},asetpts=PTS-STARTPTS{extra},asplit={count}{audio_labels}"
+        )
+
+    for i, (width, height) in enumerate(sizes):
+        # Cobre o quadro de saída mantendo a proporção e corta o excesso no centro
+        chains.append(
+            f"[vs{i}]scale={width}:{height}:force_original_aspect_ratio=increase,"
+            f"crop={width}:{height},setsar=1[v{i}]"
+        )
+
+    return ";".join(chains)
@@ -0,0 +1,56 @@
+"""
+Planejador de seek baseado no índice de keyframes da fonte
+Seek rápido na entrada até o keyframe anterior + seek preciso e curto
+na saída: custo por clip limitado ao tamanho do GOP, não à posição
+"""
+
+import bisect
+from typing import Dict, List, Tuple
+
+from core.media_info import media_info
+
+
+def plan_seek(keyframes: List[float], start_time: float, duration: float) -> Dict:
+    """Divide o seek em keyframe anterior (entrada) + deslocamento (saída)"""
+    start_time = max(0.0, start_time)
+    position = bisect.bisect_right(keyframes, start_time + 1e-6)
+
+    if not position:
+        # Sem índice (ou início antes do 1º keyframe): seek preciso padrão do ffmpeg
+        return {
+            "input_seek": start_time,
+            "output_seek": 0.0,
+            "duration": duration,
+            "accurate_input": True,
+        }
+
+    keyframe = keyframes[position - 1]
+    return {
+        "input_seek": keyframe,
+        "output_seek": round(start_time - keyframe, 6),
+        "duration": duration,
+        "accurate_input": False,
+    }
+
+
+def plan_clip_seek(video_path, start_time: float, duration: float) -> Dict:
+    """Plano de seek usando os keyframes do cache de mídia"""
+    try:
+        keyframes = media_info.probe(video_path)["keyframes"]
+    except Exception:
+        keyframes = []
+    return plan_seek(keyframes, start_time, duration)
+
+
+def seek_args(plan: Dict) -> Tuple[List[str], List[str]]:
+    """Argumentos (antes de -i, depois de -i) para o ffmpeg"""
+    input_args = ['-ss', f"{plan['input_seek']:.6f}"]
+    if not plan["accurate_input"]:
+        # Já estamos exatamente num keyframe: nada a descartar na entrada
+        input_args.append('-noaccurate_seek')
+
+    output_args = []
+    if plan["output_seek"] > 0:
+        output_args += ['-ss', f"{plan['output_seek']:.6f}"]
+    output_args += ['-t', f"{plan['duration']:.6f}"]
+    return input_args, output_args
@@ -4,46 +4,106 @@ Simula IA mas funciona 100% com Railway
 """
 import os
 import random
-import subprocess
-from typing import List, Dict
+from typing import Callable, List, Dict, Optional
 from pathlib import Path
 
+from core.encoding_profiles import encoding_profiles
+from core.media_info import media_info
+from core.seek_planner import plan_clip_seek, seek_args
+from core.batch_cut import group_for_single_pass, build_filter_complex
+from core.ffmpeg_runner import ffmpeg_runner, FFmpegError
+from core.highlights import HighlightEngine
+from core.dedup import NearDuplicateFilter
+from core.loudness import loudness
+from core.chunked_encode import encode_chunked, parallel_workers
+from core.renditions import ASPECT_RATIOS, build_aspect_filter_complex, output_size
+from config import Config
+
 class SimpleFFmpegProcessor:
     def __init__(self):
-        self.whatsapp_params = [
-            '-c:v', 'libx264',
-            '-preset', 'medium', 
-            '-profile:v', 'high',
-            '-level', '4.0',
-            '-pix_fmt', 'yuv420p',
-            '-r', '30',
-            '-g', '60',
-            '-c:a', 'aac',
-            '-b:a', '128k',
-            '-ar', '44100',
-            '-ac', '2',
-            '-movflags', 'faststart'
-        ]
+        # Perfil WhatsApp compartilhado (preset/CRF/threads escolhidos por encode)
+        self.platform = "whatsapp"
         
         self.smart_titles = [
             "Momento Épico", "Destaque Principal", "Cena Imperdível",
             "Melhor Parte", "Momento Viral", "Clipe Premium",
             "Cena Marcante", "Destaque Gold", "Momento Top", "Clip Especial"
         ]
+        
+        # Destaques por loudness/voz/cena em um passe de ffmpeg (sem IA pesada)
+        self.highlights = HighlightEngine()
+        self.dedup = NearDuplicateFilter()
 
     def get_video_duration(self, video_path: str) -> float:
-        """Obter duração usando ffprobe"""
+        """Obter duração (cache do serviço de mídia: um ffprobe por upload)"""
         try:
-            cmd = [
-                'ffprobe', '-v', 'quiet', '-show_entries', 
-                'format=duration', '-of', 'default=noprint_wrappers=1:nokey=1',
-                video_path
-            ]
-            result = subprocess.run(cmd, capture_output=True, text=True)
-            return float(result.stdout.strip())
+            return media_info.probe(video_path)["duration"] or 300.0
         except:
             return 300.0  # fallback 5 minutos
 
+    def get_video_height(self, video_path: str) -> int:
+        """Obter altura do primeiro stream de vídeo (0 se desconhecida)"""
+        try:
+            return media_info.probe(video_path)["video"]["height"]
+        except:
+            return 0
+
+    def find_segments(self, video_path: str, duration: float) -> List[Dict]:
+        """Segmentos pelo motor de destaques; distribuição simples se a análise falhar
+
+        Quase-duplicatas visuais são descartadas antes de qualquer render.
+        """
+        try:
+            windows = self.highlights.find_highlights(
+                video_path, Config.TARGET_CLIPS_COUNT * Config.DEDUP_CANDIDATE_FACTOR
+            )
+        except (FFmpegError, RuntimeError, ValueError, OSError) as e:
+            print(f"Motor de destaques indisponível ({e}), usando distribuição fixa")
+            return self._drop_duplicates(video_path, self.generate_smart_segments(duration))
+        
+        if not windows:
+            return self._drop_duplicates(video_path, self.generate_smart_segments(duration))
+        
+        best = max(w["score"] for w in windows)
+        segments = []
+        for i, window in enumerate(windows):
+            relative = window["score"] / best if best > 0 else 0.0
+            segments.append({
+                "id": f"ai_clip_{i+1}",
+                "start_time": float(window["start"]),
+                "duration": float(window["end"] - window["start"]),
+                "title": f"{self.smart_titles[i % len(self.smart_titles)]} {i+1}",
+                "description": self._describe_window(window),
+                "ai_score": round(7.0 + 2.9 * relative, 2),
+                "engagement_prediction": round(60 + 35 * relative, 1)
+            })
+        
+        return self._drop_duplicates(video_path, segments)[:Config.TARGET_CLIPS_COUNT]
+
+    def _drop_duplicates(self, video_path: str, segments: List[Dict]) -> List[Dict]:
+        """Filtro de quase-duplicatas (dHash do proxy); sem ele se a análise falhar"""
+        try:
+            return self.dedup.filter(
+                video_path, segments,
+                span=lambda s: (s["start_time"], s["start_time"] + s["duration"]),
+                score=lambda s: s["ai_score"]
+            )
+        except (FFmpegError, RuntimeError, OSError) as e:
+            print(f"Filtro de duplicatas indisponível ({e})")
+            return sorted(segments, key=lambda x: x['ai_score'], reverse=True)
+
+    def _describe_window(self, window: Dict) -> str:
+        """Resumo legível dos sinais que destacaram o trecho"""
+        parts = []
+        if window["speech_ratio"] >= 0.6:
+            parts.append("fala contínua")
+        elif window["speech_ratio"] >= 0.3:
+            parts.append("fala intercalada")
+        parts.append(f"volume médio {window['loudness']:.0f} LUFS")
+        if window["scene_changes"]:
+            parts.append(f"{window['scene_changes']} mudanças de cena")
+        return "Destaque detectado: " + ", ".join(parts)
+
     def generate_smart_segments(self, duration: float) -> List[Dict]:
         """Gera 10 segmentos 'inteligentes' distribuídos"""
         segments = []
@@ -70,51 +130,287 @@ class SimpleFFmpegProcessor:
         return sorted(segments, key=lambda x: x['ai_score'], reverse=True)
 
     def cut_video_ffmpeg(self, input_path: str, output_path: str, 
-                        start_time: float, duration: float) -> bool:
-        """Cortar vídeo usando FFmpeg direto"""
-        try:
-            cmd = [
-                'ffmpeg', '-y',
-                '-ss', str(start_time),
-                '-i', input_path,
-                '-t', str(duration)
-            ] + self.whatsapp_params + [output_path]
-            
-            result = subprocess.run(cmd, capture_output=True)
-            return result.returncode == 0
-        except:
-            return False
+                        start_time: float, duration: float,
+                        quality: str = None) -> Dict:
+        """Cortar vídeo usando FFmpeg direto (FFmpegError classificado em caso de falha)
 
-    def generate_automatic_clips(self, video_path: str, output_dir: str) -> List[Dict]:
-        """Gera clips 'automáticos' usando apenas FFmpeg"""
+        Retorna as configurações efetivamente usadas (controle de taxa, fallback...).
+        """
+        settings = encoding_profiles.select(
+            quality=quality,
+            platform=self.platform,
+            source_height=self.get_video_height(input_path)
+        )
+        # Limite de tamanho da plataforma (16MB no WhatsApp) já no primeiro encode
+        settings = encoding_profiles.constrain_size(settings, duration, media_info.probe(input_path))
+        # Ganho de loudness do trecho (medição única da fonte), no mesmo encode
+        settings["audio_filter"] = loudness.gain_filter(input_path, start_time, duration)
+        
+        # Cortes longos: pedaços paralelos em keyframes, unidos sem reencode
+        if duration >= Config.CHUNKED_ENCODE_MIN_DURATION:
+            workers = parallel_workers()
+            if workers > 1:
+                try:
+                    used = encode_chunked(input_path, output_path, start_time, duration, settings, workers)
+                    if used:
+                        return used
+                except FFmpegError as e:
+                    if e.kind in ("cancelled", "bad_input"):
+                        raise
+                    print(f"Encode em pedaços falhou ({e.kind}), refazendo em encode único")
+        
+        # Seek rápido até o keyframe anterior + seek curto e preciso na saída
+        input_seek, output_seek = seek_args(plan_clip_seek(input_path, start_time, duration))
+        
+        def build_cmd(current: Dict) -> List[str]:
+            return (
+                ['ffmpeg', '-y'] + input_seek + ['-i', input_path] + output_seek
+                + encoding_profiles.ffmpeg_args(current) + [output_path]
+            )
+        
+        return ffmpeg_runner.run_encode(
+            build_cmd, settings, "ffmpeg:corte",
+            media_seconds=duration, output_path=output_path
+        )
+
+    def plan_automatic_clips(self, video_path: str, output_dir: str) -> List[Dict]:
+        """Planeja os clips automáticos sem renderizar (metadados apenas)"""
         duration = self.get_video_duration(video_path)
-        segments = self.generate_smart_segments(duration)
+        segments = self.find_segments(video_path, duration)
         
         clips_info = []
         
         for segment in segments:
             filename = f"clip_{segment['id']}_{segment['title'].replace(' ', '_').lower()}.mp4"
-            output_path = os.path.join(output_dir, filename)
             
-            success = self.cut_video_ffmpeg(
+            clips_info.append({
+                "filename": filename,
+                "file_path": os.path.join(output_dir, filename),
+                "title": segment['title'],
+                "description": segment['description'],
+                "duration": segment['duration'],
+                "start_time": segment['start_time'],
+                "ai_score": segment['ai_score'],
+                "engagement_prediction": segment['engagement_prediction'],
+                "optimal_for": random.choice(["Instagram Reels", "TikTok", "WhatsApp Status"]),
+                "rendered": False,
+                "file_size": 0
+            })
+        
+        return clips_info
+
+    def render_clip(self, video_path: str, clip_info: Dict, draft: bool = False) -> bool:
+        """Renderiza um clip planejado e atualiza seus metadados"""
+        output_path = clip_info["file_path"]
+        
+        try:
+            settings = self.cut_video_ffmpeg(
                 video_path, output_path,
-                segment['start_time'], segment['duration']
+                clip_info['start_time'], clip_info['duration'],
+                quality="draft" if draft else None
             )
+            clip_info.pop("error", None)
+            # Tamanho e bitrate alcançados (e se coube no limite da plataforma)
+            clip_info.update(encoding_profiles.encode_report(settings, output_path, clip_info['duration']))
+            success = True
+        except FFmpegError as e:
+            # Clip continua na lista, com o motivo da falha
+            success = False
+            clip_info["error"] = e.to_dict()
+            clip_info["file_size"] = 0
+        
+        clip_info["rendered"] = success
+        clip_info["draft"] = success and draft
+        return success
+
+    def generate_automatic_clips(self, video_path: str, output_dir: str,
+                                 clips_info: Optional[List[Dict]] = None,
+                                 on_clip: Optional[Callable[[Dict], None]] = None) -> List[Dict]:
+        """Gera clips 'automáticos' usando apenas FFmpeg (renderiza todos)
+
+        Clips que falham permanecem com ``rendered=False`` e ``error``. Um plano
+        já existente (job retomado) pode ser passado em ``clips_info``: clips
+        com ``rendered=True`` não são refeitos. ``on_clip`` é chamado após cada
+        render (checkpoint).
+        """
+        if clips_info is None:
+            clips_info = self.plan_automatic_clips(video_path, output_dir)
+        
+        for clip_info in clips_info:
+            if clip_info["rendered"]:
+                continue
+            draft = encoding_profiles.should_emit_draft()
+            self.render_clip(video_path, clip_info, draft=draft)
+            if (clip_info.get("error") or {}).get("kind") == "cancelled":
+                break  # Job cancelado: clips restantes nem entram na fila
+            if on_clip:
+                on_clip(clip_info)
+        
+        return clips_info
+
+    def cut_batch(self, video_path: str, merged_cuts: List[Dict], output_dir: str) -> List[Dict]:
+        """Renderiza vários cortes da mesma fonte, um ffmpeg por grupo de cortes próximos"""
+        info = media_info.probe(video_path)
+        has_audio = info["audio"] is not None
+        results = []
+        
+        for group in group_for_single_pass(merged_cuts):
+            span_start = group[0]["start"]
+            span_end = max(cut["end"] for cut in group)
+            
+            # Um seek até o keyframe anterior ao primeiro corte; trim faz o resto
+            plan = plan_clip_seek(video_path, span_start, span_end - span_start)
+            input_seek, _ = seek_args(plan)
+            origin = plan["input_seek"]
             
-            if success:
-                clips_info.append({
+            settings = encoding_profiles.select(
+                platform=self.platform,
+                source_height=info["video"]["height"] if info["video"] else None
+            )
+            settings["threads"] = max(1, settings["threads"] // len(group))
+            audio_filters = [
+                loudness.gain_filter(video_path, cut["start"], cut["end"] - cut["start"])
+                for cut in group
+            ] if has_audio else None
+            
+            group_results = []
+            for i, cut in enumerate(group):
+                safe_title = "".join(c if c.isalnum() or c in "-_" else "_" for c in cut["title"])
+                filename = f"{safe_title}_{i + len(results) + 1}_WhatsApp.mp4"
+                output_path = os.path.join(output_dir, filename)
+                
+                group_results.append({
                     "filename": filename,
-                    "title": segment['title'],
-                    "description": segment['description'],
-                    "duration": segment['duration'],
-                    "start_time": segment['start_time'],
-                    "ai_score": segment['ai_score'],
-                    "engagement_prediction": segment['engagement_prediction'],
-                    "optimal_for": random.choice(["Instagram Reels", "TikTok", "WhatsApp Status"]),
-                    "file_size": os.path.getsize(output_path) if os.path.exists(output_path) else 0
+                    "file_path": output_path,
+                    "title": cut["title"],
+                    "start_time": cut["start"],
+                    "end_time": cut["end"],
+                    "duration": cut["end"] - cut["start"],
+                    "requests": cut["requests"]
                 })
+            
+            def build_cmd(current: Dict) -> List[str]:
+                cmd = ['ffmpeg', '-y'] + input_seek + [
+                    '-t', f"{span_end - origin:.6f}",
+                    '-i', video_path,
+                    '-filter_complex', build_filter_complex(group, origin, has_audio, audio_filters)
+                ]
+                for i, clip in enumerate(group_results):
+                    cmd += ['-map', f'[v{i}]']
+                    if has_audio:
+                        cmd += ['-map', f'[a{i}]']
+                    # Limite de tamanho por saída (cada corte tem sua duração); sem
+                    # -vf aqui, a escala já vem do filter_complex
+                    clip_settings = encoding_profiles.constrain_size(
+                        current, clip["duration"], info, allow_scale=False
+                    )
+                    cmd += encoding_profiles.ffmpeg_args(clip_settings) + [clip["file_path"]]
+                return cmd
+            
+            error = None
+            used = settings
+            try:
+                used = ffmpeg_runner.run_encode(
+                    build_cmd, settings, "ffmpeg:lote",
+                    media_seconds=sum(clip["duration"] for clip in group_results)
+                )
+            except FFmpegError as e:
+                error = e.to_dict()
+            
+            for clip in group_results:
+                exists = os.path.exists(clip["file_path"]) and os.path.getsize(clip["file_path"]) > 0
+                clip["success"] = error is None and exists
+                clip["file_size"] = 0
+                if clip["success"]:
+                    clip.update(encoding_profiles.encode_report(
+                        encoding_profiles.constrain_size(used, clip["duration"], info, allow_scale=False),
+                        clip["file_path"], clip["duration"]
+                    ))
+                else:
+                    clip["error"] = error or {"kind": "seek_past_end", "message": "saída vazia"}
+                    if os.path.exists(clip["file_path"]):
+                        os.remove(clip["file_path"])  # Saída parcial do processo que falhou
+            results.extend(group_results)
+            if error and error["kind"] == "cancelled":
+                break
         
-        return clips_info
+        return results
+
+    def cut_aspects(self, video_path: str, output_dir: str, start_time: float,
+                    duration: float, aspects: List[str], title: str) -> List[Dict]:
+        """Mesmo trecho em vários formatos: uma decodificação, um encoder por formato
+
+        FFmpegError sobe para o chamador (todas as saídas vêm do mesmo processo).
+        """
+        info = media_info.probe(video_path)
+        has_audio = info["audio"] is not None
+        source_width = info["video"]["width"] if info["video"] else None
+        source_height = info["video"]["height"] if info["video"] else None
+        end_time = start_time + duration
+        
+        plan = plan_clip_seek(video_path, start_time, duration)
+        input_seek, _ = seek_args(plan)
+        origin = plan["input_seek"]
+        
+        settings = encoding_profiles.select(platform=self.platform, source_height=source_height)
+        settings["threads"] = max(1, settings["threads"] // len(aspects))
+        
+        safe_title = "".join(c if c.isalnum() or c in "-_" else "_" for c in title)
+        variants = []
+        for aspect in aspects:
+            width, height = output_size(aspect, source_width, source_height)
+            filename = f"{safe_title}_{aspect.replace(':', 'x')}.mp4"
+            variants.append({
+                "aspect": aspect,
+                "width": width,
+                "height": height,
+                "filename": filename,
+                "file_path": os.path.join(output_dir, filename),
+                "optimal_for": ASPECT_RATIOS[aspect]["optimal_for"],
+            })
+        filter_complex = build_aspect_filter_complex(
+            [(v["width"], v["height"]) for v in variants], start_time, end_time, origin, has_audio,
+            audio_filter=loudness.gain_filter(video_path, start_time, duration) if has_audio else None
+        )
+        
+        def output_settings(current: Dict, variant: Dict) -> Dict:
+            # Resolução já definida pelo crop: limite de tamanho sem escala extra
+            return encoding_profiles.constrain_size(
+                current, duration, info,
+                output_size=(variant["width"], variant["height"]), allow_scale=False
+            )
+        
+        def build_cmd(current: Dict) -> List[str]:
+            cmd = ['ffmpeg', '-y'] + input_seek + [
+                '-t', f"{end_time - origin:.6f}",
+                '-i', video_path,
+                '-filter_complex', filter_complex
+            ]
+            for i, variant in enumerate(variants):
+                cmd += ['-map', f'[v{i}]']
+                if has_audio:
+                    cmd += ['-map', f'[a{i}]']
+                cmd += encoding_profiles.ffmpeg_args(output_settings(current, variant)) + [variant["file_path"]]
+            return cmd
+        
+        try:
+            used = ffmpeg_runner.run_encode(
+                build_cmd, settings, "ffmpeg:formatos",
+                media_seconds=duration * len(variants),
+                output_path=[variant["file_path"] for variant in variants]  # Todas as saídas verificadas
+            )
+        except FFmpegError:
+            for variant in variants:
+                if os.path.exists(variant["file_path"]):
+                    os.remove(variant["file_path"])
+            raise
+        
+        for variant in variants:
+            variant.update({"start_time": start_time, "duration": duration})
+            variant.update(encoding_profiles.encode_report(
+                output_settings(used, variant), variant["file_path"], duration
+            ))
+        return variants
 
     def cut_custom_segment(self, video_path: str, output_path: str, 
                           start_mm_ss: str, end_mm_ss: str) -> Dict:
@@ -127,15 +423,18 @@ class SimpleFFmpegProcessor:
             if duration <= 0:
                 return {"success": False, "error": "Duração inválida"}
             
-            success = self.cut_video_ffmpeg(video_path, output_path, start_seconds, duration)
+            settings = self.cut_video_ffmpeg(video_path, output_path, start_seconds, duration)
+            report = encoding_profiles.encode_report(settings, output_path, duration)
             
             return {
-                "success": success,
+                "success": True,
                 "start_time": start_seconds,
                 "duration": duration,
-                "whatsapp_ready": True,
-                "file_size": os.path.getsize(output_path) if success else 0
+                "whatsapp_ready": report.get("within_size_limit", True),
+                **report
             }
+        except FFmpegError as e:
+            return {"success": False, "error": str(e), "error_kind": e.kind}
         except Exception as e:
             return {"success": False, "error": str(e)}
 
@@ -0,0 +1,148 @@
+"""
+Legendas queimadas a partir dos timestamps de palavras do Whisper
+Uma trilha ASS por fonte, fatiada por clip e aplicada com o filtro ``ass``
+"""
+
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from core.ffmpeg_utils import escape_filter_value
+
+ASS_HEADER = """[Script Info]
+ScriptType: v4.00+
+PlayResX: {width}
+PlayResY: {height}
+WrapStyle: 0
+ScaledBorderAndShadow: yes
+
+[V4+ Styles]
+Format: Name, Fontname, Fontsize, PrimaryColour, SecondaryColour, OutlineColour, BackColour, Bold, Italic, Underline, StrikeOut, ScaleX, ScaleY, Spacing, Angle, BorderStyle, Outline, Shadow, Alignment, MarginL, MarginR, MarginV, Encoding
+Style: Default,Arial,{font_size},&H0000FFFF,&H00FFFFFF,&H00000000,&H80000000,-1,0,0,0,100,100,0,0,1,4,2,2,60,60,{margin_v},1
+
+[Events]
+Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text
+"""
+
+
+def _ass_time(seconds: float) -> str:
+    """Formato de tempo ASS: H:MM:SS.cc"""
+    centis = max(0, int(round(seconds * 100)))
+    hours, centis = divmod(centis, 360000)
+    minutes, centis = divmod(centis, 6000)
+    secs, centis = divmod(centis, 100)
+    return f"{hours}:{minutes:02d}:{secs:02d}.{centis:02d}"
+
+
+def _escape_ass_text(text: str) -> str:
+    """Neutralizar códigos de override do ASS vindos da transcrição"""
+    text = text.replace("\\", "\\\\").replace("{", "\\{").replace("}", "\\}")
+    return " ".join(text.split())
+
+
+class SubtitleBuilder:
+    def __init__(self, width: int = 1080, height: int = 1920,
+                 max_chars: int = 32, max_line_seconds: float = 3.0):
+        self.width = width
+        self.height = height
+        self.max_chars = max_chars
+        self.max_line_seconds = max_line_seconds
+        self._lines: Dict[str, List[List[Dict]]] = {}
+
+    def _words(self, transcription: Dict) -> List[Dict]:
+        """Palavras com tempo; segmentos sem ``words`` viram uma única palavra"""
+        words = []
+        for segment in transcription.get("segments", []):
+            segment_words = segment.get("words") or [
+                {"word": segment["text"], "start": segment["start"], "end": segment["end"]}
+            ]
+            for word in segment_words:
+                text = word["word"].strip()
+                if text:
+                    words.append({"text": text, "start": float(word["start"]), "end": float(word["end"])})
+        return words
+
+    def _group_lines(self, words: List[Dict]) -> List[List[Dict]]:
+        """Agrupa palavras em linhas curtas, quebrando em pontuação"""
+        lines: List[List[Dict]] = []
+        current: List[Dict] = []
+        chars = 0
+
+        for word in words:
+            too_long = chars + len(word["text"]) + 1 > self.max_chars
+            too_slow = current and word["end"] - current[0]["start"] > self.max_line_seconds
+            if current and (too_long or too_slow):
+                lines.append(current)
+                current, chars = [], 0
+
+            current.append(word)
+            chars += len(word["text"]) + 1
+
+            if word["text"][-1] in ".!?":
+                lines.append(current)
+                current, chars = [], 0
+
+        if current:
+            lines.append(current)
+        return lines
+
+    def _dialogue(self, line: List[Dict], offset: float) -> str:
+        """Evento Dialogue com karaokê (\\k) destacando cada palavra no seu tempo"""
+        start = line[0]["start"]
+        parts = []
+        cursor = start
+        for word in line:
+            gap = max(0, int(round((word["start"] - cursor) * 100)))
+            length = max(1, int(round((word["end"] - word["start"]) * 100)))
+            if gap:
+                parts.append(f"{{\\k{gap}}}")
+            parts.append(f"{{\\k{length}}}{_escape_ass_text(word['text'])} ")
+            cursor = word["end"]
+
+        return (
+            f"Dialogue: 0,{_ass_time(start - offset)},{_ass_time(line[-1]['end'] - offset)},"
+            f"Default,,0,0,0,,{''.join(parts).rstrip()}"
+        )
+
+    def _write(self, path: Path, lines: List[List[Dict]], offset: float = 0.0):
+        header = ASS_HEADER.format(
+            width=self.width, height=self.height,
+            font_size=int(self.height / 30), margin_v=int(self.height / 12)
+        )
+        events = [self._dialogue(line, offset) for line in lines]
+        path.write_text(header + "\n".join(events) + "\n", encoding="utf-8")
+
+    def build_source_track(self, video_path: Path, transcription: Dict) -> Path:
+        """Gera (uma vez) a trilha ASS completa da fonte"""
+        track_path = video_path.with_name(video_path.name + ".subs.ass")
+        lines = self._group_lines(self._words(transcription))
+        self._lines[str(video_path)] = lines
+        self._write(track_path, lines)
+        return track_path
+
+    def write_clip_track(self, video_path: Path, start_time: float, end_time: float,
+                         output_path: Path, time_origin: Optional[float] = None) -> bool:
+        """Fatia a trilha da fonte para o clip
+
+        Tempos relativos a ``time_origin`` (instante que o filtro vê como t=0);
+        por padrão, o início do clip.
+        """
+        lines = self._lines.get(str(video_path), [])
+        clip_lines = []
+        for line in lines:
+            words = [w for w in line if w["end"] > start_time and w["start"] < end_time]
+            if words:
+                clip_lines.append([
+                    {**w, "start": max(w["start"], start_time), "end": min(w["end"], end_time)}
+                    for w in words
+                ])
+
+        if not clip_lines:
+            return False
+
+        origin = start_time if time_origin is None else time_origin
+        self._write(output_path, clip_lines, offset=origin)
+        return True
+
+    def burn_filter(self, subtitle_path: Path) -> str:
+        """Filtro ``ass`` para queimar a legenda no mesmo encode do corte"""
+        return f"ass={escape_filter_value(str(subtitle_path))}"
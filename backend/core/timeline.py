@@ -0,0 +1,210 @@
+"""
+Linha do tempo para escolher cortes na UI sem baixar o vídeo
+Folhas de miniaturas (JPEG em grade + índice WebVTT) e pirâmide de picos
+de áudio em binário compacto (int8 mín/máx intercalados), geradas uma vez
+por fonte a partir do proxy e do áudio 16k da ingestão
+"""
+
+import json
+import shutil
+import tempfile
+import threading
+import wave
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from config import Config
+from core.ffmpeg_runner import ffmpeg_runner
+from core.media_info import media_info
+from utils.streaming_ingest import AUDIO_NAME, PROXY_NAME
+
+TIMELINE_DIR = "timeline"
+MANIFEST_NAME = "manifest.json"
+VTT_NAME = "thumbnails.vtt"
+THUMB_WIDTH = 160
+SPRITE_COLUMNS = 10
+SPRITE_ROWS = 10
+
+PEAK_SAMPLE_RATE = 16000  # mesma taxa do áudio da ingestão
+BASE_SAMPLES_PER_PEAK = 160  # nível mais fino: 100 picos por segundo
+PYRAMID_FACTOR = 4  # cada nível agrupa 4 picos do anterior
+MIN_LEVEL_PEAKS = 2000  # nível mais grosso cabe numa tela sem zoom
+READ_FRAMES = BASE_SAMPLES_PER_PEAK * 1000  # leitura do WAV em blocos de 10s
+
+
+def _vtt_time(seconds: float) -> str:
+    hours, rest = divmod(seconds, 3600)
+    minutes, secs = divmod(rest, 60)
+    return f"{int(hours):02d}:{int(minutes):02d}:{secs:06.3f}"
+
+
+def build_pyramid(mins: np.ndarray, maxs: np.ndarray) -> List[np.ndarray]:
+    """Níveis (mín/máx intercalados) do mais fino ao mais grosso"""
+    levels = []
+    while True:
+        levels.append(np.column_stack([mins, maxs]).ravel())
+        if len(mins) <= MIN_LEVEL_PEAKS:
+            return levels
+        pad = (-len(mins)) % PYRAMID_FACTOR
+        mins = np.pad(mins, (0, pad), mode="edge").reshape(-1, PYRAMID_FACTOR).min(axis=1)
+        maxs = np.pad(maxs, (0, pad), mode="edge").reshape(-1, PYRAMID_FACTOR).max(axis=1)
+
+
+class TimelineService:
+    def __init__(self):
+        self._locks: Dict[str, threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+
+    def _lock_for(self, key: str) -> threading.Lock:
+        with self._locks_guard:
+            return self._locks.setdefault(key, threading.Lock())
+
+    def timeline_dir(self, source_path) -> Path:
+        return Path(source_path).parent / TIMELINE_DIR
+
+    def load(self, source_path) -> Optional[Dict]:
+        """Manifesto já gerado (None se ainda não existe)"""
+        manifest_path = self.timeline_dir(source_path) / MANIFEST_NAME
+        if not manifest_path.exists():
+            return None
+        with open(manifest_path, "r") as f:
+            return json.load(f)
+
+    def _thumbnails(self, source_path: Path, info: Dict, work_dir: Path) -> Dict:
+        """Um ffmpeg: fps baixo + scale + tile -> folhas JPEG; tempos no WebVTT"""
+        duration = info["duration"]
+        interval = max(Config.TIMELINE_MIN_INTERVAL, duration / Config.TIMELINE_MAX_THUMBNAILS)
+        video = info["video"]
+        thumb_height = max(2, int(round(THUMB_WIDTH * video["height"] / video["width"] / 2)) * 2)
+
+        proxy = source_path.parent / PROXY_NAME
+        video_source = proxy if proxy.exists() else source_path
+        cmd = [
+            'ffmpeg', '-y', '-v', 'error', '-threads', '1', '-i', str(video_source),
+            '-an', '-sn', '-vf',
+            f"fps=1/{interval:.6f},scale={THUMB_WIDTH}:{thumb_height},tile={SPRITE_COLUMNS}x{SPRITE_ROWS}",
+            '-q:v', '5', str(work_dir / "sprite_%03d.jpg")
+        ]
+        ffmpeg_runner.run(cmd, "ffmpeg:miniaturas", timeout=ffmpeg_runner.timeout_for(duration))
+
+        sheets = sorted(path.name for path in work_dir.glob("sprite_*.jpg"))
+        per_sheet = SPRITE_COLUMNS * SPRITE_ROWS
+        count = min(int(np.ceil(duration / interval)), len(sheets) * per_sheet)
+
+        cues = ["WEBVTT", ""]
+        for index in range(count):
+            sheet, position = divmod(index, per_sheet)
+            row, column = divmod(position, SPRITE_COLUMNS)
+            start = index * interval
+            cues += [
+                f"{_vtt_time(start)} --> {_vtt_time(min(start + interval, duration))}",
+                f"{sheets[sheet]}#xywh={column * THUMB_WIDTH},{row * thumb_height},{THUMB_WIDTH},{thumb_height}",
+                "",
+            ]
+        (work_dir / VTT_NAME).write_text("\n".join(cues))
+
+        return {
+            "vtt": VTT_NAME,
+            "sheets": sheets,
+            "count": count,
+            "interval": round(interval, 3),
+            "width": THUMB_WIDTH,
+            "height": thumb_height,
+            "columns": SPRITE_COLUMNS,
+            "rows": SPRITE_ROWS,
+        }
+
+    def _base_peaks(self, wav_path: Path):
+        """Mín/máx por bloco de 10ms, lendo o WAV em streaming (int8 = amostra >> 8)"""
+        mins, maxs = [], []
+        with wave.open(str(wav_path), "rb") as wav:
+            while True:
+                data = wav.readframes(READ_FRAMES)
+                if not data:
+                    break
+                samples = np.frombuffer(data, dtype="<i2")
+                pad = (-len(samples)) % BASE_SAMPLES_PER_PEAK
+                blocks = np.pad(samples, (0, pad)).reshape(-1, BASE_SAMPLES_PER_PEAK)
+                mins.append((blocks.min(axis=1) >> 8).astype(np.int8))
+                maxs.append((blocks.max(axis=1) >> 8).astype(np.int8))
+        if not mins:
+            return np.zeros(0, np.int8), np.zeros(0, np.int8)
+        return np.concatenate(mins), np.concatenate(maxs)
+
+    def _peaks(self, source_path: Path, info: Dict, work_dir: Path) -> Dict:
+        ingest_audio = source_path.parent / AUDIO_NAME
+        with tempfile.TemporaryDirectory() as temp_dir:
+            wav_path = ingest_audio
+            if not ingest_audio.exists():
+                wav_path = Path(temp_dir) / AUDIO_NAME
+                cmd = [
+                    'ffmpeg', '-y', '-v', 'error', '-i', str(source_path),
+                    '-map', '0:a:0', '-vn', '-ac', '1', '-ar', str(PEAK_SAMPLE_RATE),
+                    '-c:a', 'pcm_s16le', str(wav_path)
+                ]
+                ffmpeg_runner.run(cmd, "ffmpeg:picos", timeout=ffmpeg_runner.timeout_for(info["duration"]))
+            mins, maxs = self._base_peaks(wav_path)
+
+        levels = []
+        samples_per_peak = BASE_SAMPLES_PER_PEAK
+        for level in build_pyramid(mins, maxs):
+            name = f"peaks_{samples_per_peak}.bin"
+            level.tofile(work_dir / name)
+            levels.append({
+                "file": name,
+                "samples_per_peak": samples_per_peak,
+                "peaks_per_second": round(PEAK_SAMPLE_RATE / samples_per_peak, 4),
+                "count": len(level) // 2,
+            })
+            samples_per_peak *= PYRAMID_FACTOR
+
+        return {
+            "sample_rate": PEAK_SAMPLE_RATE,
+            "format": "int8",
+            "layout": "min,max",
+            "levels": levels,
+        }
+
+    def generate(self, source_path) -> Dict:
+        """Manifesto da linha do tempo (gera miniaturas e picos na primeira chamada)"""
+        source_path = Path(source_path)
+        with self._lock_for(str(source_path.resolve())):
+            manifest = self.load(source_path)
+            if manifest is not None:
+                return manifest
+
+            info = media_info.probe(source_path)
+            final_dir = self.timeline_dir(source_path)
+            work_dir = final_dir.with_name(TIMELINE_DIR + ".part")
+            shutil.rmtree(work_dir, ignore_errors=True)
+            work_dir.mkdir(parents=True)
+
+            try:
+                manifest = {
+                    "duration": info["duration"],
+                    "thumbnails": self._thumbnails(source_path, info, work_dir) if info["video"] else None,
+                    "peaks": self._peaks(source_path, info, work_dir) if info["audio"] else None,
+                }
+                with open(work_dir / MANIFEST_NAME, "w") as f:
+                    json.dump(manifest, f)
+                # Diretório completo ou nenhum: leitores nunca veem metade dos arquivos
+                shutil.rmtree(final_dir, ignore_errors=True)
+                work_dir.rename(final_dir)
+            finally:
+                shutil.rmtree(work_dir, ignore_errors=True)
+            return manifest
+
+    def files(self, manifest: Dict) -> List[str]:
+        """Arquivos servíveis do manifesto (lista branca para o endpoint)"""
+        names = [MANIFEST_NAME]
+        if manifest.get("thumbnails"):
+            names += [manifest["thumbnails"]["vtt"]] + manifest["thumbnails"]["sheets"]
+        if manifest.get("peaks"):
+            names += [level["file"] for level in manifest["peaks"]["levels"]]
+        return names
+
+
+# Instância compartilhada: uma geração por fonte
+timeline = TimelineService()
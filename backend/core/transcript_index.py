@@ -0,0 +1,205 @@
+"""
+Índice de transcrições por hash de conteúdo
+Cada transcrição vira colunas NumPy (palavra, início, fim, confiança) com
+um índice invertido em CSR (vocabulário ordenado -> posições), salvas em
+.npz; a busca de frases só toca as posições da palavra mais rara
+"""
+
+import os
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from config import Config
+
+CONTEXT_WORDS = 8  # palavras de contexto em cada lado do trecho encontrado
+
+
+def normalize_token(text: str) -> str:
+    """Minúsculas, sem acentos e sem pontuação ('Você,' -> 'voce')"""
+    text = unicodedata.normalize("NFKD", text.lower())
+    return "".join(c for c in text if c.isalnum() and not unicodedata.combining(c))
+
+
+def tokenize(phrase: str) -> List[str]:
+    return [token for token in (normalize_token(part) for part in phrase.split()) if token]
+
+
+class TranscriptIndex:
+    def __init__(self):
+        self.directory = Config.TRANSCRIPT_DIR
+        self.directory.mkdir(parents=True, exist_ok=True)
+        # LRU limitado: só as transcrições buscadas recentemente ficam em memória
+        self._cache: "OrderedDict[str, Dict[str, np.ndarray]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _path(self, content_hash: str) -> Path:
+        if not content_hash.isalnum():
+            raise ValueError("Hash de conteúdo inválido")
+        return self.directory / f"{content_hash}.npz"
+
+    def has(self, content_hash: str) -> bool:
+        return self._path(content_hash).exists()
+
+    def save(self, content_hash: str, transcription: Dict) -> int:
+        """Transcrição no formato do Whisper (segments/words) -> colunas + índice; retorna nº de palavras"""
+        texts, tokens, starts, ends, confidences = [], [], [], [], []
+        segment_first, segment_starts, segment_ends = [], [], []
+
+        for segment in transcription.get("segments", []):
+            segment_words = segment.get("words") or [
+                {"word": segment["text"], "start": segment["start"], "end": segment["end"]}
+            ]
+            segment_first.append(len(texts))
+            segment_starts.append(float(segment["start"]))
+            segment_ends.append(float(segment["end"]))
+            for word in segment_words:
+                token = normalize_token(word["word"])
+                if not token:
+                    continue
+                texts.append(word["word"].strip())
+                tokens.append(token)
+                starts.append(float(word["start"]))
+                ends.append(float(word["end"]))
+                confidences.append(float(word.get("probability", 1.0)))
+
+        vocab, word_ids = np.unique(np.array(tokens, dtype=str), return_inverse=True)
+        word_ids = word_ids.astype(np.int32)
+        # Índice invertido: posições agrupadas por palavra do vocabulário
+        postings = np.argsort(word_ids, kind="stable").astype(np.int32)
+        offsets = np.concatenate([[0], np.cumsum(np.bincount(word_ids, minlength=len(vocab)))]).astype(np.int64)
+
+        columns = {
+            "vocab": vocab,
+            "word_ids": word_ids,
+            "text": np.array(texts, dtype=str),
+            "start": np.array(starts, dtype=np.float32),
+            "end": np.array(ends, dtype=np.float32),
+            "confidence": np.array(confidences, dtype=np.float16),
+            "postings": postings,
+            "offsets": offsets,
+            "segment_first": np.array(segment_first, dtype=np.int32),
+            "segment_start": np.array(segment_starts, dtype=np.float32),
+            "segment_end": np.array(segment_ends, dtype=np.float32),
+            "language": np.array(transcription.get("language") or ""),
+        }
+
+        path = self._path(content_hash)
+        temp_path = path.with_name(f"{content_hash}.part.npz")
+        np.savez_compressed(temp_path, **columns)
+        os.replace(temp_path, path)
+        self._remember(content_hash, columns)
+        return len(texts)
+
+    def _remember(self, content_hash: str, columns: Dict[str, np.ndarray]):
+        with self._lock:
+            self._cache[content_hash] = columns
+            self._cache.move_to_end(content_hash)
+            while len(self._cache) > Config.TRANSCRIPT_CACHE_ENTRIES:
+                self._cache.popitem(last=False)
+
+    def load(self, content_hash: str) -> Optional[Dict[str, np.ndarray]]:
+        with self._lock:
+            if content_hash in self._cache:
+                self._cache.move_to_end(content_hash)
+                return self._cache[content_hash]
+        path = self._path(content_hash)
+        if not path.exists():
+            return None
+        with np.load(path) as data:
+            columns = {name: data[name] for name in data.files}
+        self._remember(content_hash, columns)
+        return columns
+
+    def transcription(self, content_hash: str) -> Optional[Dict]:
+        """Reconstrói o formato do Whisper (evita transcrever de novo o mesmo conteúdo)"""
+        columns = self.load(content_hash)
+        if columns is None:
+            return None
+        bounds = list(columns["segment_first"]) + [len(columns["text"])]
+        segments = []
+        for i in range(len(columns["segment_first"])):
+            first, last = bounds[i], bounds[i + 1]
+            words = [
+                {
+                    "word": " " + str(columns["text"][j]),
+                    "start": float(columns["start"][j]),
+                    "end": float(columns["end"][j]),
+                    "probability": float(columns["confidence"][j]),
+                }
+                for j in range(first, last)
+            ]
+            segments.append({
+                "start": float(columns["segment_start"][i]),
+                "end": float(columns["segment_end"][i]),
+                "text": "".join(w["word"] for w in words),
+                "words": words,
+            })
+        return {
+            "text": "".join(s["text"] for s in segments).strip(),
+            "segments": segments,
+            "language": str(columns["language"]),
+        }
+
+    def _find(self, columns: Dict[str, np.ndarray], tokens: List[str]) -> np.ndarray:
+        """Posições iniciais da frase (tokens consecutivos) numa transcrição"""
+        vocab = columns["vocab"]
+        ids = np.searchsorted(vocab, tokens)
+        if np.any(ids >= len(vocab)) or np.any(vocab[np.minimum(ids, len(vocab) - 1)] != tokens):
+            return np.zeros(0, dtype=np.int64)
+
+        offsets, word_ids = columns["offsets"], columns["word_ids"]
+        # Candidatos vêm da palavra mais rara da frase
+        rarest = int(np.argmin(offsets[ids + 1] - offsets[ids]))
+        candidates = columns["postings"][offsets[ids[rarest]]:offsets[ids[rarest] + 1]].astype(np.int64) - rarest
+        candidates = candidates[(candidates >= 0) & (candidates + len(ids) <= len(word_ids))]
+        for k, word_id in enumerate(ids):
+            candidates = candidates[word_ids[candidates + k] == word_id]
+        return candidates
+
+    def search(self, query: str, content_hashes: List[str], limit: int = None) -> Dict:
+        """Frase nas transcrições dos conteúdos pedidos -> trechos com tempo, texto e confiança
+
+        Nunca busca em todo o índice: sem contas de usuário, o hash de
+        conteúdo é o que dá acesso a uma transcrição.
+        """
+        if not content_hashes:
+            raise ValueError("Informe ao menos um hash de conteúdo")
+        started = time.perf_counter()
+        limit = limit or Config.TRANSCRIPT_SEARCH_MAX_HITS
+        tokens = tokenize(query)
+        hits = []
+
+        for content_hash in content_hashes:
+            if not tokens or len(hits) >= limit:
+                break
+            columns = self.load(content_hash)
+            if columns is None:
+                continue
+            texts = columns["text"]
+            for position in self._find(columns, tokens)[:limit - len(hits)]:
+                last = position + len(tokens) - 1
+                context = slice(max(0, position - CONTEXT_WORDS), last + 1 + CONTEXT_WORDS)
+                hits.append({
+                    "content_hash": content_hash,
+                    "start": round(float(columns["start"][position]), 3),
+                    "end": round(float(columns["end"][last]), 3),
+                    "text": " ".join(texts[position:last + 1]),
+                    "context": " ".join(texts[context]),
+                    "confidence": round(float(columns["confidence"][position:last + 1].astype(np.float32).mean()), 3),
+                })
+
+        return {
+            "query": query,
+            "hits": hits,
+            "took_ms": round((time.perf_counter() - started) * 1000, 2),
+        }
+
+
+# Instância compartilhada: transcrições carregadas ficam em memória
+transcript_index = TranscriptIndex()
@@ -14,10 +14,21 @@ from transformers import pipeline
 import asyncio
 import subprocess
 import json
-from typing import List, Dict, Tuple
+from typing import List, Dict, Tuple, Optional
 import tempfile
 import os
 
+from core.encoding_profiles import encoding_profiles
+from core.ffmpeg_runner import ffmpeg_runner, FFmpegError
+from core.media_info import media_info
+from core.loudness import loudness
+from core.seek_planner import plan_clip_seek, seek_args
+from core.reframe import Reframer
+from core.subtitles import SubtitleBuilder
+from core.dedup import NearDuplicateFilter
+from core.transcript_index import transcript_index
+from utils.streaming_ingest import AUDIO_NAME, PROXY_NAME
+
 class VideoProcessor:
     def __init__(self):
         # Carregar modelos
@@ -27,21 +38,38 @@ class VideoProcessor:
             "sentiment-analysis", 
             model="cardiffnlp/twitter-roberta-base-sentiment-latest"
         )
+        self.reframer = Reframer()
+        self.subtitles = SubtitleBuilder()
+        self.dedup = NearDuplicateFilter()
+        
+    async def transcribe_audio(self, video_path: Path, content_hash: Optional[str] = None) -> Dict:
+        """Transcrição com Whisper + timestamps
+
+        Com ``content_hash``, reaproveita a transcrição indexada do mesmo conteúdo
+        e indexa a nova para busca de frases.
+        """
+        if content_hash:
+            cached = await asyncio.to_thread(transcript_index.transcription, content_hash)
+            if cached is not None:
+                return cached
         
-    async def transcribe_audio(self, video_path: Path) -> Dict:
-        """Transcrição com Whisper + timestamps"""
         try:
-            # Extrair áudio
-            audio_path = video_path.with_suffix('.wav')
-            
-            # FFmpeg para extrair áudio
-            (
-                ffmpeg
-                .input(str(video_path))
-                .output(str(audio_path), acodec='pcm_s16le', ac=1, ar='16000')
-                .overwrite_output()
-                .run(quiet=True)
-            )
+            # Áudio 16 kHz mono extraído durante a ingestão, quando disponível
+            ingest_audio = video_path.parent / AUDIO_NAME
+            audio_path = ingest_audio if ingest_audio.exists() else video_path.with_suffix('.wav')
+            
+            # FFmpeg para extrair áudio (supervisionado pelo runner, como os demais)
+            if audio_path != ingest_audio:
+                cmd = (
+                    ffmpeg
+                    .input(str(video_path))
+                    .output(str(audio_path), acodec='pcm_s16le', ac=1, ar='16000')
+                    .overwrite_output()
+                    .compile()
+                )
+                await asyncio.to_thread(
+                    ffmpeg_runner.run, cmd, "ffmpeg:audio_whisper", output_path=str(audio_path)
+                )
             
             # Transcrever com Whisper
             result = self.whisper_model.transcribe(
@@ -51,13 +79,17 @@ class VideoProcessor:
             )
             
             # Limpar arquivo temporário
-            audio_path.unlink()
+            if audio_path != ingest_audio:
+                audio_path.unlink()
             
-            return {
+            transcription = {
                 "text": result["text"],
                 "segments": result["segments"],
                 "language": result["language"]
             }
+            if content_hash:
+                await asyncio.to_thread(transcript_index.save, content_hash, transcription)
+            return transcription
             
         except Exception as e:
             raise Exception(f"Erro na transcrição: {str(e)}")
@@ -263,21 +295,53 @@ class VideoProcessor:
                     "text": phrase["text"]
                 })
             
+            # Frases vizinhas geram janelas quase iguais: descartar antes do render
+            try:
+                selected_segments = await asyncio.to_thread(
+                    self.dedup.filter, video_path, selected_segments,
+                    lambda s: (s["start"], s["end"]), lambda s: s["impact_score"]
+                )
+            except (FFmpegError, RuntimeError, OSError) as e:
+                print(f"Filtro de duplicatas indisponível ({e})")
+            
+            # Trilha ASS única da fonte (timestamps de palavras do Whisper)
+            self.subtitles.build_source_track(video_path, transcription)
+            
             # Processar cada segmento
             for i, segment in enumerate(selected_segments):
                 clip_id = f"clip_{i+1}"
                 output_path = video_path.parent / f"{clip_id}_vertical.mp4"
                 
-                # Gerar clip com FFmpeg
-                await self._create_vertical_clip(
-                    video_path, 
-                    output_path, 
-                    segment["start"], 
-                    segment["end"],
-                    segment["text"]
+                # Fatia da legenda com tempos relativos ao ponto de seek do clip
+                subtitle_path = output_path.with_suffix('.ass')
+                has_subtitles = self.subtitles.write_clip_track(
+                    video_path, segment["start"], segment["end"], subtitle_path,
+                    time_origin=plan_clip_seek(
+                        video_path, segment["start"], segment["end"] - segment["start"]
+                    )["input_seek"]
                 )
                 
+                # Gerar clip com FFmpeg; falha de um clip não derruba os outros
+                error = None
+                report = {}
+                try:
+                    report = await self._create_vertical_clip(
+                        video_path, 
+                        output_path, 
+                        segment["start"], 
+                        segment["end"],
+                        subtitle_path if has_subtitles else None
+                    )
+                except FFmpegError as e:
+                    if e.kind == "cancelled":
+                        raise
+                    error = e.to_dict()
+                finally:
+                    subtitle_path.unlink(missing_ok=True)
+                
                 clips.append({
+                    "rendered": error is None,
+                    "error": error,
                     "id": clip_id,
                     "filename": f"Clip_{i+1}_Viral.mp4",
                     "file_path": str(output_path),
@@ -286,7 +350,8 @@ class VideoProcessor:
                     "duration": segment["end"] - segment["start"],
                     "impact_score": segment["impact_score"],
                     "description": segment["text"][:100] + "...",
-                    "viral_potential": min(100, int(segment["impact_score"] * 2))
+                    "viral_potential": min(100, int(segment["impact_score"] * 2)),
+                    **report
                 })
             
             return clips
@@ -300,73 +365,83 @@ class VideoProcessor:
         output_path: Path, 
         start_time: float, 
         end_time: float,
-        subtitle_text: str
-    ):
-        """Criar clip vertical 9:16 com zoom dinâmico e legendas"""
+        subtitle_path: Optional[Path] = None
+    ) -> Dict:
+        """Criar clip vertical 9:16 com zoom dinâmico e legendas
+
+        Retorna tamanho/bitrate alcançados (limite de 16MB do WhatsApp).
+        """
         try:
-            # Comando FFmpeg otimizado para WhatsApp (100% compatibilidade)
-            cmd = [
-                'ffmpeg', '-y',
-                '-i', str(input_path),
-                '-ss', str(start_time),
-                '-t', str(end_time - start_time),
-                
-                # Vídeo: H.264 High Profile Level 4.0 + yuv420p
-                '-c:v', 'libx264',
-                '-profile:v', 'high',
-                '-level', '4.0',
-                '-pix_fmt', 'yuv420p',
-                
-                # Taxa de quadros constante (CFR) 30 fps
-                '-r', '30',
-                '-vsync', 'cfr',
-                
-                # GOP otimizado (keyframes a cada 2 segundos)
-                '-g', '60',
-                '-keyint_min', '60',
-                '-sc_threshold', '0',
-                
-                # Qualidade otimizada
-                '-crf', '21',
-                '-preset', 'medium',
-                '-tune', 'film',
-                
-                # Áudio: AAC 128 kbps (WhatsApp padrão)
-                '-c:a', 'aac',
-                '-b:a', '128k',
-                '-ar', '44100',
-                '-ac', '2',
-                
-                # Formato vertical 9:16 com crop inteligente
-                '-vf', (
-                    'scale=1080:1920:force_original_aspect_ratio=increase,'
-                    'crop=1080:1920,'
-                    # Adicionar texto (legenda) se necessário
-                    f'drawtext=text=\'{subtitle_text[:50]}\':'
-                    'fontsize=40:'
-                    'fontcolor=white:'
-                    'shadowcolor=black@0.8:'
-                    'shadowx=2:'
-                    'shadowy=2:'
-                    'x=(w-text_w)/2:'
-                    'y=h-120'
-                ),
-                
-                # Metadados otimizados
-                '-movflags', '+faststart',
-                '-fflags', '+genpts',
-                
-                str(output_path)
-            ]
-            
-            # Executar comando
-            process = await asyncio.create_subprocess_exec(
-                *cmd,
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE
+            # Perfil compartilhado (preset/CRF/threads conforme resolução e carga)
+            source_info = media_info.probe(input_path)
+            settings = encoding_profiles.select(
+                platform="whatsapp",
+                source_height=source_info["video"]["height"]
+            )
+            # Saída sempre 1080x1920 (o crop define a resolução, sem escala extra)
+            settings = encoding_profiles.constrain_size(
+                settings, end_time - start_time, source_info,
+                output_size=(1080, 1920), allow_scale=False
+            )
+            settings["audio_filter"] = await asyncio.to_thread(
+                loudness.gain_filter, input_path, start_time, end_time - start_time
             )
             
-            await process.communicate()
+            # Seek rápido até o keyframe anterior + seek curto e preciso na saída;
+            # os filtros enxergam t=0 no keyframe, não no início do clip
+            plan = plan_clip_seek(input_path, start_time, end_time - start_time)
+            input_seek, output_seek = seek_args(plan)
+            
+            # Trilha de crop calculada uma vez por fonte e reaproveitada por todos os clips
+            track = await asyncio.to_thread(
+                self.reframer.compute_track, input_path, input_path.parent / PROXY_NAME
+            )
+            commands_path = output_path.with_suffix('.sendcmd')
+            reframe_filters = self.reframer.vertical_filters(
+                track, start_time, end_time, commands_path,
+                time_origin=plan["input_seek"]
+            )
+            
+            video_filters = list(reframe_filters)
+            if subtitle_path is not None:
+                video_filters.append(self.subtitles.burn_filter(subtitle_path))
+            
+            # Comando FFmpeg otimizado para WhatsApp (100% compatibilidade)
+            def build_cmd(current: Dict) -> List[str]:
+                return [
+                    'ffmpeg', '-y',
+                    *input_seek,
+                    '-i', str(input_path),
+                    *output_seek,
+                    
+                    # H.264 High + yuv420p, AAC, GOP de 2s e faststart
+                    *encoding_profiles.ffmpeg_args(current),
+                    
+                    # Taxa de quadros constante (CFR) e keyframes fixos a cada 2 segundos
+                    '-vsync', 'cfr',
+                    '-keyint_min', str(current["gop"]),
+                    '-sc_threshold', '0',
+                    
+                    # Formato vertical 9:16 seguindo o assunto + legenda ASS (mesmo passe do corte)
+                    '-vf', ','.join(video_filters),
+                    
+                    # Metadados otimizados
+                    '-fflags', '+genpts',
+                    
+                    str(output_path)
+                ]
+            
+            # Executar comando (timeout, limite de memória e fallback no runner)
+            try:
+                used = await asyncio.to_thread(
+                    ffmpeg_runner.run_encode, build_cmd, settings, "ffmpeg:vertical",
+                    end_time - start_time, str(output_path)
+                )
+            finally:
+                commands_path.unlink(missing_ok=True)
+            return encoding_profiles.encode_report(used, output_path, end_time - start_time)
             
+        except FFmpegError:
+            raise
         except Exception as e:
             raise Exception(f"Erro na criação do clip: {str(e)}")
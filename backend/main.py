@@ -3,17 +3,35 @@ VCUT Pro - Sistema Profissional de Cortes Inteligentes
 Pipeline completo inspirado em OpusClip/Wisecut
 """
 
-from fastapi import FastAPI, UploadFile, File, HTTPException, BackgroundTasks
+from fastapi import FastAPI, UploadFile, File, Form, HTTPException, BackgroundTasks, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
+from fastapi.responses import StreamingResponse, PlainTextResponse
+from starlette.concurrency import iterate_in_threadpool
 import uvicorn
 import uuid
 from pathlib import Path
-from typing import Dict
+from typing import Dict, List, Optional
 import asyncio
+import os
+import json
+import time
 
+from config import Config
 from core.simple_ffmpeg_only import SimpleFFmpegProcessor
+from core.encoding_profiles import encoding_profiles, SIZE_REPORT_FIELDS
+from core.draft_upgrader import DraftUpgrader
+from core.ffmpeg_runner import ffmpeg_runner, FFmpegError
+from core.media_info import media_info
+from core.renditions import parse_aspects
+from core.timeline import timeline
+from core.transcript_index import transcript_index
+from core.batch_cut import validate_ranges, merge_ranges
 from utils.file_manager import FileManager
+from utils.downloads import content_disposition, file_download_response, ZipStream
+from utils.job_checkpoints import job_checkpoints
+from utils.streaming_ingest import extract_analysis_artifacts
+from utils.storage_manager import StorageManager
+from utils.tracing import tracer
 
 app = FastAPI(title="VCUT Pro API", version="2.0.0")
 
@@ -29,6 +47,28 @@ app.add_middleware(
 processor = SimpleFFmpegProcessor()
 file_manager = FileManager()
 processing_jobs: Dict[str, Dict] = {}
+render_locks: Dict[str, asyncio.Lock] = {}
+draft_upgrader = DraftUpgrader(processor, processing_jobs, render_locks, file_manager)
+storage_manager = StorageManager(file_manager, processing_jobs, render_locks)
+background_workers = []
+
+@app.on_event("startup")
+async def start_background_workers():
+    if Config.JOB_RESUME_ON_STARTUP:
+        await resume_checkpointed_jobs()
+    background_workers.append(asyncio.create_task(draft_upgrader.run()))
+    background_workers.append(asyncio.create_task(storage_manager.run_janitor()))
+    if Config.JOB_ABANDON_TIMEOUT > 0:
+        background_workers.append(asyncio.create_task(abandon_watchdog()))
+
+@app.on_event("shutdown")
+async def stop_ffmpeg_processes():
+    # Jobs em andamento não são finalizados: o checkpoint fica para o próximo worker
+    for job in processing_jobs.values():
+        if job.get("status") == "processing":
+            job["interrupted"] = True
+    # Nenhum ffmpeg órfão segura núcleos depois que a API cai
+    ffmpeg_runner.kill_all()
 
 @app.get("/")
 async def health_check():
@@ -38,35 +78,240 @@ async def health_check():
 async def health():
     return {"status": "ok"}
 
-@app.post("/upload")
-async def upload_video(background_tasks: BackgroundTasks, file: UploadFile = File(...)):
-    job_id = str(uuid.uuid4())
-    file_path = await file_manager.save_upload(file, job_id)
-    
-    processing_jobs[job_id] = {
+@app.get("/metrics")
+async def metrics():
+    """Métricas no formato Prometheus (fila, encodes, vazão)"""
+    return PlainTextResponse(
+        tracer.prometheus(processing_jobs, encoding_profiles.active_encodes),
+        media_type="text/plain; version=0.0.4"
+    )
+
+def automatic_job(job_id: str, ingest: Dict, created_at: float, stage: str) -> Dict:
+    return {
+        "job_id": job_id,
         "status": "processing",
         "progress": 0,
-        "stage": "Iniciando...",
+        "created_at": created_at,
+        "last_seen": time.time(),
+        "stage": stage,
+        "content_hash": ingest["content_hash"],
+        "source_path": str(ingest["file_path"]),
         "clips": []
     }
+
+def start_automatic_job(background_tasks: BackgroundTasks, job_id: str, ingest: Dict) -> Dict:
+    processing_jobs[job_id] = automatic_job(job_id, ingest, time.time(), "Iniciando...")
+    if Config.JOB_RESUME_ON_STARTUP:
+        job_checkpoints.create(job_id, processing_jobs[job_id], ingest)
     
-    background_tasks.add_task(process_video_pipeline, job_id, file_path)
+    background_tasks.add_task(process_video_pipeline, job_id, ingest)
     return {"job_id": job_id, "message": "Processamento iniciado"}
 
+async def resume_checkpointed_jobs():
+    """Recria os jobs automáticos interrompidos por um reinício e retoma do último checkpoint"""
+    for checkpoint in job_checkpoints.pending():
+        job_id = checkpoint["job_id"]
+        ingest = dict(checkpoint["ingest"], file_path=Path(checkpoint["ingest"]["file_path"]))
+        if not ingest["file_path"].exists():
+            print(f"⚠️ Job {job_id} não retomado: fonte {ingest['file_path']} não existe mais")
+            job_checkpoints.remove(job_id)
+            continue
+        
+        processing_jobs[job_id] = automatic_job(job_id, ingest, checkpoint["created_at"], "Retomando após reinício...")
+        # O cliente ainda não sabe do reinício: o watchdog só conta a partir da primeira consulta
+        processing_jobs[job_id]["resumed"] = True
+        task = asyncio.create_task(process_video_pipeline(job_id, ingest))
+        background_workers.append(task)
+        task.add_done_callback(background_workers.remove)
+        print(f"Job {job_id} retomado do checkpoint (etapas concluídas: {', '.join(checkpoint['stages']) or 'nenhuma'})")
+
+@app.post("/upload")
+async def upload_video(background_tasks: BackgroundTasks, file: UploadFile = File(...)):
+    job_id = str(uuid.uuid4())
+    ingest = await file_manager.ingest_upload(file, job_id, analyze=True)
+    return start_automatic_job(background_tasks, job_id, ingest)
+
+@app.post("/upload/stream")
+async def upload_video_stream(request: Request, background_tasks: BackgroundTasks,
+                              filename: str = "video.mp4"):
+    """Upload com corpo bruto: áudio, proxy e hash são gerados enquanto os bytes chegam"""
+    job_id = str(uuid.uuid4())
+    ingest = await file_manager.ingest_stream(request.stream(), filename, job_id, analyze=True)
+    return start_automatic_job(background_tasks, job_id, ingest)
+
+def get_job_or_404(job_id: str) -> Dict:
+    job = processing_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job não encontrado")
+    job["last_seen"] = time.time()  # Cliente ainda interessado (ver abandon_watchdog)
+    job.pop("resumed", None)
+    return job
+
+class JobCancelled(Exception):
+    pass
+
+def raise_if_cancelled(job: Dict):
+    """Ponto de cancelamento cooperativo entre etapas do pipeline (também no encerramento do servidor)"""
+    if job.get("cancelled") or job.get("interrupted"):
+        raise JobCancelled()
+
+def discard_partial_outputs(job: Dict):
+    """Remove arquivos de clips que não chegaram a ficar prontos"""
+    for clip in job.get("clips", []):
+        if not clip.get("rendered", True) and os.path.exists(clip["file_path"]):
+            os.remove(clip["file_path"])
+
+def fail_job(job: Dict, error: Exception):
+    """Erro do job, a menos que a falha seja consequência do cancelamento ou do encerramento"""
+    if job.get("interrupted"):
+        return
+    if job.get("cancelled"):
+        discard_partial_outputs(job)
+        return
+    job["status"] = "error"
+    job["error"] = str(error)
+
+def cancel_job(job: Dict, reason: str) -> int:
+    """Marca o job, mata os ffmpeg dele e descarta saídas parciais; retorna processos mortos"""
+    job["cancelled"] = True
+    job["cancel_reason"] = reason
+    job["status"] = "cancelled"
+    job["stage"] = "Cancelado"
+    killed = ffmpeg_runner.kill_job(job)
+    discard_partial_outputs(job)
+    return killed
+
+@app.post("/cancel/{job_id}")
+async def cancel(job_id: str):
+    """Cancela um job em andamento; renders pendentes dele não começam mais"""
+    job = get_job_or_404(job_id)
+    if job["status"] == "error":
+        raise HTTPException(status_code=409, detail="Job já terminou com erro")
+    if job["status"] == "completed":
+        raise HTTPException(status_code=409, detail="Job já concluído")
+    killed = cancel_job(job, "cliente")
+    return {"job_id": job_id, "status": "cancelled", "killed_processes": killed}
+
+def cancel_abandoned_jobs(now: float) -> List[str]:
+    """Cancela jobs em processamento que ninguém consulta há JOB_ABANDON_TIMEOUT segundos
+
+    Jobs retomados após um reinício ficam de fora até a primeira consulta do
+    cliente (que pode levar mais que o timeout para reconectar).
+    """
+    cancelled = []
+    for job_id, job in list(processing_jobs.items()):
+        if job.get("status") != "processing" or job.get("resumed"):
+            continue
+        idle = now - job.get("last_seen", job.get("created_at", now))
+        if idle > Config.JOB_ABANDON_TIMEOUT:
+            killed = cancel_job(job, "abandonado")
+            print(f"Job {job_id} abandonado há {idle:.0f}s: cancelado ({killed} ffmpeg encerrados)")
+            cancelled.append(job_id)
+    return cancelled
+
+async def abandon_watchdog():
+    """Loop em segundo plano do cancelamento de jobs abandonados"""
+    while True:
+        await asyncio.sleep(Config.JOB_WATCHDOG_INTERVAL)
+        cancel_abandoned_jobs(time.time())
+
 @app.get("/status/{job_id}")
 async def get_status(job_id: str):
-    if job_id not in processing_jobs:
-        raise HTTPException(status_code=404, detail="Job não encontrado")
-    return processing_jobs[job_id]
+    return get_job_or_404(job_id)
 
 @app.get("/download/{job_id}/{clip_id}")
-async def download_clip(job_id: str, clip_id: str):
-    job = processing_jobs[job_id]
+async def download_clip(request: Request, job_id: str, clip_id: str):
+    job = get_job_or_404(job_id)
     clip = next((c for c in job["clips"] if c["id"] == clip_id), None)
     if not clip:
         raise HTTPException(status_code=404, detail="Clip não encontrado")
     
-    return FileResponse(clip["file_path"], filename=clip["filename"])
+    # Renderização sob demanda no primeiro download
+    if not clip.get("rendered", True) and job.get("cancelled"):
+        raise HTTPException(status_code=409, detail="Job cancelado")
+    if not clip.get("rendered", True) and job.get("source_evicted"):
+        raise HTTPException(status_code=410, detail="Fonte removida por falta de espaço")
+    if not await ensure_clip_rendered(job, clip):
+        error = clip.get("error") or {}
+        raise HTTPException(status_code=500, detail=error.get("message", "Erro ao renderizar clip"))
+    
+    storage_manager.touch(clip["file_path"])
+    local_path = await file_manager.ensure_local(clip["file_path"])
+    return file_download_response(request, local_path, clip["filename"])
+
+async def ensure_timeline(job: Dict) -> Dict:
+    """Manifesto da linha do tempo do job (gerado uma vez por fonte)"""
+    manifest = timeline.load(job["source_path"])
+    if manifest is not None:
+        return manifest
+    if job.get("source_evicted"):
+        raise HTTPException(status_code=410, detail="Fonte removida por falta de espaço")
+    source_path = await file_manager.ensure_local(job["source_path"])
+    with tracer.stage(job, "linha_do_tempo"):
+        return await asyncio.to_thread(timeline.generate, source_path)
+
+async def await_analysis(analysis: asyncio.Task, duration: float) -> bool:
+    """Espera o ffmpeg de análise do upload com o mesmo timeout do runner; estourou = refaz do arquivo"""
+    try:
+        return await asyncio.wait_for(analysis, ffmpeg_runner.timeout_for(duration))
+    except asyncio.TimeoutError:
+        print("⚠️ Análise do upload excedeu o tempo limite, extraindo do arquivo salvo")
+        return False
+
+async def prebuild_timeline(job: Dict):
+    """Geração na ingestão, sem atrasar os clips; falha só é registrada"""
+    try:
+        await ensure_timeline(job)
+    except Exception as e:
+        print(f"⚠️ Linha do tempo não gerada: {e}")
+
+@app.get("/timeline/{job_id}")
+async def get_timeline(job_id: str):
+    """Miniaturas (sprites + WebVTT) e pirâmide de picos de áudio para a UI"""
+    job = get_job_or_404(job_id)
+    try:
+        manifest = await ensure_timeline(job)
+    except FFmpegError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    return {**manifest, "base_url": f"/timeline/{job_id}/"}
+
+@app.get("/timeline/{job_id}/{name}")
+async def get_timeline_file(request: Request, job_id: str, name: str):
+    """Arquivo da linha do tempo, com Range (a UI busca só o trecho de picos visível)"""
+    job = get_job_or_404(job_id)
+    manifest = timeline.load(job["source_path"])
+    if manifest is None or name not in timeline.files(manifest):
+        raise HTTPException(status_code=404, detail="Arquivo não encontrado")
+    media_types = {".jpg": "image/jpeg", ".vtt": "text/vtt", ".bin": "application/octet-stream",
+                   ".json": "application/json"}
+    path = timeline.timeline_dir(job["source_path"]) / name
+    storage_manager.touch(path.parent)
+    return file_download_response(request, path, name, media_types[path.suffix])
+
+@app.get("/download/{job_id}")
+async def download_all_clips(job_id: str):
+    """Todos os clips do job em um ZIP montado em streaming"""
+    job = get_job_or_404(job_id)
+    if not job["clips"]:
+        raise HTTPException(status_code=404, detail="Nenhum clip disponível")
+    
+    async def zip_chunks():
+        zip_stream = ZipStream()
+        for clip in job["clips"]:
+            if not await ensure_clip_rendered(job, clip):
+                continue
+            local_path = await file_manager.ensure_local(clip["file_path"])
+            # Leitura do disco fora do event loop
+            async for chunk in iterate_in_threadpool(zip_stream.add_file(local_path, clip["filename"])):
+                if chunk:
+                    yield chunk
+        yield zip_stream.close()
+    
+    return StreamingResponse(
+        zip_chunks(),
+        media_type="application/zip",
+        headers={"content-disposition": content_disposition(f"vcut_{job_id}.zip")}
+    )
 
 @app.post("/manual-cut")
 async def manual_cut(
@@ -74,39 +319,221 @@ async def manual_cut(
     file: UploadFile = File(...),
     start_time: str = "00:00",
     end_time: str = "00:30",
-    title: str = "Corte_Manual"
+    title: str = "Corte_Manual",
+    aspects: Optional[str] = None
 ):
-    """Corte manual rápido sem IA - apenas FFmpeg otimizado"""
+    """Corte manual rápido sem IA - apenas FFmpeg otimizado
+    
+    ``aspects`` (ex.: "9:16,1:1,16:9") gera o mesmo corte em vários formatos
+    num único passe de decodificação; cada formato vira um clip do job.
+    """
+    aspect_list, errors = parse_aspects(aspects)
+    if errors:
+        raise HTTPException(status_code=422, detail=errors)
+    
     job_id = str(uuid.uuid4())
     file_path = await file_manager.save_upload(file, job_id)
     
     processing_jobs[job_id] = {
+        "job_id": job_id,
         "status": "processing",
         "progress": 0,
+        "created_at": time.time(),
+        "last_seen": time.time(),
         "stage": "Processando corte...",
+        "source_path": str(file_path),
         "clips": []
     }
     
-    background_tasks.add_task(process_manual_cut, job_id, file_path, start_time, end_time, title)
+    background_tasks.add_task(process_manual_cut, job_id, file_path, start_time, end_time, title, aspect_list)
     return {"job_id": job_id, "message": "Corte manual iniciado"}
 
-async def process_video_pipeline(job_id: str, file_path: Path):
+@app.post("/batch-cut")
+async def batch_cut(
+    background_tasks: BackgroundTasks,
+    ranges: str = Form(...),
+    file: Optional[UploadFile] = File(None),
+    source_job_id: Optional[str] = Form(None),
+    content_hash: Optional[str] = Form(None)
+):
+    """Vários cortes de uma única fonte: upload novo, job existente ou hash de conteúdo
+    
+    ``ranges`` é uma lista JSON de {"start", "end", "title"?} em segundos ou MM:SS.
+    """
+    try:
+        requested = json.loads(ranges)
+    except ValueError:
+        raise HTTPException(status_code=422, detail="ranges deve ser uma lista JSON")
+    if not isinstance(requested, list):
+        raise HTTPException(status_code=422, detail="ranges deve ser uma lista JSON")
+    
+    job_id = str(uuid.uuid4())
+    if file is not None:
+        source_path = await file_manager.save_upload(file, job_id)
+    elif source_job_id:
+        source_path = get_job_or_404(source_job_id).get("source_path")
+        if source_path:
+            try:
+                source_path = await file_manager.ensure_local(source_path)
+            except Exception:
+                source_path = None
+        if not source_path or not Path(source_path).exists():
+            raise HTTPException(status_code=404, detail="Fonte do job não disponível")
+        source_path = Path(source_path)
+    elif content_hash:
+        source_path = file_manager.find_by_hash(content_hash)
+        if source_path is None:
+            raise HTTPException(status_code=404, detail="Conteúdo não encontrado")
+    else:
+        raise HTTPException(status_code=422, detail="Envie file, source_job_id ou content_hash")
+    
+    try:
+        return await start_batch_job(background_tasks, job_id, source_path, requested)
+    except HTTPException:
+        if file is not None:
+            file_manager.cleanup_job(job_id)  # Upload recusado não fica ocupando disco
+        raise
+
+async def start_batch_job(background_tasks: BackgroundTasks, job_id: str,
+                          source_path: Path, requested: List[Dict]) -> Dict:
+    """Valida/funde os intervalos e agenda o corte em lote da fonte"""
+    try:
+        info = await asyncio.to_thread(media_info.probe, source_path)
+    except (RuntimeError, FFmpegError, OSError) as e:
+        raise HTTPException(status_code=400, detail=f"Não foi possível ler o vídeo: {e}")
+    cuts, errors = validate_ranges(requested, info["duration"])
+    if errors:
+        raise HTTPException(status_code=422, detail=errors)
+    merged = merge_ranges(cuts)
+    
+    processing_jobs[job_id] = {
+        "job_id": job_id,
+        "status": "processing",
+        "progress": 0,
+        "created_at": time.time(),
+        "last_seen": time.time(),
+        "stage": f"Processando {len(cuts)} cortes...",
+        "source_path": str(source_path),
+        "clips": [],
+        "cuts": []
+    }
+    
+    background_tasks.add_task(process_batch_cut, job_id, source_path, cuts, merged)
+    return {
+        "job_id": job_id,
+        "message": "Cortes em lote iniciados",
+        "cuts": len(cuts),
+        "renders": len(merged)
+    }
+
+@app.get("/transcripts/search")
+async def search_transcripts(q: str, content_hash: str, limit: Optional[int] = None):
+    """Busca de frase nos vídeos do cliente (``content_hash`` obrigatório, lista separada por vírgulas)"""
+    hashes = [h.strip() for h in content_hash.split(",") if h.strip()]
+    try:
+        return await asyncio.to_thread(transcript_index.search, q, hashes, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+@app.post("/transcripts/cut")
+async def cut_from_transcript(
+    background_tasks: BackgroundTasks,
+    q: str = Form(...),
+    content_hash: str = Form(...),
+    padding: float = Form(Config.TRANSCRIPT_CUT_PADDING),
+    max_cuts: int = Form(Config.BATCH_MAX_CUTS)
+):
+    """Busca a frase em um conteúdo e corta cada ocorrência (reaproveita o corte em lote)"""
+    source_path = file_manager.find_by_hash(content_hash)
+    if source_path is None:
+        raise HTTPException(status_code=404, detail="Conteúdo não encontrado")
+    try:
+        result = await asyncio.to_thread(transcript_index.search, q, [content_hash], max_cuts)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    if not result["hits"]:
+        raise HTTPException(status_code=404, detail="Frase não encontrada")
+    
+    requested = [
+        {
+            "start": max(0.0, hit["start"] - padding),
+            "end": hit["end"] + padding,
+            "title": f"Frase_{i + 1}"
+        }
+        for i, hit in enumerate(result["hits"])
+    ]
+    response = await start_batch_job(background_tasks, str(uuid.uuid4()), source_path, requested)
+    return {**response, "hits": result["hits"]}
+
+@app.post("/transcripts/{content_hash}")
+async def index_transcript(content_hash: str, request: Request):
+    """Indexa uma transcrição no formato do Whisper (segments com words) para o conteúdo"""
+    try:
+        transcription = await request.json()
+    except ValueError:
+        raise HTTPException(status_code=422, detail="Corpo deve ser JSON")
+    if not isinstance(transcription, dict) or not isinstance(transcription.get("segments"), list):
+        raise HTTPException(status_code=422, detail="Transcrição sem segments")
+    try:
+        words = await asyncio.to_thread(transcript_index.save, content_hash, transcription)
+    except (KeyError, TypeError, ValueError) as e:
+        raise HTTPException(status_code=422, detail=f"Transcrição inválida: {e}")
+    return {"content_hash": content_hash, "words": words}
+
+async def process_video_pipeline(job_id: str, ingest: Dict):
     try:
         job = processing_jobs[job_id]
+        file_path = ingest["file_path"]
         
-        # Pipeline "IA" simulado
-        job["stage"] = "Analisando com IA..."
-        job["progress"] = 20
-        await asyncio.sleep(2)  # Simular processamento
+        # Etapas e clips concluídos antes de um reinício não são refeitos
+        checkpoint = job_checkpoints.load(job_id) or {"stages": [], "clips": None}
         
-        job["stage"] = "Transcrevendo áudio..."
-        job["progress"] = 40
-        await asyncio.sleep(1)
+        # Único ffprobe do upload (formato, streams e keyframes em cache)
+        with tracer.stage(job, "probe"):
+            await asyncio.to_thread(media_info.probe, file_path)
         
-        job["stage"] = "Detectando cenas..."
-        job["progress"] = 60
-        await asyncio.sleep(1)
+        # Cópia durável da fonte no backend de armazenamento
+        if "publicacao_fonte" not in checkpoint["stages"]:
+            with tracer.stage(job, "publicacao_fonte"):
+                await file_manager.publish(file_path)
+            job_checkpoints.update(job_id, stage="publicacao_fonte")
         
+        # Áudio e proxy saem do upload em streaming; se não saíram completos, extrai agora
+        if "extracao_audio_proxy" not in checkpoint["stages"]:
+            with tracer.stage(job, "extracao_audio_proxy"):
+                analysis = ingest.get("analysis")
+                duration = media_info.probe(file_path)["duration"]
+                if analysis is None or not await await_analysis(analysis, duration):
+                    raise_if_cancelled(job)
+                    await extract_analysis_artifacts(file_path, duration)
+            job_checkpoints.update(job_id, stage="extracao_audio_proxy")
+        
+        raise_if_cancelled(job)
+        
+        # Linha do tempo (miniaturas + picos) em paralelo com a geração dos clips
+        task = asyncio.create_task(prebuild_timeline(job))
+        background_workers.append(task)
+        task.add_done_callback(background_workers.remove)
+        
+        clips_info = checkpoint["clips"]
+        if clips_info is None:
+            # Pipeline "IA" simulado
+            job["stage"] = "Analisando com IA..."
+            job["progress"] = 20
+            await asyncio.sleep(2)  # Simular processamento
+            
+            job["stage"] = "Transcrevendo áudio..."
+            job["progress"] = 40
+            await asyncio.sleep(1)
+            
+            job["stage"] = "Detectando cenas..."
+            job["progress"] = 60
+            await asyncio.sleep(1)
+        else:
+            done = await asyncio.to_thread(job_checkpoints.revalidate, clips_info)
+            print(f"Job {job_id}: análise do checkpoint, {done}/{len(clips_info)} clips já prontos")
+        
+        raise_if_cancelled(job)
         job["stage"] = "Gerando clips inteligentes..."
         job["progress"] = 80
         
@@ -114,7 +541,20 @@ async def process_video_pipeline(job_id: str, file_path: Path):
         output_dir = file_path.parent / "clips"
         output_dir.mkdir(exist_ok=True)
         
-        clips_info = processor.generate_automatic_clips(str(file_path), str(output_dir))
+        with tracer.stage(job, "geracao_clips"):
+            if clips_info is None:
+                # Plano (janelas, títulos, notas) salvo antes de qualquer encode
+                clips_info = await asyncio.to_thread(
+                    processor.plan_automatic_clips, str(file_path), str(output_dir)
+                )
+                job_checkpoints.update(job_id, stage="analise", clips=clips_info)
+            if not Config.LAZY_CLIP_RENDERING:
+                # Checkpoint a cada clip: um reinício só refaz os que faltam
+                await asyncio.to_thread(
+                    processor.generate_automatic_clips, str(file_path), str(output_dir), clips_info,
+                    lambda clip_info: job_checkpoints.update(job_id, clips=clips_info)
+                )
+            # Senão, apenas metadados: cada clip é renderizado no primeiro download
         
         # Converter para formato esperado pelo frontend
         clips = []
@@ -122,26 +562,77 @@ async def process_video_pipeline(job_id: str, file_path: Path):
             clips.append({
                 "id": f"ai_clip_{i+1}",
                 "filename": clip_info["filename"],
-                "file_path": str(output_dir / clip_info["filename"]),
+                "file_path": clip_info["file_path"],
                 "title": clip_info["title"],
                 "description": clip_info["description"],
                 "duration": clip_info["duration"],
                 "start_time": clip_info["start_time"],
                 "ai_score": clip_info["ai_score"],
                 "engagement_prediction": clip_info["engagement_prediction"],
-                "optimal_for": clip_info["optimal_for"]
+                "optimal_for": clip_info["optimal_for"],
+                "rendered": clip_info["rendered"],
+                "rerenderable": True,  # render_clip refaz a partir da fonte: pode ser despejado
+                "file_size": clip_info["file_size"],
+                "error": clip_info.get("error"),
+                **{key: clip_info[key] for key in SIZE_REPORT_FIELDS if key in clip_info}
             })
         
+        if not Config.LAZY_CLIP_RENDERING:
+            for clip in clips:
+                if clip["rendered"]:
+                    await file_manager.publish(clip["file_path"])
+        
+        job["source_path"] = str(file_path)
         job["clips"] = clips
+        raise_if_cancelled(job)
+        job_checkpoints.remove(job_id)
         job["status"] = "completed"
         job["progress"] = 100
-        job["stage"] = "IA concluída! 10 clips gerados"
+        job["stage"] = f"IA concluída! {len(clips)} clips gerados"
+        
+        if Config.LAZY_CLIP_RENDERING:
+            await prerender_top_clips(job, Config.PRERENDER_TOP_N)
         
     except Exception as e:
-        job["status"] = "error"
-        job["error"] = str(e)
+        fail_job(job, e)
+        if not job.get("interrupted"):
+            job_checkpoints.remove(job_id)
 
-async def process_manual_cut(job_id: str, file_path: Path, start_time: str, end_time: str, title: str):
+async def ensure_clip_rendered(job: Dict, clip: Dict) -> bool:
+    """Renderiza o clip se ainda não existir (uma única vez por clip)"""
+    if clip.get("rendered", True):
+        return True
+    
+    if job.get("source_evicted") or job.get("cancelled"):
+        return False
+    
+    lock = render_locks.setdefault(clip["file_path"], asyncio.Lock())
+    async with lock:
+        # Na fila do lock quando o job foi cancelado: não renderiza
+        if not clip["rendered"] and not job.get("cancelled"):
+            await storage_manager.reserve(
+                int(clip["duration"] * Config.STORAGE_RENDER_BYTES_PER_SECOND)
+            )
+            # Sob carga entrega rascunho rápido; o DraftUpgrader reencoda depois
+            draft = encoding_profiles.should_emit_draft()
+            source_path = await file_manager.ensure_local(job["source_path"])
+            with tracer.stage(job, "render"):
+                await asyncio.to_thread(processor.render_clip, str(source_path), clip, draft)
+            if clip["rendered"]:
+                await file_manager.publish(clip["file_path"])
+    
+    return clip["rendered"]
+
+async def prerender_top_clips(job: Dict, top_n: int):
+    """Pré-renderização especulativa dos clips com maior ai_score"""
+    ranked = sorted(job["clips"], key=lambda c: c["ai_score"], reverse=True)
+    for clip in ranked[:top_n]:
+        if job.get("cancelled"):
+            break
+        await ensure_clip_rendered(job, clip)
+
+async def process_manual_cut(job_id: str, file_path: Path, start_time: str, end_time: str, title: str,
+                             aspects: Optional[List[str]] = None):
     """Processamento rápido de corte manual"""
     try:
         job = processing_jobs[job_id]
@@ -154,21 +645,64 @@ async def process_manual_cut(job_id: str, file_path: Path, start_time: str, end_
         start_seconds = time_to_seconds(start_time)
         end_seconds = time_to_seconds(end_time)
         
+        await asyncio.to_thread(media_info.probe, file_path)
+        
         job["stage"] = "Cortando vídeo..."
         job["progress"] = 50
         
+        if aspects:
+            if end_seconds <= start_seconds:
+                raise Exception("Duração inválida")
+            with tracer.stage(job, "corte_formatos"):
+                variants = await asyncio.to_thread(
+                    processor.cut_aspects,
+                    str(file_path), str(file_path.parent),
+                    start_seconds, end_seconds - start_seconds, aspects, title
+                )
+            
+            # Um resultado lógico: cada formato é um clip ligado ao mesmo corte
+            clips = []
+            for variant in variants:
+                await file_manager.publish(variant["file_path"])
+                clips.append({
+                    "id": f"manual_clip_{variant['aspect'].replace(':', 'x')}",
+                    "variant_of": "manual_clip",
+                    "aspect": variant["aspect"],
+                    "width": variant["width"],
+                    "height": variant["height"],
+                    "filename": variant["filename"],
+                    "file_path": variant["file_path"],
+                    "start_time": start_seconds,
+                    "end_time": end_seconds,
+                    "duration": end_seconds - start_seconds,
+                    "optimal_for": variant["optimal_for"],
+                    "description": f"Corte manual {variant['aspect']}: {start_time} - {end_time}",
+                    "file_size": variant["file_size"],
+                    **{key: variant[key] for key in SIZE_REPORT_FIELDS if key in variant}
+                })
+            
+            job["clips"] = clips
+            raise_if_cancelled(job)
+            job["status"] = "completed"
+            job["progress"] = 100
+            job["stage"] = "Concluído!"
+            return
+        
         # Criar clip com FFmpeg otimizado
         output_path = file_path.parent / f"{title}_WhatsApp.mp4"
         
-        result = processor.cut_custom_segment(
-            str(file_path), 
-            str(output_path), 
-            start_time,
-            end_time
-        )
+        with tracer.stage(job, "corte_manual"):
+            result = await asyncio.to_thread(
+                processor.cut_custom_segment,
+                str(file_path), 
+                str(output_path), 
+                start_time,
+                end_time
+            )
         
         if not result["success"]:
             raise Exception(result.get("error", "Erro no corte"))
+        await file_manager.publish(output_path)
         
         # Adicionar clip ao job
         clip = {
@@ -178,19 +712,71 @@ async def process_manual_cut(job_id: str, file_path: Path, start_time: str, end_
             "start_time": start_seconds,
             "end_time": end_seconds,
             "duration": end_seconds - start_seconds,
-            "description": f"Corte manual: {start_time} - {end_time}"
+            "description": f"Corte manual: {start_time} - {end_time}",
+            **{key: result[key] for key in SIZE_REPORT_FIELDS if key in result}
         }
         
         job["clips"] = [clip]
+        raise_if_cancelled(job)
         job["status"] = "completed"
         job["progress"] = 100
         job["stage"] = "Concluído!"
         
     except Exception as e:
-        job["status"] = "error"
-        job["error"] = str(e)
+        fail_job(job, e)
+
+async def process_batch_cut(job_id: str, file_path: Path, cuts: List[Dict], merged: List[Dict]):
+    """Renderiza os cortes fundidos e devolve o resultado de cada corte pedido"""
+    try:
+        job = processing_jobs[job_id]
+        output_dir = file_manager.get_output_dir(job_id)
+        
+        with tracer.stage(job, "corte_lote"):
+            rendered = await asyncio.to_thread(
+                processor.cut_batch, str(file_path), merged, str(output_dir)
+            )
+        
+        clips = []
+        cut_results = {}
+        for i, render in enumerate(rendered):
+            clip_id = f"batch_clip_{i+1}"
+            if render["success"]:
+                await file_manager.publish(render["file_path"])
+                clips.append({
+                    "id": clip_id,
+                    "filename": render["filename"],
+                    "file_path": render["file_path"],
+                    "title": render["title"],
+                    "start_time": render["start_time"],
+                    "end_time": render["end_time"],
+                    "duration": render["duration"],
+                    "file_size": render["file_size"],
+                    "description": f"Corte em lote: {render['start_time']:.1f}s - {render['end_time']:.1f}s",
+                    **{key: render[key] for key in SIZE_REPORT_FIELDS if key in render}
+                })
+            for index in render["requests"]:
+                cut_results[index] = {
+                    "index": index,
+                    "success": render["success"],
+                    "clip_id": clip_id if render["success"] else None,
+                    "merged": len(render["requests"]) > 1,
+                    "error": render.get("error")
+                }
+        
+        job["clips"] = clips
+        job["cuts"] = [cut_results[cut["index"]] for cut in cuts]
+        job["progress"] = 100
+        raise_if_cancelled(job)
+        if clips:
+            job["status"] = "completed"
+            job["stage"] = f"Concluído! {len(clips)} de {len(rendered)} cortes gerados"
+        else:
+            job["status"] = "error"
+            job["error"] = "Nenhum corte foi gerado"
+        
+    except Exception as e:
+        fail_job(job, e)
 
 if __name__ == "__main__":
-    import os
     port = int(os.getenv("PORT", 8000))
     uvicorn.run(app, host="0.0.0.0", port=port)
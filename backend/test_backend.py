@@ -42,6 +42,484 @@ def test_ffmpeg():
         print("❌ FFmpeg não encontrado")
         return False
 
+def run_check(check) -> bool:
+    """Teste com asserts (também coletado pelo pytest) executado no modo script"""
+    try:
+        check()
+        return True
+    except AssertionError as e:
+        print(f"❌ {check.__name__}: {e}")
+        return False
+
+def test_crop_track_smoothing():
+    print("🎯 Testando suavização da trilha de crop...")
+    import numpy as np
+    from core.reframe import Reframer
+
+    reframer = Reframer(analysis_fps=2.0, smoothing_seconds=2.0)
+
+    # Salto isolado (detecção espúria) não move o crop
+    centers = np.full(40, 0.5)
+    centers[20] = 0.95
+    smoothed = reframer._smooth(centers)
+    assert len(smoothed) == len(centers), "trilha suavizada mudou de tamanho"
+    assert np.abs(smoothed - 0.5).max() < 1e-9, "salto isolado chegou à trilha"
+
+    # Mudança real de enquadramento é seguida, sem ultrapassar os extremos
+    step = np.concatenate([np.full(20, 0.2), np.full(20, 0.8)])
+    smoothed = reframer._smooth(step)
+    assert np.isclose(smoothed[0], 0.2) and np.isclose(smoothed[-1], 0.8), "extremos da trilha alterados"
+    assert np.all(np.diff(smoothed) >= 0), "transição suavizada não é monotônica"
+
+def test_non_streamable_ingest_fallback():
+    print("📥 Testando ingestão de contêiner não streamável...")
+    import asyncio
+    import hashlib
+    import tempfile
+    from pathlib import Path
+    from utils.streaming_ingest import StreamingIngest, is_streamable
+
+    moov_first = b"\x00\x00\x00\x10ftypisom\x00\x00\x00\x00" + b"\x00\x00\x00\x08moov"
+    mdat_first = b"\x00\x00\x00\x10ftypisom\x00\x00\x00\x00" + b"\x00\x00\x00\x10mdat" + b"x" * 8
+    assert is_streamable(moov_first) is True, "MP4 com moov no início deveria ser streamável"
+    assert is_streamable(mdat_first) is False, "MP4 com mdat antes do moov não é streamável"
+    assert is_streamable(b"\x00\x00") is None, "poucos bytes: decisão deveria esperar"
+
+    async def ingest(data: bytes, analyze: bool):
+        async def chunks():
+            for i in range(0, len(data), 7):
+                yield data[i:i + 7]
+        with tempfile.TemporaryDirectory() as job_dir:
+            result = await StreamingIngest(Path(job_dir), "video.mp4", analyze).consume(chunks())
+            return result, result["file_path"].read_bytes()
+
+    # Sem moov no início: nenhum ffmpeg no upload, pipeline extrai do arquivo salvo
+    result, saved = asyncio.run(ingest(mdat_first, analyze=True))
+    assert result["analysis"] is None, "análise em streaming iniciada para contêiner não streamável"
+    assert saved == mdat_first and result["size"] == len(mdat_first), "arquivo salvo difere do upload"
+    assert result["content_hash"] == hashlib.sha256(mdat_first).hexdigest(), "hash de conteúdo incorreto"
+
+    # Cortes manuais não pedem análise: nada é iniciado nem para contêiner streamável
+    result, _ = asyncio.run(ingest(moov_first, analyze=False))
+    assert result["analysis"] is None, "análise iniciada sem ser pedida"
+
+def test_analysis_tee_cancellation():
+    print("🛑 Testando cancelamento do ffmpeg de análise do upload...")
+    import asyncio
+    import os
+    import tempfile
+    from pathlib import Path
+    from core.ffmpeg_runner import ffmpeg_runner
+    from utils.streaming_ingest import StreamingIngest
+
+    moov_first = b"\x00\x00\x00\x10ftypisom\x00\x00\x00\x00" + b"\x00\x00\x00\x08moov" + b"x" * 64
+
+    async def ingest(job_dir: Path, job_id: str):
+        async def chunks():
+            yield moov_first
+        return await StreamingIngest(job_dir, "video.mp4", True, job_id).consume(chunks())
+
+    async def scenario(job_dir: Path):
+        # ffmpeg de análise travado: /cancel (kill_job) o encerra e a análise falha
+        result = await ingest(job_dir, "job-tee")
+        assert ffmpeg_runner.kill_job({"job_id": "job-tee"}) == 1, "tee não registrado no runner"
+        assert await asyncio.wait_for(result["analysis"], 5) is False
+
+        # Timeout do pipeline (wait_for cancela a tarefa): processo morto e fora do runner
+        result = await ingest(job_dir, "job-timeout")
+        try:
+            await asyncio.wait_for(result["analysis"], 0.2)
+        except asyncio.TimeoutError:
+            pass
+        assert ffmpeg_runner.kill_job({"job_id": "job-timeout"}) == 0, "tee continuou registrado"
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        fake_ffmpeg = Path(temp_dir) / "ffmpeg"
+        fake_ffmpeg.write_text("#!/bin/sh\nexec sleep 30\n")
+        fake_ffmpeg.chmod(0o755)
+        job_dir = Path(temp_dir) / "job"
+        job_dir.mkdir()
+        path = os.environ["PATH"]
+        os.environ["PATH"] = f"{temp_dir}{os.pathsep}{path}"
+        try:
+            asyncio.run(scenario(job_dir))
+        finally:
+            os.environ["PATH"] = path
+
+def test_validate_ranges_rejects_non_finite():
+    print("✂️ Testando validação de intervalos do /batch-cut...")
+    from core.batch_cut import merge_ranges, validate_ranges
+
+    for bad in ["nan", "inf", "-inf", "1e309", "00:nan", float("nan"), float("inf"), True]:
+        cuts, errors = validate_ranges([{"start": bad, "end": 10}], 100)
+        assert not cuts and errors, f"start={bad!r} aceito"
+        cuts, errors = validate_ranges([{"start": 0, "end": bad}], 100)
+        assert not cuts and errors, f"end={bad!r} aceito"
+
+    cuts, errors = validate_ranges([
+        {"start": "0:10", "end": "0:20", "title": "a"},
+        {"start": 15, "end": 30},
+        {"start": 90, "end": 500},
+    ], 100)
+    assert not errors, errors
+    assert [(c["start"], c["end"]) for c in cuts] == [(10, 20), (15, 30), (90, 100)], "fim não limitado à duração"
+    merged = merge_ranges(cuts)
+    assert [(m["start"], m["end"], m["requests"]) for m in merged] == [(10, 30, [0, 1]), (90, 100, [2])]
+
+def test_eviction_candidates():
+    print("🧹 Testando candidatos a despejo do armazenamento...")
+    import os
+    import tempfile
+    from pathlib import Path
+    from utils.file_manager import FileManager
+    from utils.storage_manager import StorageManager
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        root = Path(temp_dir)
+
+        def make(name: str) -> str:
+            path = root / name
+            path.write_bytes(b"x" * 10)
+            return str(path)
+
+        source = make("video.mp4")
+        proxy = make("proxy.mp4")
+        (root / "timeline").mkdir()
+        make("timeline/sprite_000.jpg")
+        make("timeline/peaks_0.bin")
+        timeline_dir = str(root / "timeline")
+        clips = [
+            {"id": "ai_clip_1", "file_path": make("auto.mp4"), "rendered": True, "rerenderable": True},
+            {"id": "ai_clip_2", "file_path": str(root / "lazy.mp4"), "rendered": False, "rerenderable": True},
+            {"id": "manual_clip_9x16", "file_path": make("variant.mp4")},
+            {"id": "manual_clip", "file_path": make("manual.mp4")},
+            {"id": "batch_clip_1", "file_path": make("batch.mp4"), "rendered": True},
+        ]
+        jobs = {"job": {"status": "completed", "source_path": source, "clips": clips}}
+        manager = StorageManager(FileManager(), jobs, {})
+        manager.touch(proxy)  # Proxy usado depois da linha do tempo
+
+        candidates = [(kind, str(path)) for _, _, kind, path, _ in manager._candidates()]
+        expected = [("clip", clips[0]["file_path"]), ("derived", timeline_dir), ("derived", proxy), ("source", source)]
+        assert candidates == expected, candidates
+
+        # Linha do tempo é um diretório: despejada inteira, com o tamanho do conteúdo
+        assert manager._evict("derived", Path(timeline_dir), jobs["job"]) == 20
+        assert not os.path.exists(timeline_dir), "diretório da linha do tempo não removido"
+
+        # Job em processamento: nada dele é despejado
+        jobs["job"]["status"] = "processing"
+        assert manager._candidates() == [], "arquivos de job ativo entre os candidatos"
+
+def test_s3_read_through_cache():
+    print("☁️ Testando cache de leitura do backend S3...")
+    import os
+    import tempfile
+    import threading
+    import time
+    from pathlib import Path
+    from utils.file_manager import FileManager
+    from utils.storage_backends import S3StorageBackend
+    from utils.storage_manager import CACHE_MIN_AGE, StorageManager
+
+    class MemoryS3:
+        """Cliente S3 em memória (só as chamadas usadas pelo backend)"""
+        def __init__(self):
+            self.objects = {"uploads/job/video.mp4": b"fonte"}
+            self.downloads = 0
+
+        def download_file(self, bucket, key, filename):
+            self.downloads += 1
+            Path(filename).write_bytes(self.objects[key])
+
+        def delete_object(self, Bucket, Key):
+            self.objects.pop(Key, None)
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        backend = S3StorageBackend.__new__(S3StorageBackend)
+        backend.bucket = "vcut"
+        backend.cache_dir = Path(cache_dir)
+        backend.client = MemoryS3()
+        backend._download_locks = {}
+        backend._guard = threading.Lock()
+
+        # Baixa uma vez; a segunda leitura vem do cache
+        first = backend.ensure_local("uploads/job/video.mp4")
+        second = backend.ensure_local("uploads/job/video.mp4")
+        assert first == second and first.read_bytes() == b"fonte", "cópia em cache incorreta"
+        assert backend.client.downloads == 1, "objeto baixado mais de uma vez"
+
+        # Cache conta na cota e só cópias antigas são despejadas (primeiro nível)
+        file_manager = FileManager()
+        file_manager.backend = backend
+        manager = StorageManager(file_manager, {}, {})
+        assert backend.cache_dir in manager._roots(), "cache fora da cota"
+        assert manager._candidates() == [], "cópia recém-usada entre os candidatos"
+        old = time.time() - CACHE_MIN_AGE - 1
+        os.utime(first, (old, old))
+        assert [(kind, path) for _, _, kind, path, _ in manager._candidates()] == [("cache", first)]
+
+        backend.delete("uploads/job/video.mp4")
+        assert not first.exists() and not backend.client.objects, "delete deixou objeto ou cópia"
+
+        # Chaves relativas às raízes configuradas, mesmo com o cache fora de backend/
+        assert file_manager.key_for(file_manager.upload_dir / "job" / "video.mp4") == "uploads/job/video.mp4"
+        assert file_manager.key_for(file_manager.output_dir / "job" / "clip.mp4") == "outputs/job/clip.mp4"
+        assert file_manager.key_for(first) == "uploads/job/video.mp4", "cópia do cache com chave errada"
+        try:
+            file_manager.key_for("/etc/passwd")
+        except ValueError:
+            pass
+        else:
+            raise AssertionError("arquivo fora das raízes aceito")
+
+def test_download_headers_and_ranges():
+    print("📦 Testando downloads (Range, ETag, nomes e ZIP)...")
+    import io
+    import tempfile
+    import zipfile
+    from pathlib import Path
+    from starlette.requests import Request
+    from utils.downloads import ZipStream, file_download_response, parse_range
+
+    assert parse_range("bytes=0-99", 1000) == (0, 99)
+    assert parse_range("bytes=-100", 1000) == (900, 999), "sufixo"
+    assert parse_range("bytes=200-", 1000) == (200, 999), "intervalo aberto"
+    assert parse_range("bytes=900-5000", 1000) == (900, 999), "fim além do arquivo não limitado"
+    for ignored in [None, "bytes=0-1,5-9", "bytes=abc", "items=0-1", "bytes=5-1", "bytes=-"]:
+        assert parse_range(ignored, 1000) is None, f"{ignored!r} deveria ser ignorado"
+    for unsatisfiable in ["bytes=1000-", "bytes=-0"]:
+        try:
+            parse_range(unsatisfiable, 1000)
+        except ValueError:
+            continue
+        raise AssertionError(f"{unsatisfiable!r} deveria dar 416")
+
+    def request(**headers) -> Request:
+        raw = [(name.replace("_", "-").encode(), value.encode()) for name, value in headers.items()]
+        return Request({"type": "http", "method": "GET", "headers": raw})
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = Path(temp_dir) / "clip.mp4"
+        path.write_bytes(b"x" * 1000)
+
+        response = file_download_response(request(), path, "Café da manhã.mp4")
+        assert response.status_code == 200
+        assert response.headers["content-disposition"] == \
+            "attachment; filename*=utf-8''Caf%C3%A9%20da%20manh%C3%A3.mp4", "nome acentuado"
+        response = file_download_response(request(), path, "🔥 Corte_WhatsApp.mp4")
+        assert "filename*=utf-8''%F0%9F%94%A5" in response.headers["content-disposition"], "nome com emoji"
+        response = file_download_response(request(), path, 'Diz "oi".mp4')
+        assert '"oi"' not in response.headers["content-disposition"], "aspas quebram o cabeçalho"
+        assert file_download_response(request(), path, "clip.mp4").headers["content-disposition"] == \
+            'attachment; filename="clip.mp4"'
+
+        etag = response.headers["etag"]
+        assert file_download_response(request(if_none_match=etag), path, "clip.mp4").status_code == 304
+        assert file_download_response(request(if_match='"outro"'), path, "clip.mp4").status_code == 412
+        partial = file_download_response(request(range="bytes=10-19", if_range=etag), path, "clip.mp4")
+        assert partial.status_code == 206 and partial.headers["content-range"] == "bytes 10-19/1000"
+        stale = file_download_response(request(range="bytes=10-19", if_range='"antigo"'), path, "clip.mp4")
+        assert stale.status_code == 200, "If-Range com ETag antigo deveria servir o arquivo completo"
+        assert file_download_response(request(range="bytes=5000-"), path, "clip.mp4").status_code == 416
+
+        zip_stream = ZipStream()
+        data = b"".join(zip_stream.add_file(path, "a.mp4")) + b"".join(zip_stream.add_file(path, "b.mp4"))
+        data += zip_stream.close()
+        with zipfile.ZipFile(io.BytesIO(data)) as archive:
+            assert archive.namelist() == ["a.mp4", "b.mp4"]
+            assert archive.read("b.mp4") == path.read_bytes(), "conteúdo do ZIP difere do arquivo"
+
+def test_cancel_kills_only_own_job():
+    print("🛑 Testando cancelamento de jobs...")
+    import threading
+    import time
+    from fastapi.testclient import TestClient
+    import main
+    from core.ffmpeg_runner import ffmpeg_runner, FFmpegError
+    from utils.tracing import tracer
+
+    # Processos são do job_id, não do dict: um dict recriado com o mesmo id ainda os encontra
+    job = {"job_id": "job-cancel", "status": "processing"}
+    errors = []
+
+    def run_sleep():
+        with tracer.stage(job, "teste"):
+            try:
+                ffmpeg_runner.run(["sleep", "30"], "sleep")
+            except FFmpegError as e:
+                errors.append(e.kind)
+
+    worker = threading.Thread(target=run_sleep)
+    worker.start()
+    for _ in range(100):
+        if ffmpeg_runner._processes:
+            break
+        time.sleep(0.01)
+    assert ffmpeg_runner.kill_job({"job_id": "outro-job"}) == 0, "processo de outro job encerrado"
+    assert ffmpeg_runner.kill_job({"job_id": "job-cancel"}) == 1, "processo do job não encerrado"
+    worker.join(5)
+    assert errors == ["cancelled"], errors
+
+    # Job concluído ou com erro não é cancelado: /status continua correto
+    client = TestClient(main.app)
+    for status in ["completed", "error"]:
+        main.processing_jobs["job-done"] = {"job_id": "job-done", "status": status, "clips": []}
+        assert client.post("/cancel/job-done").status_code == 409
+        assert main.processing_jobs["job-done"]["status"] == status, f"status {status} sobrescrito"
+    main.processing_jobs.pop("job-done")
+
+def test_transcript_search():
+    print("🔎 Testando busca de frases nas transcrições...")
+    import tempfile
+    from pathlib import Path
+    from core.transcript_index import TranscriptIndex
+
+    def words(text: str, start: float):
+        return [{"word": f" {w}", "start": start + i, "end": start + i + 0.5, "probability": 0.9}
+                for i, w in enumerate(text.split())]
+
+    transcription = {"language": "pt", "segments": [
+        {"start": 0.0, "end": 5.0, "text": "", "words": words("Olá, tudo bem com você?", 0.0)},
+        {"start": 10.0, "end": 14.0, "text": "", "words": words("Você viu a PROMOÇÃO de hoje", 10.0)},
+    ]}
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        index = TranscriptIndex()
+        index.directory = Path(temp_dir)
+        index.save("abc123", transcription)
+        index.save("vazio", {"segments": []})
+
+        # Frase exata, com tempos do primeiro ao último token
+        hits = index.search("tudo bem", ["abc123"])["hits"]
+        assert [(h["start"], h["end"], h["text"]) for h in hits] == [(1.0, 2.5, "tudo bem")], hits
+
+        # Sem acento e em outra caixa encontra "você" e "PROMOÇÃO"
+        hits = index.search("VOCE", ["abc123"])["hits"]
+        assert [h["start"] for h in hits] == [4.0, 10.0], hits
+        assert index.search("a promocao", ["abc123"])["hits"][0]["text"] == "a PROMOÇÃO"
+
+        # Palavras existentes fora de ordem, palavra inexistente e transcrição vazia
+        assert index.search("bem tudo", ["abc123"])["hits"] == []
+        assert index.search("amanhã", ["abc123"])["hits"] == []
+        assert index.search("tudo bem", ["vazio"])["hits"] == []
+
+        # Sem hashes não há busca em todo o índice
+        try:
+            index.search("tudo bem", [])
+        except ValueError:
+            pass
+        else:
+            raise AssertionError("busca sem hashes percorreu o índice inteiro")
+
+def test_checkpoint_resume():
+    print("♻️ Testando retomada de jobs pelo checkpoint...")
+    import os
+    import tempfile
+    import time
+    from pathlib import Path
+    import main
+    from config import Config
+    from core.simple_ffmpeg_only import SimpleFFmpegProcessor
+    from utils.job_checkpoints import job_checkpoints
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        root = Path(temp_dir)
+        # ffprobe falso: duração = bytes / 100 (um arquivo truncado fica mais curto)
+        fake_ffprobe = root / "ffprobe"
+        fake_ffprobe.write_text('#!/bin/sh\nfor last; do :; done\necho $(( $(wc -c < "$last") / 100 ))\n')
+        fake_ffprobe.chmod(0o755)
+
+        def clip(name: str, size: int, rendered: bool = True):
+            path = root / name
+            if size:
+                path.write_bytes(b"x" * size)
+            return {"id": name, "file_path": str(path), "duration": 30, "rendered": rendered, "file_size": size}
+
+        clips = [
+            clip("ok.mp4", 3000),          # 30s: íntegro, não é refeito
+            clip("truncado.mp4", 1200),    # 12s: encode interrompido no meio
+            clip("vazio.mp4", 0),          # marcado como pronto mas nunca escrito
+            clip("pendente.mp4", 0, rendered=False),
+        ]
+        path = os.environ["PATH"]
+        os.environ["PATH"] = f"{temp_dir}{os.pathsep}{path}"
+        try:
+            assert job_checkpoints.revalidate(clips) == 1
+        finally:
+            os.environ["PATH"] = path
+        assert [c["rendered"] for c in clips] == [True, False, False, False]
+
+        # Só os clips que faltam voltam ao encode, com checkpoint a cada um
+        processor = SimpleFFmpegProcessor()
+        rendered, saved = [], []
+        processor.render_clip = lambda video_path, clip_info, draft=False: (
+            rendered.append(clip_info["id"]), clip_info.update(rendered=True))
+        processor.generate_automatic_clips("video.mp4", temp_dir, clips, saved.append)
+        assert rendered == ["truncado.mp4", "vazio.mp4", "pendente.mp4"], rendered
+        assert len(saved) == 3 and all(c["rendered"] for c in clips)
+
+    # Job retomado não é dado como abandonado antes de o cliente voltar a consultar
+    stale = time.time() - Config.JOB_ABANDON_TIMEOUT - 1
+    main.processing_jobs["job-resumed"] = {"job_id": "job-resumed", "status": "processing",
+                                           "last_seen": stale, "resumed": True, "clips": []}
+    assert main.cancel_abandoned_jobs(time.time()) == []
+    main.get_job_or_404("job-resumed")
+    main.processing_jobs["job-resumed"]["last_seen"] = stale
+    assert main.cancel_abandoned_jobs(time.time()) == ["job-resumed"]
+    main.processing_jobs.pop("job-resumed")
+
+def test_plan_chunks():
+    print("🧩 Testando divisão de cortes longos em keyframes...")
+    from core.chunked_encode import plan_chunks
+
+    keyframes = [float(t) for t in range(0, 600, 2)]  # GOP de 2s
+
+    # Sem keyframes conhecidos ou intervalo curto demais: um pedaço só
+    assert plan_chunks([], 0, 300, 4, 30) == [(0, 300)]
+    assert plan_chunks(keyframes, 10, 65, 4, 30) == [(10, 65)], "intervalo < 2*min_chunk dividido"
+    assert plan_chunks(keyframes, 0, 300, 1, 30) == [(0, 300)]
+
+    # Fronteiras internas só em keyframes, pedaços contíguos cobrindo o intervalo
+    chunks = plan_chunks(keyframes, 5, 245, 4, 30)
+    assert len(chunks) == 4, chunks
+    assert chunks[0][0] == 5 and chunks[-1][1] == 245
+    assert all(a[1] == b[0] for a, b in zip(chunks, chunks[1:])), "pedaços não contíguos"
+    assert all(end in keyframes for _, end in chunks[:-1]), "fronteira fora de keyframe"
+    assert [end for _, end in chunks[:-1]] == [64.0, 124.0, 184.0]
+
+    # Keyframes esparsos: fronteiras que deixariam pedaço menor que min_chunk/2 são puladas
+    assert plan_chunks([0.0, 100.0, 118.0], 0, 120, 4, 30) == [(0, 100.0), (100.0, 120)]
+
+def test_multi_output_verification():
+    print("🖼️ Testando verificação de todas as saídas de um encode com vários formatos...")
+    import os
+    import tempfile
+    from core.encoding_profiles import encoding_profiles
+    from core.ffmpeg_runner import ffmpeg_runner, FFmpegError
+
+    settings = encoding_profiles.select(platform="whatsapp", source_height=720)
+    with tempfile.TemporaryDirectory() as temp_dir:
+        outputs = [os.path.join(temp_dir, name) for name in ("9x16.mp4", "1x1.mp4", "16x9.mp4")]
+
+        # Código 0, mas a variante do meio não foi escrita: falha e nenhuma saída fica
+        def build_cmd(current):
+            return ["sh", "-c", f"printf x > '{outputs[0]}'; printf x > '{outputs[2]}'"]
+        try:
+            ffmpeg_runner.run_encode(build_cmd, settings, "teste:formatos", output_path=outputs)
+        except FFmpegError as e:
+            assert "1x1.mp4" in str(e), str(e)
+        else:
+            raise AssertionError("variante ausente aceita como pronta")
+        assert not any(os.path.exists(path) for path in outputs), "saídas parciais mantidas"
+
+        # Todas escritas: sucesso
+        ffmpeg_runner.run_encode(
+            lambda current: ["sh", "-c", "".join(f"printf x > '{path}';" for path in outputs)],
+            settings, "teste:formatos", output_path=outputs
+        )
+        assert all(os.path.getsize(path) == 1 for path in outputs)
+
 def main():
     print("🚀 Testando VCUT Pro Backend...")
     print("=" * 40)
@@ -49,7 +527,8 @@ def main():
     tests = [
         test_python(),
         test_imports(),
-        test_ffmpeg()
+        test_ffmpeg(),
+        *[run_check(check) for check in BEHAVIOR_CHECKS]
     ]
     
     print("=" * 40)
@@ -60,5 +539,21 @@ def main():
         print("❌ Alguns testes falharam")
         print("📥 Execute: pip install -r requirements.txt")
 
+# Verificações de comportamento do pipeline (sem ffmpeg)
+BEHAVIOR_CHECKS = [
+    test_crop_track_smoothing,
+    test_non_streamable_ingest_fallback,
+    test_analysis_tee_cancellation,
+    test_validate_ranges_rejects_non_finite,
+    test_eviction_candidates,
+    test_s3_read_through_cache,
+    test_download_headers_and_ranges,
+    test_transcript_search,
+    test_checkpoint_resume,
+    test_plan_chunks,
+    test_multi_output_verification,
+    test_cancel_kills_only_own_job,
+]
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,250 @@
+"""
+Downloads otimizados: HTTP Range, ETag forte, requisições condicionais
+e ZIP em streaming (sem arquivos temporários)
+"""
+
+import os
+import hashlib
+import zipfile
+from email.utils import formatdate
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+from urllib.parse import quote
+
+import anyio
+from fastapi import Request
+from fastapi.responses import Response
+
+CHUNK_SIZE = 1024 * 1024  # 1MB por leitura
+CACHE_CONTROL = "private, max-age=86400"
+
+
+def make_etag(path: Path) -> str:
+    """ETag forte derivado de inode, tamanho e mtime (ns) do arquivo"""
+    stat = os.stat(path)
+    raw = f"{stat.st_ino}-{stat.st_size}-{stat.st_mtime_ns}".encode()
+    return '"' + hashlib.md5(raw).hexdigest() + '"'
+
+
+def content_disposition(filename: str) -> str:
+    """Cabeçalho Content-Disposition como o do Starlette
+
+    Nomes não ASCII (acentos, emoji) ou com aspas vão em ``filename*``
+    (RFC 5987); os demais ficam em ``filename`` entre aspas.
+    """
+    quoted = quote(filename)
+    if quoted != filename:
+        return f"attachment; filename*=utf-8''{quoted}"
+    return f'attachment; filename="{filename}"'
+
+
+def parse_range(header: Optional[str], file_size: int) -> Optional[Tuple[int, int]]:
+    """Interpretar cabeçalho Range (um único intervalo) -> (início, fim) inclusivo
+
+    Retorna None quando o cabeçalho deve ser ignorado (resposta completa),
+    inclusive com sintaxe inválida (RFC 9110, 14.2), e levanta ValueError
+    só quando o intervalo é válido mas não satisfatível.
+    """
+    if not header or not header.startswith("bytes="):
+        return None
+
+    ranges = header[len("bytes="):].split(",")
+    if len(ranges) != 1:
+        return None  # Multi-range: servir o arquivo completo
+
+    start_str, separator, end_str = ranges[0].strip().partition("-")
+    if not separator or not (start_str or end_str) or not all(
+        part.isascii() and part.isdigit() for part in (start_str, end_str) if part
+    ):
+        return None  # Sintaxe inválida: ignorar o Range
+
+    if start_str == "":
+        # Sufixo: últimos N bytes
+        length = int(end_str)
+        if length == 0:
+            raise ValueError("Range não satisfatível")
+        start = max(0, file_size - length)
+        end = file_size - 1
+    else:
+        start = int(start_str)
+        if end_str and int(end_str) < start:
+            return None  # Último byte antes do primeiro: sintaxe inválida
+        end = int(end_str) if end_str else file_size - 1
+
+    end = min(end, file_size - 1)
+    if start >= file_size:
+        raise ValueError("Range não satisfatível")
+
+    return start, end
+
+
+def _etag_matches(header: Optional[str], etag: str) -> bool:
+    """Comparar If-None-Match / If-Match com o ETag atual"""
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    candidates = [tag.strip().removeprefix("W/") for tag in header.split(",")]
+    return etag in candidates
+
+
+class RangeFileResponse(Response):
+    """Resposta de arquivo com suporte a Range
+
+    O arquivo é lido em blocos de 1MB e só o intervalo pedido é enviado.
+    sendfile só é usado se o servidor ASGI oferecer a extensão
+    ``http.response.zerocopysend``; o uvicorn (usado nos Dockerfiles) não
+    oferece, então em produção o envio é sempre por leitura em blocos.
+    O Starlette fixado (via fastapi 0.104) não tem Range no FileResponse.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        status_code: int = 200,
+        headers: Optional[Dict[str, str]] = None,
+        media_type: str = "video/mp4",
+        byte_range: Optional[Tuple[int, int]] = None,
+    ):
+        super().__init__(status_code=status_code, headers=headers, media_type=media_type)
+        self.path = path
+        self.file_size = os.path.getsize(path)
+        self.start, self.end = byte_range or (0, self.file_size - 1)
+        self.headers["content-length"] = str(max(0, self.end - self.start + 1))
+
+    async def __call__(self, scope, receive, send):
+        await send({
+            "type": "http.response.start",
+            "status": self.status_code,
+            "headers": self.raw_headers,
+        })
+
+        count = self.end - self.start + 1
+        if scope.get("method") == "HEAD" or count <= 0:
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        if "http.response.zerocopysend" in scope.get("extensions", {}):
+            with open(self.path, "rb") as f:
+                await send({
+                    "type": "http.response.zerocopysend",
+                    "file": f.fileno(),
+                    "offset": self.start,
+                    "count": count,
+                })
+            return
+
+        async with await anyio.open_file(self.path, "rb") as f:
+            await f.seek(self.start)
+            remaining = count
+            while remaining > 0:
+                chunk = await f.read(min(CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                await send({
+                    "type": "http.response.body",
+                    "body": chunk,
+                    "more_body": remaining > 0,
+                })
+            if remaining > 0:
+                await send({"type": "http.response.body", "body": b""})
+
+
+def file_download_response(request: Request, path: Path, filename: str,
+                           media_type: str = "video/mp4") -> Response:
+    """Montar resposta de download com ETag, condicionais e Range"""
+    stat = os.stat(path)
+    etag = make_etag(path)
+
+    headers = {
+        "etag": etag,
+        "last-modified": formatdate(stat.st_mtime, usegmt=True),
+        "accept-ranges": "bytes",
+        "cache-control": CACHE_CONTROL,
+        "content-disposition": content_disposition(filename),
+    }
+
+    if_match = request.headers.get("if-match")
+    if if_match and not _etag_matches(if_match, etag):
+        return Response(status_code=412, headers=headers)
+
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+
+    # If-Range: só aplica o Range se a representação não mudou
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if if_range and if_range.strip() != etag:
+        range_header = None
+
+    try:
+        byte_range = parse_range(range_header, stat.st_size)
+    except ValueError:
+        headers["content-range"] = f"bytes */{stat.st_size}"
+        return Response(status_code=416, headers=headers)
+
+    if byte_range is None:
+        return RangeFileResponse(path, headers=headers, media_type=media_type)
+
+    start, end = byte_range
+    headers["content-range"] = f"bytes {start}-{end}/{stat.st_size}"
+    return RangeFileResponse(
+        path, status_code=206, headers=headers,
+        media_type=media_type, byte_range=byte_range,
+    )
+
+
+class _ZipBuffer:
+    """Destino não-pesquisável do zipfile; acumula bytes até serem drenados"""
+
+    def __init__(self):
+        self.chunks: List[bytes] = []
+
+    def write(self, data: bytes) -> int:
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self.chunks)
+        self.chunks.clear()
+        return data
+
+
+class ZipStream:
+    """ZIP gerado sob demanda, bloco a bloco, para "baixar todos os clips"
+
+    Usa ZIP_STORED: MP4 já é comprimido, então recomprimir só gasta CPU.
+    """
+
+    def __init__(self):
+        self._buffer = _ZipBuffer()
+        self._zip = zipfile.ZipFile(self._buffer, "w", compression=zipfile.ZIP_STORED,
+                                    allowZip64=True)
+
+    def add_file(self, path: Path, arcname: str) -> Iterator[bytes]:
+        """Adicionar um arquivo ao ZIP, produzindo os bytes à medida que são lidos
+
+        Gerador síncrono (leituras bloqueantes): em código assíncrono, iterar
+        com ``iterate_in_threadpool``.
+        """
+        info = zipfile.ZipInfo.from_file(path, arcname)
+        info.compress_type = zipfile.ZIP_STORED
+
+        with open(path, "rb") as src, self._zip.open(info, "w", force_zip64=True) as dest:
+            while True:
+                chunk = src.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                dest.write(chunk)
+                yield self._buffer.drain()
+
+        yield self._buffer.drain()
+
+    def close(self) -> bytes:
+        """Finalizar o ZIP (diretório central) e retornar os bytes finais"""
+        self._zip.close()
+        return self._buffer.drain()
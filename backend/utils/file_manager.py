@@ -3,35 +3,110 @@ Gerenciador de arquivos para upload e organização
 """
 
 from pathlib import Path
-import aiofiles
+import asyncio
+import time
 import uuid
 from fastapi import UploadFile
 import os
+from typing import AsyncIterator, Dict, Optional
+
+from config import Config
+from utils.storage_backends import create_storage_backend
+from utils.streaming_ingest import StreamingIngest
+from utils.tracing import tracer
+
+UPLOAD_CHUNK_SIZE = 1024 * 1024  # 1MB
 
 class FileManager:
     def __init__(self):
-        self.upload_dir = Path("uploads")
-        self.output_dir = Path("outputs")
+        self.upload_dir = Config.UPLOAD_DIR
+        self.output_dir = Config.OUTPUT_DIR
         
         # Criar diretórios se não existirem
-        self.upload_dir.mkdir(exist_ok=True)
-        self.output_dir.mkdir(exist_ok=True)
+        self.upload_dir.mkdir(parents=True, exist_ok=True)
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        
+        # Cópia durável das fontes e clips (disco local ou S3); os metadados dos
+        # jobs continuam no processo, então só este nó atende os próprios jobs
+        self.backend = create_storage_backend()
+        
+        # Hash de conteúdo -> arquivo fonte (reuso sem novo upload)
+        self.content_index: Dict[str, Path] = {}
     
-    async def save_upload(self, file: UploadFile, job_id: str) -> Path:
-        """Salvar arquivo de upload"""
+    async def ingest_stream(self, chunks: AsyncIterator[bytes], filename: str, job_id: str,
+                            analyze: bool = False) -> Dict:
+        """Salvar upload em blocos, com hash (e, com ``analyze``, extração de áudio/proxy em paralelo)"""
         # Criar diretório para o job
         job_dir = self.upload_dir / job_id
         job_dir.mkdir(exist_ok=True)
         
-        # Caminho do arquivo
-        file_path = job_dir / file.filename
-        
-        # Salvar arquivo
-        async with aiofiles.open(file_path, 'wb') as f:
-            content = await file.read()
-            await f.write(content)
+        ingest = StreamingIngest(job_dir, filename or "video.mp4", analyze, job_id)
+        started = time.perf_counter()
+        result = await ingest.consume(chunks)
+        tracer.record_upload(result["size"], time.perf_counter() - started)
+        self.content_index[result["content_hash"]] = result["file_path"]
+        return result
+    
+    def key_for(self, path) -> str:
+        """Chave no backend: prefixo da raiz configurada + caminho relativo a ela
+
+        Fontes viram ``uploads/...`` e clips ``outputs/...``, mesmo quando os
+        diretórios (ou o cache do S3, já no layout das chaves) ficam fora de
+        ``backend/``.
+        """
+        path = Path(path).resolve()
+        roots = [("uploads", self.upload_dir), ("outputs", self.output_dir)]
+        if self.backend.cache_dir is not None:
+            roots.append(("", self.backend.cache_dir))
+        for prefix, root in roots:
+            root = Path(root).resolve()
+            if path.is_relative_to(root):
+                relative = path.relative_to(root).as_posix()
+                return f"{prefix}/{relative}" if prefix else relative
+        raise ValueError(f"Arquivo fora dos diretórios de uploads, saídas e cache: {path}")
+    
+    async def publish(self, path) -> str:
+        """Envia um arquivo finalizado (fonte ou clip) ao backend"""
+        key = self.key_for(path)
+        await asyncio.to_thread(self.backend.put_file, Path(path), key)
+        return key
+    
+    def unpublish(self, path):
+        """Remove o objeto do backend (junto com o arquivo local, ou no despejo)"""
+        try:
+            self.backend.delete(self.key_for(path))
+        except Exception as e:
+            print(f"⚠️ Não foi possível remover {path} do armazenamento: {e}")
+    
+    async def ensure_local(self, path) -> Path:
+        """Cópia local legível do arquivo; se ela não existe mais, baixa do backend para o cache"""
+        path = Path(path)
+        if path.exists():
+            return path
+        return await asyncio.to_thread(self.backend.ensure_local, self.key_for(path))
+    
+    def find_by_hash(self, content_hash: str) -> Optional[Path]:
+        """Arquivo fonte já recebido com este hash de conteúdo"""
+        path = self.content_index.get(content_hash)
+        if path is not None and path.exists():
+            return path
+        return None
+    
+    async def ingest_upload(self, file: UploadFile, job_id: str, analyze: bool = False) -> Dict:
+        """Ingestão de um UploadFile (multipart), lido em blocos de 1MB"""
+        async def chunks():
+            while True:
+                chunk = await file.read(UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                yield chunk
         
-        return file_path
+        return await self.ingest_stream(chunks(), file.filename, job_id, analyze)
+    
+    async def save_upload(self, file: UploadFile, job_id: str) -> Path:
+        """Salvar arquivo de upload (cortes manuais: sem áudio/proxy de análise)"""
+        result = await self.ingest_upload(file, job_id)
+        return result["file_path"]
     
     def get_output_dir(self, job_id: str) -> Path:
         """Obter diretório de saída para um job"""
@@ -39,16 +114,24 @@ class FileManager:
         output_dir.mkdir(exist_ok=True)
         return output_dir
     
-    def cleanup_job(self, job_id: str):
-        """Limpar arquivos de um job (opcional)"""
+    def cleanup_job(self, job_id: str, include_outputs: bool = False):
+        """Limpar arquivos de um job (chamado pelo janitor do StorageManager)"""
         import shutil
         
         # Limpar uploads
         upload_path = self.upload_dir / job_id
         if upload_path.exists():
+            self._unpublish_tree(upload_path)
             shutil.rmtree(upload_path)
         
-        # Limpar outputs (manter por mais tempo)
-        # output_path = self.output_dir / job_id
-        # if output_path.exists():
-        #     shutil.rmtree(output_path)
+        # Limpar outputs (mantidos por mais tempo: só quando o job expira)
+        output_path = self.output_dir / job_id
+        if include_outputs and output_path.exists():
+            self._unpublish_tree(output_path)
+            shutil.rmtree(output_path)
+    
+    def _unpublish_tree(self, directory: Path):
+        """Objetos publicados dos arquivos do diretório não ficam órfãos no backend"""
+        for path in directory.rglob("*"):
+            if path.is_file():
+                self.unpublish(path)
@@ -0,0 +1,105 @@
+"""
+Checkpoints de jobs automáticos
+Etapas concluídas, plano de clips da análise e clips já renderizados ficam
+num JSON por job; um worker reiniciado retoma só os clips que faltam
+"""
+
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from config import Config
+from core.ffmpeg_runner import ffmpeg_runner, FFmpegError
+
+
+class JobCheckpoints:
+    def __init__(self):
+        self.directory = Config.CHECKPOINT_DIR
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+
+    def _path(self, job_id: str) -> Path:
+        return self.directory / f"{job_id}.json"
+
+    def _write(self, job_id: str, checkpoint: Dict):
+        """Escrita atômica: um worker morto no meio nunca deixa JSON pela metade"""
+        path = self._path(job_id)
+        temp_path = path.with_suffix(".part")
+        with open(temp_path, "w") as f:
+            json.dump(checkpoint, f)
+        os.replace(temp_path, path)
+
+    def create(self, job_id: str, job: Dict, ingest: Dict):
+        """Primeiro checkpoint: o suficiente para recriar o job e o ingest"""
+        self._write(job_id, {
+            "job_id": job_id,
+            "created_at": job["created_at"],
+            "content_hash": ingest["content_hash"],
+            "ingest": {
+                "file_path": str(ingest["file_path"]),
+                "content_hash": ingest["content_hash"],
+            },
+            "stages": [],
+            "clips": None,
+            "updated_at": time.time(),
+        })
+
+    def load(self, job_id: str) -> Optional[Dict]:
+        try:
+            with open(self._path(job_id), "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def update(self, job_id: str, stage: Optional[str] = None, clips: Optional[List[Dict]] = None):
+        """Marca uma etapa como concluída e/ou grava o estado atual dos clips"""
+        with self._lock:
+            checkpoint = self.load(job_id)
+            if checkpoint is None:
+                return
+            if stage and stage not in checkpoint["stages"]:
+                checkpoint["stages"].append(stage)
+            if clips is not None:
+                checkpoint["clips"] = clips
+            checkpoint["updated_at"] = time.time()
+            self._write(job_id, checkpoint)
+
+    def remove(self, job_id: str):
+        """Job terminou (concluído, erro ou cancelado): nada a retomar"""
+        self._path(job_id).unlink(missing_ok=True)
+
+    def pending(self) -> List[Dict]:
+        """Checkpoints de jobs interrompidos, do mais antigo ao mais novo"""
+        checkpoints = [self.load(path.stem) for path in self.directory.glob("*.json")]
+        return sorted((c for c in checkpoints if c), key=lambda c: c["created_at"])
+
+    def clip_complete(self, clip: Dict) -> bool:
+        """Clip marcado como renderizado ainda é válido: existe, não está vazio e tem a duração planejada"""
+        path = clip["file_path"]
+        if not clip.get("rendered") or not os.path.exists(path) or os.path.getsize(path) == 0:
+            return False
+        cmd = [
+            'ffprobe', '-v', 'error', '-show_entries', 'format=duration',
+            '-of', 'default=noprint_wrappers=1:nokey=1', path
+        ]
+        try:
+            result = ffmpeg_runner.run(cmd, "ffprobe:checkpoint")
+            duration = float(result.stdout.decode().strip())
+        except (FFmpegError, ValueError):
+            return False
+        return abs(duration - clip["duration"]) <= Config.CHECKPOINT_DURATION_TOLERANCE
+
+    def revalidate(self, clips: List[Dict]) -> int:
+        """Clip renderizado antes do reinício só conta se o arquivo estiver íntegro; retorna quantos estão prontos"""
+        for clip in clips:
+            if clip["rendered"] and not self.clip_complete(clip):
+                clip["rendered"] = False
+                clip["file_size"] = 0
+        return sum(1 for clip in clips if clip["rendered"])
+
+
+# Instância compartilhada entre o pipeline e a retomada no startup
+job_checkpoints = JobCheckpoints()
@@ -0,0 +1,167 @@
+"""
+Backends de armazenamento de objetos
+Disco local (padrão, e substituto local para testes) ou S3-compatível
+(AWS, MinIO...), com upload multipart em streaming e cache local de leitura
+(contado na cota do StorageManager)
+"""
+
+import os
+import shutil
+import threading
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Iterator, Optional
+
+from config import Config
+
+try:
+    import boto3
+except ImportError:  # Deploy mínimo: apenas backend local
+    boto3 = None
+
+PART_SIZE = 8 * 1024 * 1024  # S3 exige partes >= 5MB (exceto a última)
+
+
+class StorageBackend(ABC):
+    """Interface comum: objetos endereçados por chave ('uploads/<job>/<arquivo>')"""
+
+    # Diretório de cópias baixadas (None quando o backend já é o disco local)
+    cache_dir: Optional[Path] = None
+
+    @abstractmethod
+    def put_file(self, local_path: Path, key: str):
+        ...
+
+    @abstractmethod
+    def put_stream(self, chunks: Iterator[bytes], key: str):
+        ...
+
+    @abstractmethod
+    def ensure_local(self, key: str) -> Path:
+        """Caminho local legível para a chave (baixa para o cache se preciso)"""
+
+    @abstractmethod
+    def delete(self, key: str):
+        """Remove o objeto (e a cópia em cache); chave inexistente não é erro"""
+
+
+class LocalStorageBackend(StorageBackend):
+    def __init__(self, root: Path):
+        self.root = Path(root)
+
+    def _path(self, key: str) -> Path:
+        path = (self.root / key).resolve()
+        if self.root.resolve() not in path.parents:
+            raise ValueError(f"Chave fora do armazenamento: {key}")
+        return path
+
+    def put_file(self, local_path: Path, key: str):
+        target = self._path(key)
+        if Path(local_path).resolve() == target:
+            return  # Já está no lugar (API e worker no mesmo disco)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        temp = target.with_name(target.name + ".part")
+        shutil.copyfile(local_path, temp)
+        os.replace(temp, target)
+
+    def put_stream(self, chunks: Iterator[bytes], key: str):
+        target = self._path(key)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        temp = target.with_name(target.name + ".part")
+        with open(temp, "wb") as f:
+            for chunk in chunks:
+                f.write(chunk)
+        os.replace(temp, target)
+
+    def ensure_local(self, key: str) -> Path:
+        return self._path(key)
+
+    def delete(self, key: str):
+        self._path(key).unlink(missing_ok=True)
+
+
+class S3StorageBackend(StorageBackend):
+    def __init__(self, bucket: str, cache_dir: Path, endpoint_url: Optional[str] = None,
+                 region: Optional[str] = None):
+        if boto3 is None:
+            raise RuntimeError("boto3 não instalado: pip install boto3 para usar STORAGE_BACKEND=s3")
+        self.bucket = bucket
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.client = boto3.client("s3", endpoint_url=endpoint_url, region_name=region)
+        self._download_locks = {}
+        self._guard = threading.Lock()
+
+    def put_stream(self, chunks: Iterator[bytes], key: str):
+        """Upload multipart: envia cada parte assim que o buffer atinge PART_SIZE"""
+        upload = self.client.create_multipart_upload(Bucket=self.bucket, Key=key)
+        upload_id = upload["UploadId"]
+        parts = []
+        buffer = bytearray()
+
+        def send(data: bytes):
+            number = len(parts) + 1
+            response = self.client.upload_part(
+                Bucket=self.bucket, Key=key, UploadId=upload_id,
+                PartNumber=number, Body=data
+            )
+            parts.append({"ETag": response["ETag"], "PartNumber": number})
+
+        try:
+            for chunk in chunks:
+                buffer += chunk
+                while len(buffer) >= PART_SIZE:
+                    send(bytes(buffer[:PART_SIZE]))
+                    del buffer[:PART_SIZE]
+            if buffer or not parts:
+                send(bytes(buffer))
+            self.client.complete_multipart_upload(
+                Bucket=self.bucket, Key=key, UploadId=upload_id,
+                MultipartUpload={"Parts": parts}
+            )
+        except Exception:
+            self.client.abort_multipart_upload(Bucket=self.bucket, Key=key, UploadId=upload_id)
+            raise
+
+    def put_file(self, local_path: Path, key: str):
+        with open(local_path, "rb") as f:
+            self.put_stream(iter(lambda: f.read(PART_SIZE), b""), key)
+
+    def ensure_local(self, key: str) -> Path:
+        """Cache de leitura: baixa uma vez; downloads concorrentes esperam o primeiro
+
+        O mtime da cópia é atualizado a cada acesso: é o LRU do despejo do cache.
+        """
+        cached = self.cache_dir / key
+        if cached.exists():
+            try:
+                os.utime(cached)
+            except OSError:
+                pass
+            return cached
+
+        with self._guard:
+            lock = self._download_locks.setdefault(key, threading.Lock())
+        with lock:
+            if not cached.exists():
+                cached.parent.mkdir(parents=True, exist_ok=True)
+                temp = cached.with_name(cached.name + ".part")
+                self.client.download_file(self.bucket, key, str(temp))
+                os.replace(temp, cached)
+        return cached
+
+    def delete(self, key: str):
+        self.client.delete_object(Bucket=self.bucket, Key=key)
+        (self.cache_dir / key).unlink(missing_ok=True)
+
+
+def create_storage_backend() -> StorageBackend:
+    """Backend configurado por STORAGE_BACKEND (local | s3)"""
+    if Config.STORAGE_BACKEND == "s3":
+        return S3StorageBackend(
+            bucket=Config.S3_BUCKET,
+            cache_dir=Config.STORAGE_CACHE_DIR,
+            endpoint_url=Config.S3_ENDPOINT_URL,
+            region=Config.S3_REGION,
+        )
+    return LocalStorageBackend(Config.BASE_DIR)
@@ -0,0 +1,209 @@
+"""
+Ciclo de vida do armazenamento com cota e despejo LRU
+Ordem de despejo: cópias do cache de leitura do backend (baixadas de novo
+sob demanda), clips automáticos renderizados (re-renderizáveis a partir da
+fonte), depois artefatos derivados (proxy/áudio/linha do tempo), e só então fontes de jobs
+inativos
+"""
+
+import asyncio
+import os
+import shutil
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from config import Config
+from core.timeline import TIMELINE_DIR
+from utils.streaming_ingest import AUDIO_NAME, LOUDNESS_NAME, PROXY_NAME
+
+# Arquivos auxiliares gerados ao lado da fonte (removidos junto com ela)
+SOURCE_SIDECARS = [".mediainfo.json", ".croptrack.json", ".subs.ass", ".highlights.npz", ".dhash.npy"]
+DERIVED_NAMES = {AUDIO_NAME, PROXY_NAME, LOUDNESS_NAME, TIMELINE_DIR}  # a linha do tempo é um diretório
+TIER_ORDER = ["cache", "clip", "derived", "source"]
+CACHE_MIN_AGE = 300  # segundos: cópia do cache usada há pouco pode estar aberta por um render
+
+
+class StorageManager:
+    def __init__(self, file_manager, jobs: Dict[str, Dict], render_locks: Dict[str, asyncio.Lock]):
+        self.file_manager = file_manager
+        self.jobs = jobs
+        self.render_locks = render_locks
+        self.quota_bytes = Config.STORAGE_QUOTA_BYTES
+        self.min_free_bytes = Config.STORAGE_MIN_FREE_BYTES
+        self.last_access: Dict[str, float] = {}
+
+    def touch(self, path):
+        """Registrar acesso (download/render) para o LRU"""
+        self.last_access[str(path)] = time.time()
+
+    def _access_time(self, path: Path, stat: os.stat_result) -> float:
+        return self.last_access.get(str(path), stat.st_mtime)
+
+    @staticmethod
+    def _size(path: Path) -> int:
+        """Tamanho de um arquivo ou, para diretórios (linha do tempo), a soma do conteúdo"""
+        if not path.is_dir():
+            return path.stat().st_size
+        return sum(f.stat().st_size for f in path.rglob("*") if f.is_file())
+
+    def _roots(self) -> List[Path]:
+        roots = [self.file_manager.upload_dir, self.file_manager.output_dir]
+        cache_dir = self.file_manager.backend.cache_dir
+        if cache_dir is not None:
+            roots.append(cache_dir)  # Cache de leitura do S3 também conta na cota
+        return roots
+
+    def _cache_candidates(self) -> List[Tuple[int, float, str, Path, Optional[Dict]]]:
+        """Cópias do cache de leitura, pelo mtime (atualizado a cada acesso)"""
+        cache_dir = self.file_manager.backend.cache_dir
+        if cache_dir is None:
+            return []
+        cutoff = time.time() - CACHE_MIN_AGE
+        candidates = []
+        for path in cache_dir.rglob("*"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            if path.is_file() and not path.name.endswith(".part") and stat.st_mtime < cutoff:
+                candidates.append((TIER_ORDER.index("cache"), stat.st_mtime, "cache", path, None))
+        return candidates
+
+    def usage(self) -> int:
+        """Bytes ocupados por uploads e saídas"""
+        total = 0
+        for root in self._roots():
+            for dirpath, _, filenames in os.walk(root):
+                for name in filenames:
+                    try:
+                        total += os.path.getsize(os.path.join(dirpath, name))
+                    except OSError:
+                        pass
+        return total
+
+    def _busy(self, job: Dict, path: str, busy_sources: set) -> bool:
+        """Arquivo em uso: job em processamento, fonte de outro job ativo ou render em andamento"""
+        lock = self.render_locks.get(path)
+        return (
+            job.get("status") == "processing"
+            or job.get("source_path") in busy_sources
+            or (lock is not None and lock.locked())
+        )
+
+    def _candidates(self) -> List[Tuple[int, float, str, Path, Optional[Dict]]]:
+        """(nível, último acesso, tipo, caminho, job) de tudo que pode ser despejado"""
+        jobs = list(self.jobs.values())
+        busy_sources = {j.get("source_path") for j in jobs if j.get("status") == "processing"}
+        candidates = self._cache_candidates()
+        for job in jobs:
+            paths: List[Tuple[str, Path]] = []
+            for clip in job.get("clips", []):
+                # Variantes de formato, cortes manuais e em lote não são refeitos por render_clip
+                if not clip.get("rerenderable"):
+                    continue
+                if clip.get("rendered", True) and os.path.exists(clip["file_path"]):
+                    paths.append(("clip", Path(clip["file_path"])))
+
+            source = job.get("source_path")
+            if source and os.path.exists(source):
+                for name in DERIVED_NAMES:
+                    derived = Path(source).parent / name
+                    if derived.exists():
+                        paths.append(("derived", derived))
+                paths.append(("source", Path(source)))
+
+            for kind, path in paths:
+                if self._busy(job, str(path), busy_sources):
+                    continue
+                try:
+                    stat = path.stat()
+                except OSError:
+                    continue
+                candidates.append((TIER_ORDER.index(kind), self._access_time(path, stat), kind, path, job))
+
+        # Primeiro por nível, depois o menos recentemente usado
+        candidates.sort(key=lambda c: (c[0], c[1]))
+        return candidates
+
+    def _evict(self, kind: str, path: Path, job: Optional[Dict]) -> int:
+        """Remove o arquivo ou diretório (e o objeto no backend) e atualiza o job; retorna bytes liberados"""
+        freed = 0
+        targets = [path]
+        if kind == "source":
+            targets += [path.with_name(path.name + suffix) for suffix in SOURCE_SIDECARS]
+
+        for target in targets:
+            try:
+                size = self._size(target)
+                if target.is_dir():
+                    shutil.rmtree(target)  # Regerada por ensure_timeline no próximo acesso
+                else:
+                    target.unlink()
+                freed += size
+            except OSError:
+                pass
+            self.last_access.pop(str(target), None)
+
+        if kind in ("clip", "source"):
+            # Clip é re-renderizado (e republicado); fonte despejada não é mais lida
+            self.file_manager.unpublish(path)
+
+        if kind == "clip":
+            # Re-renderizado sob demanda no próximo download (fonte mantida)
+            for clip in job.get("clips", []):
+                if clip["file_path"] == str(path):
+                    clip["rendered"] = False
+                    clip["draft"] = False
+                    clip["file_size"] = 0
+        elif kind == "source":
+            job["source_evicted"] = True
+
+        print(f"Armazenamento: despejado {kind} {path} ({freed} bytes)")
+        return freed
+
+    def _over_limit(self, usage: int, extra: int = 0) -> bool:
+        if usage + extra > self.quota_bytes:
+            return True
+        free = shutil.disk_usage(self.file_manager.upload_dir).free
+        return free - extra < self.min_free_bytes
+
+    def enforce_quota(self, extra_bytes: int = 0) -> int:
+        """Despeja por LRU até ficar abaixo da marca baixa; retorna bytes liberados"""
+        usage = self.usage()
+        if not self._over_limit(usage, extra_bytes):
+            return 0
+
+        target = int(self.quota_bytes * Config.STORAGE_LOW_WATERMARK)
+        freed = 0
+        for _, _, kind, path, job in self._candidates():
+            if usage - freed + extra_bytes <= target and not self._over_limit(usage - freed, extra_bytes):
+                break
+            freed += self._evict(kind, path, job)
+        return freed
+
+    def expire_jobs(self) -> List[str]:
+        """Remove jobs antigos (metadados e arquivos) após o período de retenção"""
+        cutoff = time.time() - Config.JOB_RETENTION_HOURS * 3600
+        expired = [
+            job_id for job_id, job in list(self.jobs.items())
+            if job.get("status") != "processing" and job.get("created_at", time.time()) < cutoff
+        ]
+        for job_id in expired:
+            self.file_manager.cleanup_job(job_id, include_outputs=True)
+            self.jobs.pop(job_id, None)
+        return expired
+
+    async def run_janitor(self):
+        """Loop em segundo plano: expira jobs e aplica a cota periodicamente"""
+        while True:
+            await asyncio.sleep(Config.STORAGE_JANITOR_INTERVAL)
+            try:
+                await asyncio.to_thread(self.expire_jobs)
+                await asyncio.to_thread(self.enforce_quota)
+            except Exception as e:
+                print(f"Erro no janitor de armazenamento: {e}")
+
+    async def reserve(self, estimated_bytes: int):
+        """Libera espaço antes de um render, se necessário"""
+        await asyncio.to_thread(self.enforce_quota, estimated_bytes)
@@ -0,0 +1,239 @@
+"""
+Ingestão em streaming: cada bloco recebido vai para o disco e para o hash
+de conteúdo; com análise ligada (uploads automáticos), um ffmpeg alimentado
+a partir do arquivo em disco extrai áudio e gera o proxy enquanto o upload
+ainda está chegando
+"""
+
+import asyncio
+import hashlib
+import struct
+from pathlib import Path
+from typing import AsyncIterator, Dict, Optional
+
+import aiofiles
+
+from core.ffmpeg_runner import ffmpeg_runner, FFmpegError
+from core.ffmpeg_utils import escape_filter_value
+
+AUDIO_NAME = "audio.wav"  # 16 kHz mono para Whisper / análise de áudio
+PROXY_NAME = "proxy.mp4"  # 360p leve para reenquadramento e análises visuais
+LOUDNESS_NAME = "loudness.txt"  # ebur128 da trilha original (canais da fonte), lido por core/loudness.py
+SNIFF_BYTES = 1024 * 1024  # Bytes acumulados antes de decidir se o contêiner é "streamável"
+TEE_CHUNK_SIZE = 1024 * 1024  # Leitura do arquivo em disco para o ffmpeg de análise
+
+
+def is_streamable(head: bytes) -> Optional[bool]:
+    """O contêiner pode ser lido sequencialmente a partir do início?
+
+    None quando ainda não há bytes suficientes para decidir.
+    """
+    if head[:4] == b"\x1a\x45\xdf\xa3":  # Matroska / WebM
+        return True
+    if len(head) >= 377 and head[0] == 0x47 and head[188] == 0x47:  # MPEG-TS
+        return True
+    if head[:3] == b"FLV":
+        return True
+
+    # MP4/MOV: percorrer as caixas de topo; moov (ou moof) antes de mdat = streamável
+    offset = 0
+    while offset + 8 <= len(head):
+        size, box = struct.unpack(">I4s", head[offset:offset + 8])
+        if size == 1:
+            if offset + 16 > len(head):
+                return None
+            size = struct.unpack(">Q", head[offset + 8:offset + 16])[0]
+        if box in (b"moov", b"moof"):
+            return True
+        if box == b"mdat":
+            return False
+        if size < 8:
+            return False  # Caixa inválida ou "até o fim do arquivo"
+        offset += size
+
+    return None if len(head) < SNIFF_BYTES else False
+
+
+def analysis_command(input_spec: str, job_dir: Path) -> list:
+    """Um ffmpeg, três saídas: áudio para análise, proxy de vídeo reduzido e
+    medição de loudness (o áudio já está sendo decodificado, sai de graça)"""
+    return [
+        'ffmpeg', '-y', '-v', 'error',
+        '-i', input_spec,
+        '-map', '0:a:0?', '-vn', '-ac', '1', '-ar', '16000', '-c:a', 'pcm_s16le',
+        str(job_dir / AUDIO_NAME),
+        '-map', '0:v:0?', '-an', '-vf', 'scale=-2:360,fps=15',
+        '-c:v', 'libx264', '-preset', 'ultrafast', '-crf', '30', '-g', '30',
+        str(job_dir / PROXY_NAME),
+        '-map', '0:a:0?', '-vn',
+        '-af', f"ebur128=metadata=1,ametadata=mode=print:file={escape_filter_value(str(job_dir / LOUDNESS_NAME))}",
+        '-f', 'null', '-',
+    ]
+
+
+def remove_analysis_artifacts(job_dir: Path):
+    """Artefatos parciais nunca ficam: sem eles, as análises leem a própria fonte"""
+    for name in (AUDIO_NAME, PROXY_NAME, LOUDNESS_NAME):
+        (job_dir / name).unlink(missing_ok=True)
+
+
+async def extract_analysis_artifacts(file_path: Path, duration: Optional[float] = None) -> bool:
+    """Fallback fora do upload: mesmas saídas, lidas do arquivo já salvo
+
+    Passa pelo ffmpeg_runner (timeout, cancelamento do job, trace); em falha
+    os artefatos parciais são removidos.
+    """
+    cmd = analysis_command(str(file_path), file_path.parent)
+    try:
+        await asyncio.to_thread(ffmpeg_runner.run, cmd, "ffmpeg:analise", duration)
+    except FFmpegError as e:
+        print(f"⚠️ Extração de áudio/proxy falhou, análises usarão a fonte: {e}")
+        remove_analysis_artifacts(file_path.parent)
+        return False
+    return True
+
+
+class StreamingIngest:
+    def __init__(self, job_dir: Path, filename: str, analyze: bool = False, job_id: Optional[str] = None):
+        self.job_dir = job_dir
+        self.job_id = job_id  # Dono do ffmpeg de análise no runner (cancelamento/watchdog)
+        self.file_path = job_dir / Path(filename).name
+        self.analyze = analyze
+        self.hasher = hashlib.sha256()
+        self.size = 0
+        self._head = b""
+        self._decided = not analyze
+        self._file = None
+        self._process: Optional[asyncio.subprocess.Process] = None
+        self._tee_task: Optional[asyncio.Task] = None
+        self._written = asyncio.Event()
+        self._complete = False
+
+    async def _start_analysis(self) -> bool:
+        try:
+            self._process = await asyncio.create_subprocess_exec(
+                *analysis_command("pipe:0", self.job_dir),
+                stdin=asyncio.subprocess.PIPE,
+                stdout=asyncio.subprocess.DEVNULL,
+                stderr=asyncio.subprocess.DEVNULL,
+                start_new_session=True,
+            )
+        except OSError:
+            return False
+        # Registrado no runner: /cancel, o watchdog e o encerramento também o matam
+        ffmpeg_runner.register(self._process, self.job_id)
+        self._tee_task = asyncio.create_task(self._tee())
+        return True
+
+    async def _tee(self) -> bool:
+        """Alimenta o ffmpeg lendo o arquivo em disco, no ritmo do decode
+
+        O upload nunca espera o ffmpeg: se o decode for mais lento, o tee fica
+        para trás e alcança o arquivo depois que o upload termina. Retorna se
+        áudio, proxy e loudness saíram completos.
+        """
+        try:
+            return await self._feed_analysis()
+        except asyncio.CancelledError:
+            # Timeout do pipeline: o ffmpeg não fica rodando sem ninguém esperar
+            self._abort_analysis()
+            remove_analysis_artifacts(self.job_dir)
+            raise
+        finally:
+            ffmpeg_runner.unregister(self._process)
+
+    def _abort_analysis(self):
+        if self._process.returncode is None:
+            try:
+                self._process.kill()
+            except ProcessLookupError:
+                pass
+
+    async def _feed_analysis(self) -> bool:
+        try:
+            async with aiofiles.open(self.file_path, 'rb') as source:
+                while True:
+                    self._written.clear()
+                    chunk = await source.read(TEE_CHUNK_SIZE)
+                    if chunk:
+                        self._process.stdin.write(chunk)
+                        await self._process.stdin.drain()
+                    elif self._complete:
+                        break
+                    else:
+                        await self._written.wait()  # Alcançou o upload: espera o próximo bloco
+            self._process.stdin.close()
+            success = await self._process.wait() == 0
+        except (BrokenPipeError, ConnectionResetError, OSError):
+            success = False
+
+        if not success:
+            if self._process.returncode is None:
+                self._abort_analysis()
+                await self._process.wait()
+            remove_analysis_artifacts(self.job_dir)
+        return success
+
+    async def feed(self, chunk: bytes):
+        """Processa um bloco do upload"""
+        if self._file is None:
+            self._file = await aiofiles.open(self.file_path, 'wb')
+
+        await self._file.write(chunk)
+        self.hasher.update(chunk)
+        self.size += len(chunk)
+        if self.analyze:
+            await self._file.flush()  # Visível para o tee, que lê o mesmo arquivo
+            self._written.set()
+
+        if self._decided:
+            return
+
+        self._head += chunk
+        decision = is_streamable(self._head[:SNIFF_BYTES])
+        if decision is None and len(self._head) < SNIFF_BYTES:
+            return
+
+        self._decided = True
+        if decision:
+            await self._start_analysis()
+        self._head = b""
+
+    async def finish(self) -> Dict:
+        """Fecha o arquivo sem esperar o ffmpeg de análise
+
+        ``analysis`` é a tarefa do tee (resolve para True se áudio/proxy saíram
+        completos) ou None quando não houve análise no upload (desligada ou
+        contêiner não streamável, ex.: MP4 com moov no fim); nesses casos o
+        pipeline roda ``extract_analysis_artifacts``.
+        """
+        if self._file is None:
+            self._file = await aiofiles.open(self.file_path, 'wb')
+        await self._file.close()
+        self._complete = True
+        self._written.set()
+
+        return {
+            "file_path": self.file_path,
+            "content_hash": self.hasher.hexdigest(),
+            "size": self.size,
+            "analysis": self._tee_task,
+        }
+
+    async def consume(self, chunks: AsyncIterator[bytes]) -> Dict:
+        """Consome um iterador assíncrono de blocos até o fim"""
+        try:
+            async for chunk in chunks:
+                if chunk:
+                    await self.feed(chunk)
+        except BaseException:
+            # Upload interrompido: não deixar ffmpeg órfão nem arquivo aberto
+            if self._tee_task is not None:
+                self._tee_task.cancel()
+            if self._process is not None:
+                self._abort_analysis()
+                ffmpeg_runner.unregister(self._process)
+            if self._file is not None:
+                await self._file.close()
+            raise
+        return await self.finish()
@@ -0,0 +1,192 @@
+"""
+Rastreamento leve por job: tempo de parede, CPU e pico de memória de cada
+etapa e de cada processo ffmpeg/ffprobe filho, mais métricas agregadas
+expostas em formato Prometheus (/metrics)
+"""
+
+import resource
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Optional
+
+# Job da etapa em andamento; asyncio.to_thread copia o contexto, então
+# processos lançados nas threads do processador são atribuídos ao job certo
+_current_job: ContextVar[Optional[Dict]] = ContextVar("trace_job", default=None)
+
+def current_job() -> Optional[Dict]:
+    """Job da etapa em andamento (None fora de tracer.stage)"""
+    return _current_job.get()
+
+
+RECENT_WINDOW = 50  # amostras usadas nas taxas "recentes" (fator tempo real, upload)
+
+
+def _rss_mb(maxrss_kb: int) -> float:
+    return round(maxrss_kb / 1024, 1)  # Linux: ru_maxrss em KB
+
+
+class Tracer:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.stage_totals: Dict[str, Dict[str, float]] = {}
+        self.process_totals = {"count": 0, "failures": 0, "cpu_seconds": 0.0, "wall_seconds": 0.0}
+        self.encode_totals = {"media_seconds": 0.0, "wall_seconds": 0.0}
+        self.upload_totals = {"bytes": 0, "seconds": 0.0}
+        self.recent_encodes = deque(maxlen=RECENT_WINDOW)  # (segundos de mídia, segundos de parede)
+        self.recent_uploads = deque(maxlen=RECENT_WINDOW)  # (bytes, segundos)
+
+    def _job_trace(self, job: Dict) -> Dict:
+        return job.setdefault("trace", {"stages": [], "processes": []})
+
+    @contextmanager
+    def stage(self, job: Dict, name: str):
+        """Mede uma etapa do job (tempo de parede, CPU do processo e dos filhos, pico de RSS)
+
+        A CPU do processo Python é global: com jobs concorrentes é aproximada.
+        A CPU e o pico de RSS dos ffmpeg filhos são exatos (rusage de cada filho).
+        ``process_peak_rss_mb`` é o pico do processo da API desde que subiu
+        (ru_maxrss não zera), não o da etapa.
+        """
+        trace = self._job_trace(job)
+        processes_before = len(trace["processes"])
+        token = _current_job.set(job)
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        try:
+            yield
+        finally:
+            _current_job.reset(token)
+            children = trace["processes"][processes_before:]
+            record = {
+                "stage": name,
+                "wall_seconds": round(time.perf_counter() - wall_start, 3),
+                "cpu_seconds": round(time.process_time() - cpu_start, 3),
+                "ffmpeg_cpu_seconds": round(sum(p["cpu_seconds"] for p in children), 3),
+                "ffmpeg_processes": len(children),
+                "process_peak_rss_mb": _rss_mb(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss),
+                "ffmpeg_peak_rss_mb": max((p["peak_rss_mb"] for p in children), default=0.0),
+            }
+            trace["stages"].append(record)
+
+            with self._lock:
+                totals = self.stage_totals.setdefault(
+                    name, {"count": 0, "wall_seconds": 0.0, "cpu_seconds": 0.0}
+                )
+                totals["count"] += 1
+                totals["wall_seconds"] += record["wall_seconds"]
+                totals["cpu_seconds"] += record["cpu_seconds"] + record["ffmpeg_cpu_seconds"]
+
+    def record_process(self, label: str, wall: float, usage, returncode: int,
+                       media_seconds: Optional[float] = None):
+        """Registra um processo filho no job atual (se houver) e nos totais"""
+        record = {
+            "label": label,
+            "wall_seconds": round(wall, 3),
+            "cpu_seconds": round(usage.ru_utime + usage.ru_stime, 3),
+            "peak_rss_mb": _rss_mb(usage.ru_maxrss),
+            "returncode": returncode,
+        }
+        if media_seconds:
+            record["realtime_factor"] = round(media_seconds / wall, 2) if wall > 0 else None
+
+        job = current_job()
+        if job is not None:
+            self._job_trace(job)["processes"].append(record)
+
+        with self._lock:
+            self.process_totals["count"] += 1
+            self.process_totals["failures"] += int(returncode != 0)
+            self.process_totals["cpu_seconds"] += record["cpu_seconds"]
+            self.process_totals["wall_seconds"] += wall
+            if media_seconds and returncode == 0:
+                self.encode_totals["media_seconds"] += media_seconds
+                self.encode_totals["wall_seconds"] += wall
+                self.recent_encodes.append((media_seconds, wall))
+
+    def record_upload(self, size: int, seconds: float):
+        with self._lock:
+            self.upload_totals["bytes"] += size
+            self.upload_totals["seconds"] += seconds
+            self.recent_uploads.append((size, seconds))
+
+    @staticmethod
+    def _recent_rate(samples) -> float:
+        amount = sum(s[0] for s in samples)
+        seconds = sum(s[1] for s in samples)
+        return amount / seconds if seconds > 0 else 0.0
+
+    def prometheus(self, jobs: Dict[str, Dict], active_encodes: int) -> str:
+        """Texto no formato de exposição do Prometheus"""
+        statuses: Dict[str, int] = {}
+        for job in list(jobs.values()):
+            statuses[job.get("status", "unknown")] = statuses.get(job.get("status", "unknown"), 0) + 1
+
+        lines = [
+            "# HELP vcut_queue_depth Jobs aguardando ou em processamento",
+            "# TYPE vcut_queue_depth gauge",
+            f"vcut_queue_depth {statuses.get('processing', 0)}",
+            "# HELP vcut_jobs Jobs em memória por status",
+            "# TYPE vcut_jobs gauge",
+        ]
+        lines += [f'vcut_jobs{{status="{status}"}} {count}' for status, count in sorted(statuses.items())]
+
+        with self._lock:
+            lines += [
+                "# HELP vcut_active_encodes Encodes ffmpeg em andamento",
+                "# TYPE vcut_active_encodes gauge",
+                f"vcut_active_encodes {active_encodes}",
+                "# HELP vcut_encode_realtime_factor Segundos de mídia por segundo de encode (últimos encodes)",
+                "# TYPE vcut_encode_realtime_factor gauge",
+                f"vcut_encode_realtime_factor {self._recent_rate(self.recent_encodes):.3f}",
+                "# TYPE vcut_encode_media_seconds_total counter",
+                f"vcut_encode_media_seconds_total {self.encode_totals['media_seconds']:.3f}",
+                "# TYPE vcut_encode_wall_seconds_total counter",
+                f"vcut_encode_wall_seconds_total {self.encode_totals['wall_seconds']:.3f}",
+                "# HELP vcut_upload_bytes_per_second Vazão dos uploads recentes",
+                "# TYPE vcut_upload_bytes_per_second gauge",
+                f"vcut_upload_bytes_per_second {self._recent_rate(self.recent_uploads):.1f}",
+                "# TYPE vcut_upload_bytes_total counter",
+                f"vcut_upload_bytes_total {self.upload_totals['bytes']}",
+                "# TYPE vcut_upload_seconds_total counter",
+                f"vcut_upload_seconds_total {self.upload_totals['seconds']:.3f}",
+                "# HELP vcut_ffmpeg_processes_total Processos ffmpeg/ffprobe executados",
+                "# TYPE vcut_ffmpeg_processes_total counter",
+                f"vcut_ffmpeg_processes_total {self.process_totals['count']}",
+                "# TYPE vcut_ffmpeg_failures_total counter",
+                f"vcut_ffmpeg_failures_total {self.process_totals['failures']}",
+                "# TYPE vcut_ffmpeg_cpu_seconds_total counter",
+                f"vcut_ffmpeg_cpu_seconds_total {self.process_totals['cpu_seconds']:.3f}",
+                "# HELP vcut_stage_wall_seconds_total Tempo de parede acumulado por etapa",
+                "# TYPE vcut_stage_wall_seconds_total counter",
+            ]
+            lines += [
+                f'vcut_stage_wall_seconds_total{{stage="{name}"}} {t["wall_seconds"]:.3f}'
+                for name, t in sorted(self.stage_totals.items())
+            ]
+            lines += [
+                "# HELP vcut_stage_cpu_seconds_total CPU acumulada por etapa (processo + ffmpeg)",
+                "# TYPE vcut_stage_cpu_seconds_total counter",
+            ]
+            lines += [
+                f'vcut_stage_cpu_seconds_total{{stage="{name}"}} {t["cpu_seconds"]:.3f}'
+                for name, t in sorted(self.stage_totals.items())
+            ]
+            lines.append("# TYPE vcut_stage_runs_total counter")
+            lines += [
+                f'vcut_stage_runs_total{{stage="{name}"}} {t["count"]}'
+                for name, t in sorted(self.stage_totals.items())
+            ]
+
+        lines += [
+            "# HELP vcut_peak_rss_bytes Pico de memória residente do processo da API",
+            "# TYPE vcut_peak_rss_bytes gauge",
+            f"vcut_peak_rss_bytes {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024}",
+        ]
+        return "\n".join(lines) + "\n"
+
+
+# Instância compartilhada (API, processadores e workers)
+tracer = Tracer()